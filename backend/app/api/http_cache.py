@@ -0,0 +1,100 @@
+import os
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+
+# How long clients and shared caches may reuse a summary before revalidating
+SUMMARY_CACHE_MAX_AGE = int(os.getenv("SUMMARY_CACHE_MAX_AGE", "300"))
+
+# Preferred order when the client accepts several encodings
+ENCODING_PREFERENCE = ('br', 'gzip')
+
+# Each encoding is a different representation, so it gets its own strong ETag
+ETAG_SUFFIXES = {'br': '-br', 'gzip': '-gz'}
+
+
+def _accepted_encodings(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: q}."""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: Optional[str], available: Dict[str, Any]) -> Optional[str]:
+    """Pick the best content coding we have a body for, or None for identity."""
+    accepted = _accepted_encodings(accept_encoding)
+    for coding in ENCODING_PREFERENCE:
+        if available.get(coding) is None:
+            continue
+        if accepted.get(coding, accepted.get('*', 0.0)) > 0:
+            return coding
+    return None
+
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """ETag of the body in the given content coding (None for identity)."""
+    if not encoding:
+        return etag
+    # Inside the quotes: "abc" becomes "abc-gz"
+    return f'{etag[:-1]}{ETAG_SUFFIXES[encoding]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison, so W/ prefixes are ignored."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def precomputed_response(request: Request, cached: Dict[str, Any]) -> Response:
+    """
+    Serve a precomputed JSON body, honouring If-None-Match and Accept-Encoding.
+
+    Args:
+        request: Incoming request
+        cached: Dict with etag, body, body_gzip and body_br (may be None)
+
+    Returns:
+        A 304 when the client's copy is current, otherwise the body in the
+        best encoding the client accepts. Each encoding has its own ETag.
+    """
+    bodies = {'br': cached.get('body_br'), 'gzip': cached.get('body_gzip')}
+    encoding = choose_encoding(request.headers.get('accept-encoding'), bodies)
+    etag = encoded_etag(cached['etag'], encoding)
+    headers = {
+        'ETag': etag,
+        'Cache-Control': f"public, max-age={SUMMARY_CACHE_MAX_AGE}",
+        'Vary': 'Accept-Encoding',
+    }
+
+    # Only a copy in the encoding this request would get is current
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        headers['Content-Encoding'] = encoding
+        body = bodies[encoding]
+    else:
+        body = cached['body']
+
+    return Response(content=body, media_type='application/json', headers=headers)
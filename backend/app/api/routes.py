@@ -1,131 +1,365 @@
 import os
-from fastapi import APIRouter, HTTPException
-from app.models.schemas import PodcastRequest, PodcastResponse, SummariesListResponse
-from app.services.audio_extractor import extract_audio_from_podcast
-from app.services.transcriber import transcribe_audio
-from app.services.summarizer import summarize_transcript
-from app.services.summarizer2 import summarize_transcript_type2
-from app.database import init_db, save_summary, get_all_summaries, get_summary_by_id
+import json
+import asyncio
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from app.models.schemas import (
+    PodcastRequest,
+    PodcastResponse,
+    SummariesListResponse,
+    SearchResponse,
+    JobSubmitResponse,
+    JobStatusResponse,
+    BatchRequest,
+    BatchResponse,
+)
+from app.services.job_queue import job_queue, QueueFullError
+from app.services.pipeline import run_pipeline
+from app.services.url_utils import normalize_podcast_url
+from app.services.batches import batch_manager
+from app.services.feeds import fetch_feed_episodes
+from app.services.metrics import CACHE_LOOKUPS
+from app.services.extractive import SUMMARY_FALLBACK_KEY
+from app.services.transcription_backends import backend_requires_api_key
+from app.services.transcript_cache import transcript_cache
+from app.services.llm_cache import llm_cache
+from app.services.scratch import scratch_manager, ScratchBudgetError
+from app.services.uploads import receive_upload, UploadError
+from app.services.audio_extractor import encode_uploaded_audio
+from app.api.http_cache import precomputed_response
+from app.database import (
+    run_db, list_summaries, search_summaries, get_summary_by_id, get_summary_by_url,
+    get_transcript, get_transcript_segments, get_summary_response, get_checkpoint_status
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Initialize database on module load
-init_db()
+
+async def _find_stored_summary(podcast_url: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up the stored summary a submission can be answered with.
+    
+    Returns None when the episode has to be processed: it was never
+    stored, the lookup failed, or the stored summary is an extractive
+    fallback from a failed LLM call.
+    """
+    try:
+        summary = await run_db(get_summary_by_url, podcast_url)
+    except Exception as e:
+        logger.error(f"Error checking summary cache: {str(e)}")
+        summary = None
+    
+    if summary and summary.get('metadata', {}).get(SUMMARY_FALLBACK_KEY):
+        # Stored while OpenRouter was failing; process again to get the real summaries
+        logger.info(f"Reprocessing {podcast_url}: stored summary is an extractive fallback")
+        summary = None
+    
+    CACHE_LOOKUPS.inc(cache='summaries', result='hit' if summary else 'miss')
+    return summary
+
+
+def _stored_summary_response(podcast_url: str, summary: Dict[str, Any]) -> JobSubmitResponse:
+    """Answer a submission with a stored summary, as an already completed job."""
+    logger.info(f"Serving cached summary {summary['id']} for {podcast_url}")
+    result = {
+        'transcript': summary['transcript'],
+        'summary': summary['summary_type_1'],
+        'summary_type_2': summary.get('summary_type_2'),
+        'preview': summary.get('summary_preview'),
+        'metadata': summary.get('metadata', {}),
+        'summary_id': summary['id'],
+    }
+    job = job_queue.add_completed(podcast_url, result)
+    return JobSubmitResponse(
+        job_id=job.id,
+        status=job.status,
+        cached=True,
+        result=PodcastResponse(**result)
+    )
 
 
-@router.post("/process-podcast", response_model=PodcastResponse)
+@router.post("/process-podcast", response_model=JobSubmitResponse, status_code=202)
 async def process_podcast(request: PodcastRequest):
     """
-    Main endpoint to process a podcast:
+    Queue a podcast for processing:
     1. Extract audio from URL
     2. Transcribe audio
     3. Generate summary
     
-    Returns transcript and summary.
+    Returns a job ID right away; poll /api/jobs/{job_id} for the result.
+    URLs that were already processed are answered from the database
+    unless `force` is set (or the stored summary is an extractive
+    fallback from a failed LLM call), and concurrent submissions of the same URL
+    share one job. `fresh` also reprocesses, and samples new summaries
+    instead of reusing cached LLM responses.
     """
-    audio_file_path = None
-    metadata = {}
+    # The normalized URL only keys the cache and the job; the audio is
+    # fetched from the URL as submitted
+    source_url = str(request.url)
+    podcast_url = normalize_podcast_url(source_url)
+    
+    if not request.force and not request.fresh:
+        summary = await _find_stored_summary(podcast_url)
+        if summary:
+            return _stored_summary_response(podcast_url, summary)
+    
+    # Get API keys from environment
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    openrouter_api_key = os.getenv("OPENROUTER_API_KEY")
+    
+    if not openai_api_key and backend_requires_api_key():
+        raise HTTPException(
+            status_code=500,
+            detail="OPENAI_API_KEY environment variable not set"
+        )
+    
+    if not openrouter_api_key:
+        raise HTTPException(
+            status_code=500,
+            detail="OPENROUTER_API_KEY environment variable not set"
+        )
     
     try:
-        # Get API keys from environment
-        openai_api_key = os.getenv("OPENAI_API_KEY")
-        openrouter_api_key = os.getenv("OPENROUTER_API_KEY")
-        
-        if not openai_api_key:
-            raise HTTPException(
-                status_code=500,
-                detail="OPENAI_API_KEY environment variable not set"
-            )
-        
-        if not openrouter_api_key:
+        job = job_queue.submit(
+            podcast_url,
+            lambda job: run_pipeline(
+                podcast_url, openai_api_key, openrouter_api_key, job=job,
+                fresh_summaries=request.fresh, source_url=source_url
+            ),
+            key=podcast_url
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return JobSubmitResponse(job_id=job.id, status=job.status)
+
+
+@router.post("/upload", response_model=JobSubmitResponse, status_code=202)
+async def upload_audio(request: Request, force: bool = False, fresh: bool = False):
+    """
+    Queue an uploaded audio file for processing, bypassing URL extraction.
+    
+    Send multipart/form-data with the audio in a `file` field and an
+    optional `title`. The body is streamed to scratch disk in fixed-size
+    blocks and hashed on the fly, so memory stays bounded whatever the
+    file size. The upload then goes through the same transcription and
+    summarization pipeline as /api/process-podcast, under the URL
+    `upload://<sha256>`: uploading the same file again is answered from
+    the database unless `force` (or `fresh`) is set.
+    """
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    openrouter_api_key = os.getenv("OPENROUTER_API_KEY")
+    
+    if (not openai_api_key and backend_requires_api_key()) or not openrouter_api_key:
+        raise HTTPException(
+            status_code=500,
+            detail="OPENAI_API_KEY and OPENROUTER_API_KEY environment variables must be set"
+        )
+    
+    content_length = request.headers.get('content-length')
+    try:
+        # Staged, outside the job budget: the job is admitted once it runs
+        scratch = scratch_manager.stage()
+    except ScratchBudgetError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    try:
+        upload = await receive_upload(
+            request.headers.get('content-type', ''),
+            int(content_length) if content_length and content_length.isdigit() else None,
+            request.stream(),
+            scratch
+        )
+    except UploadError as e:
+        scratch.close()
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except BaseException:
+        scratch.close()
+        raise
+    
+    podcast_url = f"upload://{upload.sha256}"
+    metadata = {
+        'title': upload.fields.get('title') or os.path.splitext(upload.filename)[0] or 'Uploaded audio',
+        'uploader': 'Upload',
+        'filename': upload.filename,
+    }
+    
+    summary = None
+    if not force and not fresh:
+        summary = await _find_stored_summary(podcast_url)
+    
+    inflight = job_queue.get_inflight(podcast_url)
+    if summary or inflight:
+        scratch.close()
+    if summary:
+        return _stored_summary_response(podcast_url, summary)
+    if inflight:
+        # The same file is already being processed
+        return JobSubmitResponse(job_id=inflight.id, status=inflight.status)
+    
+    try:
+        job = job_queue.submit(
+            podcast_url,
+            lambda job: run_pipeline(
+                podcast_url, openai_api_key, openrouter_api_key, job=job,
+                fresh_summaries=fresh,
+                audio_source=lambda url, space: encode_uploaded_audio(upload.path, space, metadata),
+                scratch=scratch
+            ),
+            key=podcast_url
+        )
+    except QueueFullError as e:
+        scratch.close()
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return JobSubmitResponse(job_id=job.id, status=job.status)
+
+
+@router.post("/batches", response_model=BatchResponse, status_code=202)
+async def create_batch(request: BatchRequest):
+    """
+    Queue many episodes at once, from a list of URLs or a podcast feed.
+    
+    Episodes already in the database are skipped unless `force` is set.
+    Poll /api/batches/{batch_id} for aggregate progress.
+    """
+    if bool(request.urls) == bool(request.feed_url):
+        raise HTTPException(status_code=400, detail="Provide either urls or feed_url")
+    
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    openrouter_api_key = os.getenv("OPENROUTER_API_KEY")
+    
+    if (not openai_api_key and backend_requires_api_key()) or not openrouter_api_key:
+        raise HTTPException(
+            status_code=500,
+            detail="OPENAI_API_KEY and OPENROUTER_API_KEY environment variables must be set"
+        )
+    
+    if request.feed_url:
+        source = str(request.feed_url)
+        try:
+            episodes = await fetch_feed_episodes(source, request.limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error(f"Error reading feed: {str(e)}")
             raise HTTPException(
-                status_code=500,
-                detail="OPENROUTER_API_KEY environment variable not set"
+                status_code=502,
+                detail=f"Error reading feed: {str(e)}"
             )
-        
-        podcast_url = str(request.url)
-        
-        print(f"\n{'='*60}")
-        print(f"Processing podcast: {podcast_url}")
-        print(f"{'='*60}\n")
-        
-        # Step 1: Extract audio
-        print("Step 1/3: Extracting audio from podcast URL...")
-        audio_file_path, metadata = extract_audio_from_podcast(podcast_url)
-        print(f"✓ Audio extracted successfully")
-        print(f"  Title: {metadata.get('title', 'Unknown')}")
-        print(f"  Duration: {metadata.get('duration', 0)} seconds\n")
-        
-        # Step 2: Transcribe
-        print("Step 2/3: Transcribing audio (this may take a while)...")
-        transcript = transcribe_audio(audio_file_path, openai_api_key)
-        print(f"✓ Transcription completed")
-        print(f"  Transcript length: {len(transcript)} characters\n")
-        
-        # Step 3: Generate Type 1 summary (expert-level)
-        print("Step 3/5: Generating Type 1 summary (expert-level)...")
-        summary_type_1 = summarize_transcript(transcript, openrouter_api_key)
-        print(f"✓ Type 1 summary generated")
-        print(f"  Summary length: {len(summary_type_1)} characters\n")
-        
-        # Step 4: Generate Type 2 summary (structured)
-        print("Step 4/5: Generating Type 2 summary (structured)...")
-        summary_type_2 = summarize_transcript_type2(transcript, openrouter_api_key)
-        print(f"✓ Type 2 summary generated")
-        print(f"  Summary length: {len(summary_type_2)} characters\n")
-        
-        # Step 5: Save to database
-        print("Step 5/5: Saving to database...")
-        summary_id = save_summary(
-            podcast_url=podcast_url,
-            transcript=transcript,
-            summary_type_1=summary_type_1,
-            summary_type_2=summary_type_2,
-            metadata=metadata,
-            podcast_title=metadata.get('title', 'Unknown')
-        )
-        print(f"✓ Saved to database (ID: {summary_id})\n")
-        print(f"{'='*60}")
-        print("Processing complete!")
-        print(f"{'='*60}\n")
-        
-        return PodcastResponse(
-            transcript=transcript,
-            summary=summary_type_1,
-            summary_type_2=summary_type_2,
-            metadata=metadata,
-            summary_id=summary_id
+        if not episodes:
+            raise HTTPException(status_code=400, detail="Feed lists no episodes")
+    else:
+        source = "urls"
+        episodes = [{'url': str(url)} for url in request.urls]
+    
+    try:
+        batch = batch_manager.create(
+            episodes, source, openai_api_key, openrouter_api_key, force=request.force
         )
-        
-    except HTTPException:
-        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return BatchResponse(**batch.to_dict())
+
+
+@router.get("/batches/{batch_id}", response_model=BatchResponse)
+async def get_batch(batch_id: str):
+    """
+    Get aggregate and per-episode progress of a batch.
+    """
+    batch = batch_manager.get(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    return BatchResponse(**batch.to_dict())
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    """
+    Get the state of a processing job, including its result once completed.
+    """
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return JobStatusResponse(**job.to_dict())
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Stream a job's progress as server-sent events.
+    
+    Events: `status`, `stage` (started/completed with timings), `progress`
+    (transcription chunks done/total), `partial` (metadata, transcript and
+    each summary as soon as they exist), then `completed` or `failed`.
+    """
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_stream():
+        async for event in job.stream_events():
+            if event is None:
+                # Keep-alive comment so idle proxies don't drop the connection
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+
+@router.get("/checkpoints")
+async def get_checkpoints(url: str = Query(..., min_length=1)):
+    """
+    Per-stage status of an episode's last unfinished run.
+    
+    Stages (`audio`, `transcript`, `summary`, `summary_type_2`, `save`) are
+    `completed` or `failed` (with the error). A resubmission resumes at the
+    first stage that is not completed. Empty once the episode is saved.
+    """
+    podcast_url = normalize_podcast_url(url)
+    try:
+        stages = await run_db(get_checkpoint_status, podcast_url)
     except Exception as e:
-        logger.error(f"Error processing podcast: {str(e)}")
+        logger.error(f"Error reading checkpoints: {str(e)}")
         raise HTTPException(
             status_code=500,
-            detail=f"Error processing podcast: {str(e)}"
+            detail=f"Error reading checkpoints: {str(e)}"
         )
-    finally:
-        # Clean up audio file
-        if audio_file_path and os.path.exists(audio_file_path):
-            try:
-                os.unlink(audio_file_path)
-                logger.info(f"Cleaned up temporary audio file: {audio_file_path}")
-            except Exception as e:
-                logger.warning(f"Failed to clean up audio file: {str(e)}")
+    
+    return {'podcast_url': podcast_url, 'stages': stages}
 
 
 @router.get("/summaries", response_model=SummariesListResponse)
-async def get_summaries():
+async def get_summaries(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
     """
-    Get all saved summaries, most recent first.
+    List saved summaries, most recent first, one page at a time.
+    
+    Items carry only card fields (title, URL, duration, excerpt); fetch
+    /api/summaries/{id} for the full summaries and transcript.
     """
     try:
-        summaries = get_all_summaries(limit=100)
-        return SummariesListResponse(summaries=summaries)
+        summaries, next_cursor = await run_db(list_summaries, limit=limit, cursor=cursor)
+        return SummariesListResponse(summaries=summaries, next_cursor=next_cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error retrieving summaries: {str(e)}")
         raise HTTPException(
@@ -134,13 +368,56 @@ async def get_summaries():
         )
 
 
+@router.get("/search", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    """
+    Full-text search over titles, transcripts and summaries, ranked by BM25.
+    """
+    try:
+        results, next_offset = await run_db(search_summaries, q, limit=limit, offset=offset)
+        return SearchResponse(results=results, next_offset=next_offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error searching summaries: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error searching summaries: {str(e)}"
+        )
+
+
 @router.get("/summaries/{summary_id}", response_model=PodcastResponse)
-async def get_summary(summary_id: int):
+async def get_summary(
+    summary_id: int,
+    request: Request,
+    include: Optional[str] = Query(None, description="Comma-separated extra fields, e.g. 'transcript'")
+):
     """
     Get a specific summary by ID.
+    
+    The transcript is left out (null) unless `include=transcript` is
+    given; it can also be fetched on its own from
+    /api/summaries/{id}/transcript.
+    
+    Without extra fields the response is precomputed at save time: it is
+    served as stored (gzip/brotli when accepted) with an ETag, and
+    If-None-Match gets a 304.
     """
+    fields = {field.strip() for field in (include or '').split(',') if field.strip()}
     try:
-        summary = get_summary_by_id(summary_id)
+        if not fields:
+            cached = await run_db(get_summary_response, summary_id)
+            if not cached:
+                raise HTTPException(status_code=404, detail="Summary not found")
+            return precomputed_response(request, cached)
+        
+        summary = await run_db(
+            get_summary_by_id, summary_id, include_transcript='transcript' in fields
+        )
         if not summary:
             raise HTTPException(status_code=404, detail="Summary not found")
         
@@ -148,6 +425,7 @@ async def get_summary(summary_id: int):
             transcript=summary['transcript'],
             summary=summary['summary_type_1'],
             summary_type_2=summary.get('summary_type_2'),
+            preview=summary.get('summary_preview'),
             metadata=summary.get('metadata', {}),
             summary_id=summary['id']
         )
@@ -160,3 +438,73 @@ async def get_summary(summary_id: int):
             detail=f"Error retrieving summary: {str(e)}"
         )
 
+
+@router.get("/summaries/{summary_id}/transcript")
+async def get_summary_transcript(summary_id: int):
+    """
+    Get the full transcript of a summary.
+    """
+    try:
+        transcript = await run_db(get_transcript, summary_id)
+        if transcript is None:
+            raise HTTPException(status_code=404, detail="Transcript not found")
+        
+        return {'summary_id': summary_id, 'transcript': transcript}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrieving transcript: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving transcript: {str(e)}"
+        )
+
+
+@router.get("/summaries/{summary_id}/segments")
+async def get_summary_segments(
+    summary_id: int,
+    start: float = Query(0.0, ge=0, description="Range start, in seconds"),
+    end: Optional[float] = Query(None, gt=0, description="Range end, in seconds (default: end of episode)")
+):
+    """
+    Get the timestamped transcript segments overlapping [start, end).
+    
+    Only the requested slice is read from storage, so asking for 30
+    seconds of a three-hour episode costs the same as for a short one.
+    Summaries saved before segments were stored have none (404).
+    """
+    if end is not None and end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    
+    try:
+        result = await run_db(get_transcript_segments, summary_id, start, end)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Timestamped segments not found")
+        
+        return {'summary_id': summary_id, 'start': start, 'end': end, **result}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrieving segments: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving segments: {str(e)}"
+        )
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Hit/miss counters and size of the audio-to-transcript and LLM response caches.
+    """
+    try:
+        return {
+            'transcript_cache': await run_db(transcript_cache.stats),
+            'llm_cache': await run_db(llm_cache.stats),
+        }
+    except Exception as e:
+        logger.error(f"Error reading cache stats: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error reading cache stats: {str(e)}"
+        )
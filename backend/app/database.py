@@ -1,159 +1,887 @@
 import sqlite3
 import os
+import re
+import json
+import gzip
+import zlib
+import base64
+import hashlib
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Any, Callable, List, Dict, Optional, Tuple
 import logging
 
+from app.services.metrics import DB_QUERY_SECONDS
+from app.services.segments import SegmentIndex, pack_segments
+
 logger = logging.getLogger(__name__)
 
 # Use persistent volume path if available (Fly.io), otherwise use local path
 # For now, using /tmp which persists with machine lifecycle
 # TODO: Attach volumes properly for long-term persistence
-if os.path.exists('/data'):
+if os.getenv("DB_PATH"):
+    DB_PATH = os.getenv("DB_PATH")
+elif os.path.exists('/data'):
     DB_PATH = '/data/podcast_summaries.db'
 else:
     # Use /tmp on Fly.io for persistence across restarts (within same machine)
     DB_PATH = '/tmp/podcast_summaries.db'
 
+# Page cache per connection, in KiB (negative cache_size means KiB to SQLite)
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))
+
+# Memory-mapped I/O window; reads of hot pages skip the read() syscall
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(64 * 1024 * 1024)))
+
+# How long a writer waits for another writer before giving up
+DB_BUSY_TIMEOUT_SECONDS = float(os.getenv("DB_BUSY_TIMEOUT_SECONDS", "30"))
+
+# Threads (and so connections) serving async callers
+DB_THREADS = int(os.getenv("DB_THREADS", "4"))
+
+# Compiled statements kept per connection; every query below is a fixed
+# SQL string, so each is prepared once per connection and then reused
+DB_STATEMENT_CACHE_SIZE = 128
+
+# Compression level for stored transcripts (zstd or zlib)
+TRANSCRIPT_COMPRESSION_LEVEL = int(os.getenv("TRANSCRIPT_COMPRESSION_LEVEL", "9"))
+
+# Transcripts are stored compressed; zstd is used when installed, zlib otherwise
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+TRANSCRIPT_CODEC = 'zstd' if zstandard is not None else 'zlib'
+
+# Precomputed summary responses also get a brotli body when brotli is installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+_local = threading.local()
+_db_executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix='db')
+
+
+def _open_connection(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        path,
+        timeout=DB_BUSY_TIMEOUT_SECONDS,
+        cached_statements=DB_STATEMENT_CACHE_SIZE
+    )
+    conn.row_factory = sqlite3.Row
+    # WAL lets readers proceed while a job is writing
+    conn.execute('PRAGMA journal_mode=WAL')
+    # Durable at checkpoints; safe with WAL and much cheaper than FULL
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA cache_size=-{DB_CACHE_SIZE_KB}')
+    conn.execute(f'PRAGMA mmap_size={DB_MMAP_SIZE}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    # Lets SQL (the search index's content view) read compressed transcripts
+    conn.create_function('decompress_text', 2, decompress_text, deterministic=True)
+    return conn
+
+
+def compress_text(text: str) -> Tuple[str, bytes]:
+    """Compress text for storage. Returns (codec, blob)."""
+    raw = text.encode('utf-8')
+    if TRANSCRIPT_CODEC == 'zstd':
+        return 'zstd', zstandard.ZstdCompressor(level=TRANSCRIPT_COMPRESSION_LEVEL).compress(raw)
+    return 'zlib', zlib.compress(raw, TRANSCRIPT_COMPRESSION_LEVEL)
+
+
+def decompress_text(codec: Optional[str], blob: Optional[bytes]) -> Optional[str]:
+    """Inverse of compress_text; None stays None."""
+    if blob is None:
+        return None
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Transcript is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(blob).decode('utf-8')
+    if codec == 'zlib':
+        return zlib.decompress(blob).decode('utf-8')
+    raise ValueError(f"Unknown transcript codec: {codec}")
+
+
+def get_connection(path: Optional[str] = None) -> sqlite3.Connection:
+    """
+    Return this thread's connection to the database at `path` (the
+    summaries database by default).
+
+    Connections are opened once per thread and reused, so the pool is
+    effectively the set of threads that touch the database (the DB
+    executor plus pipeline workers).
+    """
+    path = path or DB_PATH
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(path)
+    if conn is None:
+        conn = connections[path] = _open_connection(path)
+    return conn
+
+
+async def run_db(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking database function on the DB thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _db_executor,
+        functools.partial(_timed_db_call, func, args, kwargs)
+    )
+
+
+def _timed_db_call(func: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+    # Timed on the DB thread, so it measures the query and not the wait for a thread
+    with DB_QUERY_SECONDS.time(operation=getattr(func, '__name__', 'unknown')):
+        return func(*args, **kwargs)
+
+
+# Length of the stored plain-text excerpt shown on overview cards
+EXCERPT_LENGTH = 200
+
+
+def make_excerpt(text: Optional[str], length: int = EXCERPT_LENGTH) -> str:
+    """Plain-text opening of a summary, with markdown stripped, cut at a word boundary."""
+    if not text:
+        return ''
+    plain = re.sub(r'[#*_`>|]+', ' ', text)
+    plain = re.sub(r'^\s*[-+]\s+', ' ', plain, flags=re.MULTILINE)
+    plain = re.sub(r'\s+', ' ', plain).strip()
+    if len(plain) <= length:
+        return plain
+    return plain[:length].rsplit(' ', 1)[0] + '…'
+
+
+def encode_cursor(created_at: str, summary_id: int) -> str:
+    """Opaque keyset cursor for the summaries listing."""
+    raw = json.dumps([created_at, summary_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Inverse of encode_cursor; raises ValueError on malformed input."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, summary_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(created_at), int(summary_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _parse_metadata(raw: Optional[str]) -> Dict:
+    if not raw:
+        return {}
+    try:
+        return json.loads(raw)
+    except (TypeError, ValueError):
+        return {}
+
+
+CREATE_SUMMARIES_SQL = '''
+    CREATE TABLE IF NOT EXISTS summaries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        podcast_url TEXT NOT NULL,
+        podcast_title TEXT,
+        transcript TEXT NOT NULL,
+        summary_type_1 TEXT NOT NULL,
+        summary_type_2 TEXT,
+        metadata TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(podcast_url)
+    )
+'''
+
+# Columns added after the original schema, created on startup if missing
+SUMMARIES_MIGRATION_COLUMNS = {
+    'excerpt': 'TEXT',
+    'duration': 'INTEGER',
+    'has_summary_type_2': 'INTEGER NOT NULL DEFAULT 0',
+    'summary_preview': 'TEXT',
+}
+
+# Covering index for the overview listing: keyset order on (created_at, id)
+# plus every projected column, so listing never touches the wide table rows
+CREATE_SUMMARIES_LIST_INDEX_SQL = '''
+    CREATE INDEX IF NOT EXISTS idx_summaries_created_at_id
+    ON summaries(created_at, id, podcast_title, podcast_url, duration, has_summary_type_2, excerpt)
+'''
+
+# Transcripts live compressed in a side table, one row per summary, and are
+# only read when asked for. summaries.transcript is kept empty.
+CREATE_TRANSCRIPTS_SQL = '''
+    CREATE TABLE IF NOT EXISTS transcripts (
+        summary_id INTEGER PRIMARY KEY REFERENCES summaries(id) ON DELETE CASCADE,
+        codec TEXT NOT NULL,
+        raw_size INTEGER NOT NULL,
+        data BLOB NOT NULL
+    )
+'''
+
+UPSERT_TRANSCRIPT_SQL = '''
+    INSERT INTO transcripts (summary_id, codec, raw_size, data)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(summary_id) DO UPDATE SET
+        codec = excluded.codec,
+        raw_size = excluded.raw_size,
+        data = excluded.data
+'''
+
+SELECT_TRANSCRIPT_SQL = 'SELECT codec, data FROM transcripts WHERE summary_id = ?'
+
+# Timed transcript segments in packed columnar form (see services/segments.py).
+# Text is kept uncompressed so a time range can be read with substr() alone.
+CREATE_TRANSCRIPT_SEGMENTS_SQL = '''
+    CREATE TABLE IF NOT EXISTS transcript_segments (
+        summary_id INTEGER PRIMARY KEY REFERENCES summaries(id) ON DELETE CASCADE,
+        segment_count INTEGER NOT NULL,
+        starts BLOB NOT NULL,
+        ends BLOB NOT NULL,
+        offsets BLOB NOT NULL,
+        text BLOB NOT NULL
+    )
+'''
+
+UPSERT_TRANSCRIPT_SEGMENTS_SQL = '''
+    INSERT INTO transcript_segments (summary_id, segment_count, starts, ends, offsets, text)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(summary_id) DO UPDATE SET
+        segment_count = excluded.segment_count,
+        starts = excluded.starts,
+        ends = excluded.ends,
+        offsets = excluded.offsets,
+        text = excluded.text
+'''
+
+SELECT_SEGMENT_INDEX_SQL = '''
+    SELECT starts, ends, offsets FROM transcript_segments WHERE summary_id = ?
+'''
+
+# substr() on a BLOB counts bytes, from 1
+SELECT_SEGMENT_TEXT_SQL = '''
+    SELECT substr(text, ?, ?) FROM transcript_segments WHERE summary_id = ?
+'''
+
+# Serialized /api/summaries/{id} responses, computed when a summary is saved
+# so reads are served without touching the summary row or pydantic.
+CREATE_SUMMARY_RESPONSES_SQL = '''
+    CREATE TABLE IF NOT EXISTS summary_responses (
+        summary_id INTEGER PRIMARY KEY REFERENCES summaries(id) ON DELETE CASCADE,
+        etag TEXT NOT NULL,
+        body BLOB NOT NULL,
+        body_gzip BLOB NOT NULL,
+        body_br BLOB
+    )
+'''
+
+UPSERT_SUMMARY_RESPONSE_SQL = '''
+    INSERT INTO summary_responses (summary_id, etag, body, body_gzip, body_br)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(summary_id) DO UPDATE SET
+        etag = excluded.etag,
+        body = excluded.body,
+        body_gzip = excluded.body_gzip,
+        body_br = excluded.body_br
+'''
+
+SELECT_SUMMARY_RESPONSE_SQL = '''
+    SELECT etag, body, body_gzip, body_br FROM summary_responses WHERE summary_id = ?
+'''
+
+# Full-text search. The FTS5 index is external-content: it stores only the
+# index and reads text for snippets back through the summary_documents view,
+# which decompresses transcripts on demand.
+SUMMARY_DOCUMENTS_VIEW_BODY = '''
+    SELECT s.id AS id, s.podcast_title AS podcast_title,
+           decompress_text(t.codec, t.data) AS transcript,
+           s.summary_type_1 AS summary_type_1, s.summary_type_2 AS summary_type_2
+    FROM summaries s
+    LEFT JOIN transcripts t ON t.summary_id = s.id
+'''
+
+CREATE_SUMMARIES_FTS_SQL = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS summaries_fts USING fts5(
+        podcast_title,
+        transcript,
+        summary_type_1,
+        summary_type_2,
+        content='summary_documents',
+        content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+'''
+
+SELECT_DOCUMENT_SQL = '''
+    SELECT id, podcast_title, transcript, summary_type_1, summary_type_2
+    FROM summary_documents
+    WHERE id = ?
+'''
+
+FTS_DELETE_SQL = '''
+    INSERT INTO summaries_fts (summaries_fts, rowid, podcast_title, transcript, summary_type_1, summary_type_2)
+    VALUES ('delete', ?, ?, ?, ?, ?)
+'''
+
+FTS_INSERT_SQL = '''
+    INSERT INTO summaries_fts (rowid, podcast_title, transcript, summary_type_1, summary_type_2)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+# Column weights for BM25: title matches count most, then summaries, then transcript.
+# Ranking only reads the index; snippet() has to read each document through
+# the decompressing view, so it is computed afterwards, for the page alone
+# (CROSS JOIN keeps the page as the outer loop). The window count is taken
+# before LIMIT, so it tells whether more pages follow without fetching them.
+SEARCH_SQL = '''
+    WITH ranked AS (
+        SELECT rowid AS id, bm25(summaries_fts, 10.0, 1.0, 3.0, 3.0) AS score
+        FROM summaries_fts
+        WHERE summaries_fts MATCH ?
+    ),
+    page AS (
+        SELECT id, score, count(*) OVER () AS total
+        FROM ranked
+        ORDER BY score
+        LIMIT ? OFFSET ?
+    )
+    SELECT s.id, s.podcast_url, s.podcast_title, s.duration, s.created_at,
+           snippet(summaries_fts, -1, '<mark>', '</mark>', '…', 24) AS snippet,
+           page.score AS score, page.total AS total
+    FROM page
+    CROSS JOIN summaries_fts ON summaries_fts.rowid = page.id
+    JOIN summaries s ON s.id = page.id
+    WHERE summaries_fts MATCH ?
+    ORDER BY page.score
+'''
+
+# Upsert so a refreshed episode keeps its ID (and any links to it)
+UPSERT_SUMMARY_SQL = '''
+    INSERT INTO summaries
+    (podcast_url, podcast_title, transcript, summary_type_1, summary_type_2, metadata,
+     excerpt, duration, has_summary_type_2, summary_preview)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(podcast_url) DO UPDATE SET
+        podcast_title = excluded.podcast_title,
+        transcript = excluded.transcript,
+        summary_type_1 = excluded.summary_type_1,
+        summary_type_2 = excluded.summary_type_2,
+        metadata = excluded.metadata,
+        excerpt = excluded.excerpt,
+        duration = excluded.duration,
+        has_summary_type_2 = excluded.has_summary_type_2,
+        summary_preview = excluded.summary_preview,
+        created_at = CURRENT_TIMESTAMP
+'''
+
+SELECT_ID_BY_URL_SQL = 'SELECT id FROM summaries WHERE podcast_url = ?'
+
+LIST_SUMMARIES_SQL = '''
+    SELECT id, podcast_url, podcast_title, excerpt, duration, has_summary_type_2, created_at
+    FROM summaries INDEXED BY idx_summaries_created_at_id
+    ORDER BY created_at DESC, id DESC
+    LIMIT ?
+'''
+
+LIST_SUMMARIES_AFTER_SQL = '''
+    SELECT id, podcast_url, podcast_title, excerpt, duration, has_summary_type_2, created_at
+    FROM summaries INDEXED BY idx_summaries_created_at_id
+    WHERE (created_at, id) < (?, ?)
+    ORDER BY created_at DESC, id DESC
+    LIMIT ?
+'''
+
+# Outputs of finished pipeline stages per episode, so a failed or
+# interrupted run resumes at the first incomplete stage. Data is compressed
+# JSON; rows are removed once the episode is saved without fallbacks.
+CREATE_PIPELINE_CHECKPOINTS_SQL = '''
+    CREATE TABLE IF NOT EXISTS pipeline_checkpoints (
+        podcast_url TEXT NOT NULL,
+        stage TEXT NOT NULL,
+        status TEXT NOT NULL,
+        codec TEXT,
+        data BLOB,
+        error TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (podcast_url, stage)
+    )
+'''
+
+UPSERT_CHECKPOINT_SQL = '''
+    INSERT INTO pipeline_checkpoints (podcast_url, stage, status, codec, data, error)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(podcast_url, stage) DO UPDATE SET
+        status = excluded.status,
+        codec = excluded.codec,
+        data = excluded.data,
+        error = excluded.error,
+        updated_at = CURRENT_TIMESTAMP
+'''
+
+# A failure never overwrites a stage that already completed
+MARK_CHECKPOINT_FAILED_SQL = '''
+    INSERT INTO pipeline_checkpoints (podcast_url, stage, status, error)
+    VALUES (?, ?, 'failed', ?)
+    ON CONFLICT(podcast_url, stage) DO UPDATE SET
+        status = excluded.status,
+        error = excluded.error,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE status != 'completed'
+'''
+
+SELECT_SUMMARY_BY_ID_SQL = '''
+    SELECT id, podcast_url, podcast_title, summary_type_1,
+           summary_type_2, summary_preview, metadata, created_at
+    FROM summaries
+    WHERE id = ?
+'''
+
 
 def init_db():
     """Initialize the database with required tables."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS summaries (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            podcast_url TEXT NOT NULL,
-            podcast_title TEXT,
-            transcript TEXT NOT NULL,
-            summary_type_1 TEXT NOT NULL,
-            summary_type_2 TEXT,
-            metadata TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(podcast_url)
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
+    conn = get_connection()
+
+    with conn:
+        conn.execute(CREATE_SUMMARIES_SQL)
+        _migrate_summaries(conn)
+        conn.execute(CREATE_SUMMARIES_LIST_INDEX_SQL)
+        conn.execute(CREATE_TRANSCRIPTS_SQL)
+        conn.execute(CREATE_TRANSCRIPT_SEGMENTS_SQL)
+        conn.execute(CREATE_SUMMARY_RESPONSES_SQL)
+        conn.execute(CREATE_PIPELINE_CHECKPOINTS_SQL)
+        moved = _migrate_inline_transcripts(conn)
+        _init_search_index(conn)
+
+    if moved:
+        # Give the space of the old inline transcripts back to the filesystem
+        conn.execute('VACUUM')
+
     logger.info("Database initialized successfully")
 
 
+def _migrate_summaries(conn: sqlite3.Connection):
+    """Add columns introduced after the original schema and backfill them."""
+    existing = {row['name'] for row in conn.execute('PRAGMA table_info(summaries)')}
+    added = [name for name in SUMMARIES_MIGRATION_COLUMNS if name not in existing]
+
+    for name in added:
+        conn.execute(f'ALTER TABLE summaries ADD COLUMN {name} {SUMMARIES_MIGRATION_COLUMNS[name]}')
+
+    if 'excerpt' in added:
+        rows = conn.execute(
+            'SELECT id, summary_type_1, summary_type_2, metadata FROM summaries'
+        ).fetchall()
+        for row in rows:
+            conn.execute(
+                'UPDATE summaries SET excerpt = ?, duration = ?, has_summary_type_2 = ? WHERE id = ?',
+                (
+                    make_excerpt(row['summary_type_1']),
+                    _parse_metadata(row['metadata']).get('duration'),
+                    1 if row['summary_type_2'] else 0,
+                    row['id'],
+                )
+            )
+        logger.info(f"Backfilled list columns for {len(rows)} summaries")
+
+
+def _migrate_inline_transcripts(conn: sqlite3.Connection) -> int:
+    """Move transcripts still stored inline in summaries into the compressed table."""
+    rows = conn.execute(
+        "SELECT id, transcript FROM summaries WHERE transcript != ''"
+    ).fetchall()
+    if not rows:
+        return 0
+
+    for row in rows:
+        codec, blob = compress_text(row['transcript'])
+        conn.execute(UPSERT_TRANSCRIPT_SQL, (row['id'], codec, len(row['transcript']), blob))
+        conn.execute("UPDATE summaries SET transcript = '' WHERE id = ?", (row['id'],))
+
+    logger.info(f"Moved {len(rows)} inline transcripts to compressed storage")
+    return len(rows)
+
+
+def _init_search_index(conn: sqlite3.Connection):
+    """Create the FTS5 index, building it from existing rows the first time."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'summaries_fts'"
+    ).fetchone()
+
+    # Recreated every start so the view always matches the current storage layout
+    conn.execute('DROP VIEW IF EXISTS summary_documents')
+    conn.execute(f'CREATE VIEW summary_documents AS {SUMMARY_DOCUMENTS_VIEW_BODY}')
+    conn.execute(CREATE_SUMMARIES_FTS_SQL)
+
+    if not exists:
+        conn.execute("INSERT INTO summaries_fts (summaries_fts) VALUES ('rebuild')")
+        logger.info("Built full-text search index")
+
+
+def _index_document(conn: sqlite3.Connection, summary_id: int, previous: Optional[sqlite3.Row]):
+    """Replace a summary's entry in the search index (within the caller's transaction)."""
+    if previous is not None:
+        conn.execute(FTS_DELETE_SQL, tuple(previous))
+
+    current = conn.execute(SELECT_DOCUMENT_SQL, (summary_id,)).fetchone()
+    conn.execute(FTS_INSERT_SQL, tuple(current))
+
+
 def save_summary(
     podcast_url: str,
     transcript: str,
     summary_type_1: str,
     summary_type_2: Optional[str] = None,
     metadata: Optional[Dict] = None,
-    podcast_title: Optional[str] = None
+    podcast_title: Optional[str] = None,
+    summary_preview: Optional[str] = None,
+    segments: Optional[List[Dict]] = None
 ) -> int:
-    """Save a summary to the database. Returns the summary ID."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
+    """
+    Save a summary to the database. Returns the summary ID.
+
+    `segments` are the timed transcript segments; when given they replace
+    any stored for the episode, when None the stored ones are dropped.
+    """
+    conn = get_connection()
+
     # Convert metadata dict to JSON string
-    metadata_str = None
-    if metadata:
-        import json
-        metadata_str = json.dumps(metadata)
-    
-    try:
-        cursor.execute('''
-            INSERT OR REPLACE INTO summaries 
-            (podcast_url, podcast_title, transcript, summary_type_1, summary_type_2, metadata)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (podcast_url, podcast_title, transcript, summary_type_1, summary_type_2, metadata_str))
-        
-        summary_id = cursor.lastrowid
-        conn.commit()
-        logger.info(f"Summary saved with ID: {summary_id}")
-        return summary_id
-    finally:
-        conn.close()
-
-
-def get_all_summaries(limit: int = 50) -> List[Dict]:
-    """Retrieve all summaries, most recent first."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT id, podcast_url, podcast_title, summary_type_1, summary_type_2, 
-               metadata, created_at
-        FROM summaries
-        ORDER BY created_at DESC
-        LIMIT ?
-    ''', (limit,))
-    
-    rows = cursor.fetchall()
-    conn.close()
-    
+    metadata_str = json.dumps(metadata) if metadata else None
+
+    duration = (metadata or {}).get('duration')
+
+    # Compressed and packed before the write lock is taken
+    codec, blob = compress_text(transcript)
+    packed = pack_segments(segments) if segments else None
+
+    with conn:
+        # Take the write lock up front. A deferred transaction that reads
+        # first has to upgrade its lock to write, and if another connection
+        # is writing the upgrade fails with SQLITE_BUSY at once instead of
+        # waiting out the busy timeout.
+        conn.execute('BEGIN IMMEDIATE')
+
+        # External-content FTS needs the old text to remove the old index entry
+        existing = conn.execute(SELECT_ID_BY_URL_SQL, (podcast_url,)).fetchone()
+        previous = conn.execute(SELECT_DOCUMENT_SQL, (existing['id'],)).fetchone() if existing else None
+
+        conn.execute(
+            UPSERT_SUMMARY_SQL,
+            (
+                podcast_url, podcast_title, '', summary_type_1, summary_type_2, metadata_str,
+                make_excerpt(summary_type_1),
+                int(duration) if duration else None,
+                1 if summary_type_2 else 0,
+                summary_preview,
+            )
+        )
+        summary_id = conn.execute(SELECT_ID_BY_URL_SQL, (podcast_url,)).fetchone()[0]
+
+        conn.execute(UPSERT_TRANSCRIPT_SQL, (summary_id, codec, len(transcript), blob))
+
+        if packed:
+            conn.execute(
+                UPSERT_TRANSCRIPT_SEGMENTS_SQL,
+                (summary_id, len(segments), packed['starts'], packed['ends'], packed['offsets'], packed['text'])
+            )
+        else:
+            # Stale segments would no longer match the new transcript
+            conn.execute('DELETE FROM transcript_segments WHERE summary_id = ?', (summary_id,))
+
+        _index_document(conn, summary_id, previous)
+        _store_summary_response(conn, summary_id)
+
+    logger.info(f"Summary saved with ID: {summary_id}")
+    return summary_id
+
+
+def list_summaries(limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    List summaries, most recent first, using keyset pagination.
+
+    Only the lightweight card fields are returned (no transcript or
+    summary bodies); they are all served from the covering index.
+
+    Args:
+        limit: Maximum number of items to return
+        cursor: Cursor from a previous page, or None for the first page
+
+    Returns:
+        Tuple of (items, cursor for the next page or None if this is the last)
+    """
+    conn = get_connection()
+
+    # Fetch one extra row to know whether another page exists
+    if cursor:
+        created_at, summary_id = decode_cursor(cursor)
+        rows = conn.execute(LIST_SUMMARIES_AFTER_SQL, (created_at, summary_id, limit + 1)).fetchall()
+    else:
+        rows = conn.execute(LIST_SUMMARIES_SQL, (limit + 1,)).fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
     summaries = []
     for row in rows:
-        summary = {
+        summaries.append({
             'id': row['id'],
             'podcast_url': row['podcast_url'],
             'podcast_title': row['podcast_title'],
-            'summary_type_1': row['summary_type_1'],
-            'summary_type_2': row['summary_type_2'],
+            'excerpt': row['excerpt'] or '',
+            'duration': row['duration'],
+            'has_summary_type_2': bool(row['has_summary_type_2']),
             'created_at': row['created_at'],
-        }
-        
-        # Parse metadata if it exists
-        if row['metadata']:
-            import json
-            try:
-                summary['metadata'] = json.loads(row['metadata'])
-            except:
-                summary['metadata'] = {}
-        else:
-            summary['metadata'] = {}
-            
-        summaries.append(summary)
-    
-    return summaries
+        })
 
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['id'])
+
+    return summaries, next_cursor
+
+
+def get_summary_by_id(summary_id: int, include_transcript: bool = False) -> Optional[Dict]:
+    """
+    Retrieve a specific summary by ID.
+
+    The transcript is only read and decompressed when `include_transcript`
+    is set; otherwise the 'transcript' key is None.
+    """
+    row = get_connection().execute(SELECT_SUMMARY_BY_ID_SQL, (summary_id,)).fetchone()
 
-def get_summary_by_id(summary_id: int) -> Optional[Dict]:
-    """Retrieve a specific summary by ID."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT id, podcast_url, podcast_title, transcript, summary_type_1, 
-               summary_type_2, metadata, created_at
-        FROM summaries
-        WHERE id = ?
-    ''', (summary_id,))
-    
-    row = cursor.fetchone()
-    conn.close()
-    
     if not row:
         return None
-    
-    summary = {
+
+    return {
         'id': row['id'],
         'podcast_url': row['podcast_url'],
         'podcast_title': row['podcast_title'],
-        'transcript': row['transcript'],
+        'transcript': get_transcript(summary_id) if include_transcript else None,
         'summary_type_1': row['summary_type_1'],
         'summary_type_2': row['summary_type_2'],
+        'summary_preview': row['summary_preview'],
         'created_at': row['created_at'],
+        'metadata': _parse_metadata(row['metadata']),
     }
-    
-    # Parse metadata
-    if row['metadata']:
-        import json
-        try:
-            summary['metadata'] = json.loads(row['metadata'])
-        except:
-            summary['metadata'] = {}
-    else:
-        summary['metadata'] = {}
-    
-    return summary
 
+
+def get_summary_by_url(podcast_url: str, include_transcript: bool = False) -> Optional[Dict]:
+    """Retrieve a summary by its (normalized) podcast URL."""
+    row = get_connection().execute(SELECT_ID_BY_URL_SQL, (podcast_url,)).fetchone()
+
+    if not row:
+        return None
+
+    return get_summary_by_id(row['id'], include_transcript=include_transcript)
+
+
+def encode_summary_response(payload: Dict) -> Dict[str, Any]:
+    """
+    Serialize a summary response once, in every encoding we serve.
+
+    The JSON matches what FastAPI would produce for a PodcastResponse, and
+    the ETag is a hash of it, so it only changes when the content does.
+    gzip output is made deterministic (mtime=0) for the same reason.
+    """
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return {
+        'etag': f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        'body': body,
+        'body_gzip': gzip.compress(body, compresslevel=9, mtime=0),
+        'body_br': brotli.compress(body, quality=11) if brotli is not None else None,
+    }
+
+
+def _store_summary_response(conn: sqlite3.Connection, summary_id: int) -> Optional[Dict[str, Any]]:
+    row = conn.execute(SELECT_SUMMARY_BY_ID_SQL, (summary_id,)).fetchone()
+    if not row:
+        return None
+
+    encoded = encode_summary_response({
+        'transcript': None,
+        'summary': row['summary_type_1'],
+        'summary_type_2': row['summary_type_2'],
+        'preview': row['summary_preview'],
+        'metadata': _parse_metadata(row['metadata']),
+        'summary_id': row['id'],
+    })
+    conn.execute(
+        UPSERT_SUMMARY_RESPONSE_SQL,
+        (summary_id, encoded['etag'], encoded['body'], encoded['body_gzip'], encoded['body_br'])
+    )
+    return encoded
+
+
+def get_summary_response(summary_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Get the precomputed response for a summary (etag, body, body_gzip, body_br).
+
+    Summaries saved before responses were precomputed get theirs built
+    and stored on first request.
+    """
+    conn = get_connection()
+    row = conn.execute(SELECT_SUMMARY_RESPONSE_SQL, (summary_id,)).fetchone()
+    if row:
+        return dict(row)
+
+    with conn:
+        return _store_summary_response(conn, summary_id)
+
+
+def get_transcript(summary_id: int) -> Optional[str]:
+    """Read and decompress the transcript for a summary."""
+    row = get_connection().execute(SELECT_TRANSCRIPT_SQL, (summary_id,)).fetchone()
+
+    if not row:
+        return None
+
+    return decompress_text(row['codec'], row['data'])
+
+
+def get_transcript_segments(
+    summary_id: int,
+    start: float = 0.0,
+    end: Optional[float] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Transcript segments overlapping [start, end) seconds.
+
+    Only the packed time arrays and the bytes of the matching segments'
+    text are read; the rest of the transcript is never loaded or decoded.
+
+    Returns:
+        Dict with the segments and the episode's total segment count and
+        duration, or None if the summary has no timed segments
+    """
+    conn = get_connection()
+    row = conn.execute(SELECT_SEGMENT_INDEX_SQL, (summary_id,)).fetchone()
+    if not row:
+        return None
+
+    index = SegmentIndex(row['starts'], row['ends'], row['offsets'])
+    lo, hi = index.find(start, index.duration + 1 if end is None else end)
+
+    segments = []
+    if lo < hi:
+        first, last = index.byte_range(lo, hi)
+        text = conn.execute(SELECT_SEGMENT_TEXT_SQL, (first + 1, last - first, summary_id)).fetchone()[0]
+        segments = index.segments(lo, hi, text)
+
+    return {
+        'segments': segments,
+        'total_segments': len(index),
+        'duration': index.duration,
+    }
+
+
+CHECKPOINT_COMPLETED = 'completed'
+
+
+def save_checkpoint(podcast_url: str, stage: str, data: Dict[str, Any]):
+    """Record a pipeline stage as completed, with its output."""
+    codec, blob = compress_text(json.dumps(data))
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            UPSERT_CHECKPOINT_SQL,
+            (podcast_url, stage, CHECKPOINT_COMPLETED, codec, blob, None)
+        )
+
+
+def mark_checkpoint_failed(podcast_url: str, stage: str, error: str):
+    """Record that a pipeline stage failed, unless it already completed."""
+    conn = get_connection()
+    with conn:
+        conn.execute(MARK_CHECKPOINT_FAILED_SQL, (podcast_url, stage, error[:1000]))
+
+
+def load_checkpoints(podcast_url: str) -> Dict[str, Dict[str, Any]]:
+    """Outputs of the completed pipeline stages of an episode, by stage."""
+    rows = get_connection().execute(
+        'SELECT stage, codec, data FROM pipeline_checkpoints WHERE podcast_url = ? AND status = ?',
+        (podcast_url, CHECKPOINT_COMPLETED)
+    ).fetchall()
+    return {row['stage']: json.loads(decompress_text(row['codec'], row['data'])) for row in rows}
+
+
+def load_stage_checkpoints(stage: str, max_age_seconds: float) -> List[Dict[str, Any]]:
+    """Outputs of one completed stage across episodes, updated within `max_age_seconds`."""
+    rows = get_connection().execute(
+        '''
+        SELECT codec, data FROM pipeline_checkpoints
+        WHERE stage = ? AND status = ? AND updated_at >= datetime('now', ?)
+        ''',
+        (stage, CHECKPOINT_COMPLETED, f'-{int(max_age_seconds)} seconds')
+    ).fetchall()
+    return [json.loads(decompress_text(row['codec'], row['data'])) for row in rows]
+
+
+def get_checkpoint_status(podcast_url: str) -> List[Dict[str, Any]]:
+    """Status of each checkpointed stage of an episode (without the data)."""
+    rows = get_connection().execute(
+        'SELECT stage, status, error, updated_at FROM pipeline_checkpoints WHERE podcast_url = ?',
+        (podcast_url,)
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def clear_checkpoints(podcast_url: str):
+    """Drop all checkpoints of an episode."""
+    conn = get_connection()
+    with conn:
+        conn.execute('DELETE FROM pipeline_checkpoints WHERE podcast_url = ?', (podcast_url,))
+
+
+def _to_match_query(query: str) -> str:
+    """
+    Turn free text into a safe FTS5 query.
+
+    Every term is quoted, so punctuation and FTS syntax in user input can't
+    cause errors; terms are ANDed and the last one matches as a prefix.
+    """
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        raise ValueError("Search query must contain at least one word")
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def search_summaries(query: str, limit: int = 20, offset: int = 0) -> Tuple[List[Dict], Optional[int]]:
+    """
+    Full-text search over titles, transcripts and both summaries.
+
+    Results are ranked with BM25 and carry a snippet with matches wrapped
+    in <mark> tags (the snippet text itself is not HTML-escaped).
+
+    Args:
+        query: Free-text query
+        limit: Maximum number of results
+        offset: Number of results to skip
+
+    Returns:
+        Tuple of (results, offset of the next page or None if this is the last)
+    """
+    match_query = _to_match_query(query)
+    rows = get_connection().execute(
+        SEARCH_SQL,
+        (match_query, limit, offset, match_query)
+    ).fetchall()
+
+    has_more = bool(rows) and offset + limit < rows[0]['total']
+    results = []
+    for row in rows:
+        results.append({
+            'id': row['id'],
+            'podcast_url': row['podcast_url'],
+            'podcast_title': row['podcast_title'],
+            'duration': row['duration'],
+            'created_at': row['created_at'],
+            'snippet': row['snippet'],
+            'score': -row['score'],  # bm25() is lower-is-better; flip for readability
+        })
+
+    return results, (offset + limit if has_more else None)
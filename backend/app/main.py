@@ -1,23 +1,29 @@
-from fastapi import FastAPI
+from dotenv import load_dotenv
+
+# Load environment variables before app modules read their settings
+load_dotenv()
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import router
 from app.database import init_db
+from app.services.job_queue import job_queue
+from app.services.batches import batch_manager
+from app.services.llm_client import llm_client
+from app.services.pipeline import resumable_audio_paths
+from app.services.scratch import sweep_periodically
+from app.services.transcription_backends import warm_up as warm_up_transcription
+from app.services.metrics import render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+import asyncio
 import logging
-from dotenv import load_dotenv
 import os
 
-# Load environment variables
-load_dotenv()
-
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
-# Initialize database
-init_db()
-
 app = FastAPI(
     title="Podcast Transcription API",
     description="API for transcribing and summarizing podcasts",
@@ -42,6 +48,27 @@ app.add_middleware(
 # Include router
 app.include_router(router, prefix="/api")
 
+_background_tasks = []
+
+
+@app.on_event("startup")
+async def startup():
+    # Initialize database (once per process)
+    init_db()
+    # Load a local transcription model in the background so startup isn't blocked
+    asyncio.get_running_loop().run_in_executor(None, warm_up_transcription)
+    # Reclaim scratch files leaked by crashes, now and then periodically
+    _background_tasks.append(asyncio.create_task(sweep_periodically(resumable_audio_paths)))
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    for task in _background_tasks:
+        task.cancel()
+    batch_manager.shutdown()
+    job_queue.shutdown()
+    await llm_client.aclose()
+
 
 @app.get("/")
 async def root():
@@ -50,8 +77,13 @@ async def root():
         "status": "running",
         "endpoints": {
             "process_podcast": "/api/process-podcast",
+            "upload_audio": "/api/upload",
+            "get_job": "/api/jobs/{job_id}",
+            "create_batch": "/api/batches",
+            "get_checkpoints": "/api/checkpoints?url=...",
             "get_summaries": "/api/summaries",
-            "get_summary": "/api/summaries/{id}"
+            "get_summary": "/api/summaries/{id}",
+            "get_segments": "/api/summaries/{id}/segments?start=...&end=..."
         }
     }
 
@@ -60,3 +92,9 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text-format metrics for the pipeline, caches and database."""
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
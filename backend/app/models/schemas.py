@@ -1,15 +1,23 @@
-from pydantic import BaseModel, HttpUrl
-from typing import Optional, List
+import os
+from pydantic import BaseModel, Field, HttpUrl
+from datetime import datetime
+from typing import Dict, Optional, List
+
+# Most episodes a single batch may contain (also enforced by the batch manager)
+BATCH_MAX_EPISODES = int(os.getenv("BATCH_MAX_EPISODES", "1000"))
 
 
 class PodcastRequest(BaseModel):
     url: HttpUrl
+    force: bool = False  # Reprocess even if a stored result exists
+    fresh: bool = False  # Reprocess and sample new summaries, bypassing the LLM response cache
 
 
 class PodcastResponse(BaseModel):
-    transcript: str
+    transcript: Optional[str] = None  # Only included when requested
     summary: str  # Type 1 summary
     summary_type_2: Optional[str] = None  # Type 2 structured summary
+    preview: Optional[str] = None  # Extractive key sentences, available right after transcription
     metadata: Optional[dict] = None
     summary_id: Optional[int] = None  # Database ID
 
@@ -18,12 +26,74 @@ class SummaryListItem(BaseModel):
     id: int
     podcast_url: str
     podcast_title: Optional[str]
-    summary_type_1: str
-    summary_type_2: Optional[str]
+    excerpt: str  # Plain-text opening of the Type 1 summary
+    duration: Optional[int] = None  # Seconds
+    has_summary_type_2: bool = False
     created_at: str
-    metadata: Optional[dict] = None
 
 
 class SummariesListResponse(BaseModel):
     summaries: List[SummaryListItem]
+    next_cursor: Optional[str] = None  # Pass as ?cursor= to get the next page
+
+
+class SearchResultItem(BaseModel):
+    id: int
+    podcast_url: str
+    podcast_title: Optional[str]
+    duration: Optional[int] = None
+    created_at: str
+    snippet: str  # Matched text with <mark> highlights
+    score: float  # BM25 relevance, higher is better
+
+
+class SearchResponse(BaseModel):
+    results: List[SearchResultItem]
+    next_offset: Optional[int] = None  # Pass as ?offset= to get the next page
+
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str  # queued, running, completed or failed
+    cached: bool = False  # True when served from a stored result
+    result: Optional[PodcastResponse] = None  # Set when the job is already completed
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str
+    podcast_url: str
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    result: Optional[PodcastResponse] = None  # Set once the job has completed
+
+
+class BatchRequest(BaseModel):
+    urls: Optional[List[HttpUrl]] = None  # Episode URLs, or...
+    feed_url: Optional[HttpUrl] = None  # ...an RSS/Atom feed to enumerate
+    limit: Optional[int] = Field(None, ge=1, le=BATCH_MAX_EPISODES)  # Only the first N episodes of the feed
+    force: bool = False  # Reprocess episodes that are already stored
+
+
+class BatchItemStatus(BaseModel):
+    url: str
+    title: Optional[str] = None
+    status: str  # pending, queued, running, completed, failed or skipped
+    job_id: Optional[str] = None
+    summary_id: Optional[int] = None
+    error: Optional[str] = None
+
 
+class BatchResponse(BaseModel):
+    batch_id: str
+    status: str  # running or completed
+    source: str
+    total: int
+    counts: Dict[str, int]  # Episodes per status
+    progress: float  # Fraction of episodes finished (completed, failed or skipped)
+    stages: Dict[str, Dict[str, int]]  # Per-stage limit, active and waiting counts
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    items: List[BatchItemStatus]
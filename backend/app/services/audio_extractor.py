@@ -1,43 +1,291 @@
 import os
-import tempfile
+import csv
+import time
+import threading
+import subprocess
 import yt_dlp
-from typing import Tuple
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 import logging
 
+from app.services.stage_limits import stage_limit, stage_slots, STAGE_DOWNLOAD, STAGE_FFMPEG
+from app.services.metrics import FFMPEG_SECONDS, DOWNLOADED_BYTES, ENCODED_BYTES
+from app.services.scratch import ScratchSpace
+
 logger = logging.getLogger(__name__)
 
+# Speech-optimized output: mono 16kHz Opus. Whisper resamples to 16kHz mono
+# anyway, and at 24kbps an hour of audio is ~11MB, well under the upload limit.
+SPEECH_SAMPLE_RATE = 16000
+SPEECH_BITRATE = os.getenv("AUDIO_SPEECH_BITRATE", "24k")
+SPEECH_EXTENSION = '.ogg'
+
+# Protocols ffmpeg can read directly while the download is in progress
+STREAMABLE_PROTOCOLS = {'http', 'https'}
+
+# Length of the chunks handed on while an episode is still downloading.
+# Shorter chunks start transcription sooner but cut mid-sentence more often.
+STREAM_CHUNK_SECONDS = float(os.getenv("STREAM_CHUNK_SECONDS", "180"))
+
+# How often the chunk list ffmpeg writes is checked for finished chunks
+STREAM_POLL_SECONDS = 0.5
+
+# Receives (chunk path, start, end) for each finished chunk
+ChunkCallback = Callable[[str, float, float], None]
+
+
+class StreamStopped(Exception):
+    """Raised on the download thread when the consumer of its chunks has given up."""
+
+
+def speech_encode_args() -> List[str]:
+    """ffmpeg output options for the speech-optimized format."""
+    return [
+        '-vn',
+        '-ac', '1',
+        '-ar', str(SPEECH_SAMPLE_RATE),
+        '-c:a', 'libopus',
+        '-b:a', SPEECH_BITRATE,
+        '-application', 'voip',
+        # The same source must give the same bytes, or the transcript cache
+        # (keyed by the file's hash) never hits: without these the Ogg muxer
+        # picks random stream serial numbers and version strings are embedded
+        '-fflags', '+bitexact',
+        '-flags:a', '+bitexact',
+    ]
+
+
+def _input_args(source: str, http_headers: Optional[Dict[str, str]] = None) -> List[str]:
+    """ffmpeg input options for a local path or HTTP(S) URL."""
+    args = []
+    if source.startswith(('http://', 'https://')):
+        args += ['-reconnect', '1', '-reconnect_streamed', '1', '-reconnect_delay_max', '5']
+        if http_headers:
+            args += ['-headers', ''.join(f"{key}: {value}\r\n" for key, value in http_headers.items())]
+    return args + ['-i', source]
+
+
+def transcode_to_speech(source: str, output_path: str, http_headers: Optional[Dict[str, str]] = None):
+    """
+    Decode any audio source once and encode it to the speech format.
+
+    Args:
+        source: Local path or HTTP(S) URL of the source audio
+        output_path: Where to write the encoded file
+        http_headers: Headers to send when `source` is a URL
+    """
+    command = ['ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'error']
+    command += _input_args(source, http_headers) + speech_encode_args() + ['-y', output_path]
+
+    try:
+        with FFMPEG_SECONDS.time(operation='transcode'):
+            subprocess.run(command, check=True, capture_output=True)
+    except subprocess.CalledProcessError as e:
+        stderr = e.stderr.decode('utf-8', errors='replace').strip() if e.stderr else ''
+        raise Exception(f"ffmpeg failed to transcode audio: {stderr or str(e)}")
+
+
+def _dispatch_chunks(
+    list_path: str,
+    chunk_dir: str,
+    dispatched: int,
+    scratch: ScratchSpace,
+    on_chunk: ChunkCallback
+) -> int:
+    """Hand on chunks newly listed by ffmpeg. Returns how many have been handed on in total."""
+    try:
+        with open(list_path, newline='') as f:
+            text = f.read()
+    except FileNotFoundError:
+        return dispatched
+
+    # A line is only complete once its newline has been written
+    lines = text.split('\n')[:-1]
+    for row in csv.reader(lines[dispatched:]):
+        path = os.path.join(chunk_dir, os.path.basename(row[0]))
+        scratch.adopt(path)
+        on_chunk(path, float(row[1]), float(row[2]))
+        dispatched += 1
+    return dispatched
+
 
-def extract_audio_from_podcast(url: str) -> Tuple[str, dict]:
+def transcode_to_speech_chunks(
+    source: str,
+    output_path: str,
+    scratch: ScratchSpace,
+    on_chunk: ChunkCallback,
+    stages: Sequence[str] = (),
+    http_headers: Optional[Dict[str, str]] = None,
+    stop: Optional[threading.Event] = None
+):
+    """
+    Like transcode_to_speech, also cutting the audio into chunks on the way.
+
+    The same ffmpeg process writes the whole episode and, through its
+    segment muxer, STREAM_CHUNK_SECONDS chunks. Each chunk is handed to
+    `on_chunk(path, start, end)` as soon as ffmpeg has finished it, while
+    the rest is still downloading. `on_chunk` may block to hold the
+    stream back; if it raises, or `stop` is set, ffmpeg is stopped and
+    the error (StreamStopped) propagates.
+
+    The `stages` slots are held only while ffmpeg runs. Chunks are handed
+    on from a separate thread, so a blocked `on_chunk` never keeps a slot
+    the consumer of the chunks may itself be waiting for.
+
+    Args:
+        source: Local path or HTTP(S) URL of the source audio
+        output_path: Where to write the encoded episode
+        scratch: Job scratch space the chunks are written to
+        on_chunk: Called with each finished chunk (path, start and end in seconds)
+        stages: Stage slots to hold while ffmpeg runs
+        http_headers: Headers to send when `source` is a URL
+        stop: Set by the consumer to abandon the download
+    """
+    list_path = scratch.path('stream_chunks.csv')
+    log_path = scratch.path('stream_ffmpeg.log')
+    chunk_pattern = os.path.join(scratch.directory, 'stream_%04d' + SPEECH_EXTENSION)
+
+    command = ['ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'error']
+    command += _input_args(source, http_headers)
+    command += speech_encode_args() + ['-y', output_path]
+    command += speech_encode_args() + [
+        '-f', 'segment',
+        '-segment_time', str(STREAM_CHUNK_SECONDS),
+        '-reset_timestamps', '1',
+        '-segment_list', list_path,
+        '-segment_list_type', 'csv',
+        '-y', chunk_pattern
+    ]
+
+    exited = threading.Event()
+    errors: List[BaseException] = []
+
+    def hand_on(process: subprocess.Popen):
+        dispatched = 0
+        try:
+            while True:
+                if stop is not None and stop.is_set():
+                    raise StreamStopped("Stopped while streaming audio")
+                finished = exited.is_set()
+                if finished and process.returncode != 0:
+                    return
+                dispatched = _dispatch_chunks(list_path, scratch.directory, dispatched, scratch, on_chunk)
+                if finished:
+                    return
+                exited.wait(STREAM_POLL_SECONDS)
+        except BaseException as e:
+            errors.append(e)
+            process.kill()
+
+    try:
+        # stderr goes to a file so a chatty ffmpeg can never block on a full pipe
+        with open(log_path, 'wb') as log:
+            with stage_slots(stages), FFMPEG_SECONDS.time(operation='transcode_chunks'):
+                process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=log)
+                dispatcher = threading.Thread(target=hand_on, args=(process,), name='stream-chunks', daemon=True)
+                dispatcher.start()
+                try:
+                    process.wait()
+                finally:
+                    if process.poll() is None:
+                        process.kill()
+                        process.wait()
+                    exited.set()
+            # The slots are free again while the last chunks wait to be taken
+            dispatcher.join()
+
+        if errors:
+            raise errors[0]
+        if process.returncode != 0:
+            with open(log_path, 'rb') as f:
+                stderr = f.read().decode('utf-8', errors='replace').strip()
+            raise Exception(f"ffmpeg failed to transcode audio: {stderr or process.returncode}")
+    finally:
+        scratch.release(list_path)
+        scratch.release(log_path)
+
+
+def probe_duration(audio_file_path: str) -> float:
+    """Return the duration of an audio file in seconds using ffprobe."""
+    result = subprocess.run([
+        'ffprobe', '-v', 'error',
+        '-show_entries', 'format=duration',
+        '-of', 'default=noprint_wrappers=1:nokey=1',
+        audio_file_path
+    ], check=True, capture_output=True, text=True)
+    return float(result.stdout.strip())
+
+
+def _direct_stream(info: dict) -> Optional[Tuple[str, Dict[str, str]]]:
+    """Return (url, headers) if the selected format is a plain HTTP file ffmpeg can stream."""
+    if info.get('requested_formats'):
+        return None
+
+    stream_url = info.get('url')
+    protocol = info.get('protocol', '')
+    if not stream_url or protocol not in STREAMABLE_PROTOCOLS:
+        return None
+
+    return stream_url, info.get('http_headers') or {}
+
+
+def _metadata_from_info(info: dict) -> dict:
+    return {
+        'title': info.get('title', 'Unknown'),
+        'duration': info.get('duration', 0),
+        'uploader': info.get('uploader', 'Unknown'),
+        'description': info.get('description', ''),
+    }
+
+
+def _encode(
+    source: str,
+    output_path: str,
+    scratch: ScratchSpace,
+    on_chunk: Optional[ChunkCallback],
+    stop: Optional[threading.Event],
+    stages: Sequence[str],
+    http_headers: Optional[Dict[str, str]] = None
+):
+    if on_chunk is None:
+        with stage_slots(stages):
+            transcode_to_speech(source, output_path, http_headers)
+    else:
+        transcode_to_speech_chunks(source, output_path, scratch, on_chunk, stages, http_headers, stop)
+
+
+def extract_audio_from_podcast(
+    url: str,
+    scratch: ScratchSpace,
+    on_chunk: Optional[ChunkCallback] = None,
+    stop: Optional[threading.Event] = None
+) -> Tuple[str, dict]:
     """
     Extract audio from Apple Podcasts URL using yt-dlp.
-    
+
+    yt-dlp only resolves the episode; when the audio is a plain HTTP file
+    ffmpeg reads it directly and encodes to the speech format in a single
+    pass while it downloads. Other sources (fragmented/HLS streams) are
+    downloaded as-is by yt-dlp and then encoded once; their size is
+    added to the job's scratch reservation first.
+
+    With `on_chunk`, the audio is also cut into chunks that are handed on
+    while the episode is still downloading (see transcode_to_speech_chunks).
+
     Args:
         url: Apple Podcasts episode URL
-        
+        scratch: Job scratch space the audio is written to
+        on_chunk: Called with each finished chunk (path, start, end)
+        stop: Set to abandon a chunked download
+
     Returns:
         Tuple of (audio_file_path, metadata_dict)
     """
-    # Create temporary file for audio (without extension - yt-dlp will add it)
-    temp_dir = tempfile.gettempdir()
-    temp_audio = tempfile.NamedTemporaryFile(
-        suffix='',
-        delete=False,
-        dir=temp_dir,
-        prefix='podcast_'
-    )
-    temp_audio.close()
-    
-    # yt-dlp will add .mp3 extension after processing
-    output_path = temp_audio.name + '.mp3'
-    
+    output_path = scratch.path('audio' + SPEECH_EXTENSION)
+    raw_prefix = os.path.join(scratch.directory, 'source')
+    raw_path = None
+
     ydl_opts = {
         'format': 'bestaudio/best',
-        'outtmpl': temp_audio.name + '.%(ext)s',
-        'postprocessors': [{
-            'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-            'preferredquality': '128',  # Lower quality to reduce file size (under 25MB limit)
-        }],
         'quiet': False,
         'no_warnings': False,
         'extract_flat': False,
@@ -50,40 +298,77 @@ def extract_audio_from_podcast(url: str) -> Tuple[str, dict]:
             }
         }
     }
-    
+
     metadata = {}
-    
+
     try:
         logger.info(f"Extracting audio from URL: {url}")
-        
+
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            # Extract info
-            info = ydl.extract_info(url, download=True)
-            
-            # Get metadata
-            metadata = {
-                'title': info.get('title', 'Unknown'),
-                'duration': info.get('duration', 0),
-                'uploader': info.get('uploader', 'Unknown'),
-                'description': info.get('description', ''),
-            }
-            
-            logger.info(f"Successfully extracted audio. Title: {metadata.get('title')}")
-            
+            # Resolve the episode without downloading it
+            info = ydl.extract_info(url, download=False)
+            metadata = _metadata_from_info(info)
+
+        direct = _direct_stream(info)
+        if direct:
+            stream_url, http_headers = direct
+            logger.info("Streaming source audio straight into the speech encoder")
+            # Downloading and encoding happen in the same ffmpeg process
+            _encode(stream_url, output_path, scratch, on_chunk, stop, (STAGE_DOWNLOAD, STAGE_FFMPEG), http_headers)
+            DOWNLOADED_BYTES.inc(info.get('filesize') or info.get('filesize_approx') or 0)
+        else:
+            logger.info("Source is not a plain HTTP file, downloading before encoding")
+            scratch.reserve(info.get('filesize') or info.get('filesize_approx') or 0)
+            download_opts = dict(ydl_opts, outtmpl=raw_prefix + '.%(ext)s')
+            with stage_limit(STAGE_DOWNLOAD):
+                with yt_dlp.YoutubeDL(download_opts) as ydl:
+                    downloaded = ydl.extract_info(url, download=True)
+                    raw_path = ydl.prepare_filename(downloaded)
+            scratch.adopt(raw_path)
+            DOWNLOADED_BYTES.inc(os.path.getsize(raw_path))
+            _encode(raw_path, output_path, scratch, on_chunk, stop, (STAGE_FFMPEG,))
+
+        ENCODED_BYTES.inc(os.path.getsize(output_path))
+        logger.info(f"Successfully extracted audio. Title: {metadata.get('title')}")
+
         return output_path, metadata
-        
+
     except Exception as e:
         # Clean up on error
-        if os.path.exists(temp_audio.name):
-            try:
-                os.unlink(temp_audio.name)
-            except:
-                pass
-        if os.path.exists(output_path):
-            try:
-                os.unlink(output_path)
-            except:
-                pass
+        scratch.release(output_path)
         logger.error(f"Error extracting audio: {str(e)}")
         raise Exception(f"Failed to extract audio from URL: {str(e)}")
+    finally:
+        if raw_path:
+            scratch.release(raw_path)
+
+
+def encode_uploaded_audio(source_path: str, scratch: ScratchSpace, metadata: dict) -> Tuple[str, dict]:
+    """
+    Encode an uploaded audio file to the speech format, like a downloaded episode.
+
+    The upload is deleted once it has been encoded.
+
+    Args:
+        source_path: Uploaded file in the job's scratch space
+        scratch: Job scratch space the encoded audio is written to
+        metadata: Known metadata (title, ...); the duration is filled in
+
+    Returns:
+        Tuple of (audio_file_path, metadata_dict)
+    """
+    output_path = scratch.path('audio' + SPEECH_EXTENSION)
+
+    try:
+        with stage_limit(STAGE_FFMPEG):
+            transcode_to_speech(source_path, output_path)
+        metadata = dict(metadata, duration=int(probe_duration(output_path)))
+    except Exception as e:
+        scratch.release(output_path)
+        logger.error(f"Error encoding uploaded audio: {str(e)}")
+        raise Exception(f"Failed to encode uploaded audio: {str(e)}")
+    finally:
+        scratch.release(source_path)
 
+    ENCODED_BYTES.inc(os.path.getsize(output_path))
+    return output_path, metadata
@@ -0,0 +1,230 @@
+import os
+import uuid
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.database import run_db, get_summary_by_url
+from app.services.job_queue import (
+    job_queue, QueueFullError, JOB_RETENTION_SECONDS, JOB_COMPLETED, JOB_FAILED
+)
+from app.services.pipeline import run_pipeline
+from app.services.extractive import SUMMARY_FALLBACK_KEY
+from app.services.stage_limits import stage_stats
+from app.services.url_utils import normalize_podcast_url
+from app.models.schemas import BATCH_MAX_EPISODES
+
+logger = logging.getLogger(__name__)
+
+# Episodes of one batch handed to the job queue at a time. Keeps a large
+# backfill from filling the queue and starving interactive requests.
+BATCH_WINDOW = int(os.getenv("BATCH_WINDOW", "8"))
+
+# How long to wait before retrying when the job queue is full
+BATCH_QUEUE_RETRY_SECONDS = float(os.getenv("BATCH_QUEUE_RETRY_SECONDS", "5"))
+
+ITEM_PENDING = "pending"
+ITEM_SKIPPED = "skipped"
+
+BATCH_RUNNING = "running"
+BATCH_COMPLETED = "completed"
+
+
+class BatchItem:
+    """One episode of a batch."""
+
+    def __init__(self, url: str, title: Optional[str] = None, source_url: Optional[str] = None):
+        self.url = url
+        self.title = title
+        # Where the audio is fetched from; `url` is the normalized key
+        self.source_url = source_url or url
+        self.status = ITEM_PENDING
+        self.job_id: Optional[str] = None
+        self.summary_id: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def current_status(self) -> str:
+        # While a job runs, its own status is the live one
+        if self.job_id and self.status == ITEM_PENDING:
+            job = job_queue.get(self.job_id)
+            if job:
+                return job.status
+        return self.status
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'title': self.title,
+            'status': self.current_status(),
+            'job_id': self.job_id,
+            'summary_id': self.summary_id,
+            'error': self.error,
+        }
+
+
+class Batch:
+    """A set of episodes ingested together, with aggregate progress."""
+
+    def __init__(self, batch_id: str, source: str, items: List[BatchItem]):
+        self.id = batch_id
+        self.source = source
+        self.items = items
+        self.status = BATCH_RUNNING
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self._finished_monotonic: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        items = [item.to_dict() for item in self.items]
+        counts: Dict[str, int] = {}
+        for item in items:
+            counts[item['status']] = counts.get(item['status'], 0) + 1
+
+        done = sum(counts.get(status, 0) for status in (JOB_COMPLETED, JOB_FAILED, ITEM_SKIPPED))
+        return {
+            'batch_id': self.id,
+            'status': self.status,
+            'source': self.source,
+            'total': len(items),
+            'counts': counts,
+            'progress': done / len(items) if items else 1.0,
+            'stages': stage_stats(),
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+            'items': items,
+        }
+
+
+class BatchManager:
+    """
+    Schedules batches of episodes onto the job queue.
+
+    Each episode becomes an ordinary job (so duplicates coalesce with
+    interactive submissions of the same URL), at most BATCH_WINDOW at a
+    time per batch. Per-stage limits inside the pipeline decide how those
+    jobs overlap.
+    """
+
+    def __init__(self):
+        self._batches: Dict[str, Batch] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def create(
+        self,
+        episodes: List[Dict[str, Optional[str]]],
+        source: str,
+        openai_api_key: str,
+        openrouter_api_key: str,
+        force: bool = False
+    ) -> Batch:
+        """
+        Register a batch and start scheduling it on the running event loop.
+
+        Args:
+            episodes: Dicts with 'url' and optional 'title'
+            source: Where the episodes came from ('urls' or the feed URL)
+            openai_api_key: OpenAI API key for transcription
+            openrouter_api_key: OpenRouter API key for summarization
+            force: Reprocess episodes that are already in the database
+
+        Returns:
+            The new batch
+        """
+        if len(episodes) > BATCH_MAX_EPISODES:
+            raise ValueError(f"A batch can hold at most {BATCH_MAX_EPISODES} episodes")
+
+        self._prune()
+
+        # The same episode listed twice is only processed once
+        items = []
+        seen = set()
+        for episode in episodes:
+            url = normalize_podcast_url(episode['url'])
+            if url in seen:
+                continue
+            seen.add(url)
+            items.append(BatchItem(url, episode.get('title'), episode['url']))
+
+        batch = Batch(uuid.uuid4().hex, source, items)
+        self._batches[batch.id] = batch
+        self._tasks[batch.id] = asyncio.get_running_loop().create_task(
+            self._run(batch, openai_api_key, openrouter_api_key, force)
+        )
+        logger.info(f"Batch {batch.id} created with {len(items)} episodes from {source}")
+        return batch
+
+    def get(self, batch_id: str) -> Optional[Batch]:
+        return self._batches.get(batch_id)
+
+    async def _run(self, batch: Batch, openai_api_key: str, openrouter_api_key: str, force: bool):
+        window = asyncio.Semaphore(BATCH_WINDOW)
+
+        async def run_item(item: BatchItem):
+            async with window:
+                if not force:
+                    existing = await run_db(get_summary_by_url, item.url)
+                    if existing and not existing['metadata'].get(SUMMARY_FALLBACK_KEY):
+                        item.status = ITEM_SKIPPED
+                        item.summary_id = existing['id']
+                        return
+
+                overrides = {'title': item.title}
+                job = await self._submit(
+                    item.url,
+                    lambda job: run_pipeline(
+                        item.url, openai_api_key, openrouter_api_key,
+                        job=job, metadata_overrides=overrides, source_url=item.source_url
+                    )
+                )
+                item.job_id = job.id
+                await job_queue.wait(job)
+
+                item.status = job.status
+                item.error = job.error
+                if job.result:
+                    item.summary_id = job.result.get('summary_id')
+
+        async def run_item_safely(item: BatchItem):
+            # One bad episode must not stop the rest of the batch
+            try:
+                await run_item(item)
+            except Exception as e:
+                item.status = JOB_FAILED
+                item.error = str(e)
+                logger.error(f"Batch {batch.id}: {item.url} failed: {str(e)}")
+
+        try:
+            await asyncio.gather(*(run_item_safely(item) for item in batch.items))
+        finally:
+            batch.status = BATCH_COMPLETED
+            batch.finished_at = datetime.utcnow()
+            batch._finished_monotonic = time.monotonic()
+            self._tasks.pop(batch.id, None)
+            logger.info(f"Batch {batch.id} finished: {batch.to_dict()['counts']}")
+
+    async def _submit(self, url: str, pipeline):
+        while True:
+            try:
+                return job_queue.submit(url, pipeline, key=url)
+            except QueueFullError:
+                await asyncio.sleep(BATCH_QUEUE_RETRY_SECONDS)
+
+    def _prune(self):
+        """Forget finished batches older than the job retention window."""
+        cutoff = time.monotonic() - JOB_RETENTION_SECONDS
+        expired = [
+            batch_id for batch_id, batch in self._batches.items()
+            if batch._finished_monotonic is not None and batch._finished_monotonic < cutoff
+        ]
+        for batch_id in expired:
+            del self._batches[batch_id]
+
+    def shutdown(self):
+        """Stop scheduling further episodes."""
+        for task in list(self._tasks.values()):
+            task.cancel()
+
+
+batch_manager = BatchManager()
@@ -0,0 +1,146 @@
+import time
+import zlib
+import sqlite3
+import threading
+import logging
+from typing import Dict, Optional
+
+from app.database import get_connection
+from app.services.metrics import CACHE_LOOKUPS, CACHE_EVICTIONS
+
+logger = logging.getLogger(__name__)
+
+
+class DiskCache:
+    """
+    Size-bounded, SQLite-backed key/value cache with LRU eviction.
+
+    Values are strings, stored zlib-compressed. When the total stored size
+    goes over `max_bytes` the least recently read entries are evicted.
+    Entries older than `ttl_seconds` (if set) are treated as misses.
+    Hit/miss/eviction counters are kept in memory for the process.
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl_seconds: Optional[float] = None, name: str = "cache"):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = get_connection(self.path)
+        if not self._initialized:
+            with conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS cache_entries (
+                        key TEXT PRIMARY KEY,
+                        value BLOB NOT NULL,
+                        size INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_accessed REAL NOT NULL
+                    )
+                ''')
+                conn.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_cache_entries_last_accessed
+                    ON cache_entries(last_accessed)
+                ''')
+            self._initialized = True
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value for `key`, or None on a miss."""
+        conn = self._connect()
+        row = conn.execute(
+            'SELECT value, created_at FROM cache_entries WHERE key = ?',
+            (key,)
+        ).fetchone()
+
+        now = time.time()
+        if row and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+            with conn:
+                conn.execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+            row = None
+
+        if not row:
+            with self._lock:
+                self.misses += 1
+            CACHE_LOOKUPS.inc(cache=self.name, result='miss')
+            return None
+
+        with conn:
+            conn.execute('UPDATE cache_entries SET last_accessed = ? WHERE key = ?', (now, key))
+        with self._lock:
+            self.hits += 1
+        CACHE_LOOKUPS.inc(cache=self.name, result='hit')
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def peek(self, key: str) -> Optional[str]:
+        """Return the cached value for `key` without counting a lookup or refreshing it."""
+        row = self._connect().execute(
+            'SELECT value, created_at FROM cache_entries WHERE key = ?',
+            (key,)
+        ).fetchone()
+        if not row or (self.ttl_seconds is not None and time.time() - row[1] > self.ttl_seconds):
+            return None
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def set(self, key: str, value: str):
+        """Store `value` under `key`, evicting old entries if over budget."""
+        blob = zlib.compress(value.encode('utf-8'), 6)
+        now = time.time()
+
+        conn = self._connect()
+        with conn:
+            conn.execute('''
+                INSERT INTO cache_entries (key, value, size, created_at, last_accessed)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    value = excluded.value,
+                    size = excluded.size,
+                    created_at = excluded.created_at,
+                    last_accessed = excluded.last_accessed
+            ''', (key, blob, len(blob), now, now))
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM cache_entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = 0
+        rows = conn.execute(
+            'SELECT key, size FROM cache_entries ORDER BY last_accessed ASC'
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+            total -= size
+            evicted += 1
+
+        with self._lock:
+            self.evictions += evicted
+        CACHE_EVICTIONS.inc(evicted, cache=self.name)
+        logger.info(f"{self.name}: evicted {evicted} entries to stay under {self.max_bytes} bytes")
+
+    def stats(self) -> Dict[str, float]:
+        """Counters for this process plus current size on disk."""
+        entries, size = self._connect().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries'
+        ).fetchone()
+
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': entries,
+            'size_bytes': size,
+            'max_bytes': self.max_bytes,
+        }
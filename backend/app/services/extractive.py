@@ -0,0 +1,189 @@
+import os
+import re
+import logging
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Sentences picked for the preview
+PREVIEW_SENTENCES = int(os.getenv("PREVIEW_SENTENCES", "8"))
+
+# Above this many sentences, neighbours are merged into passages so the
+# similarity matrix stays small (N x N floats)
+PREVIEW_MAX_UNITS = int(os.getenv("PREVIEW_MAX_UNITS", "1500"))
+
+# Vocabulary used for TF-IDF: the most widespread terms that occur in at
+# least two sentences; rarer terms cannot link sentences together anyway
+PREVIEW_MAX_TERMS = 4000
+
+# Candidate sentences outside this word range make poor previews
+# (fillers like "Right." or run-on stretches with no punctuation)
+MIN_SENTENCE_WORDS = 8
+MAX_SENTENCE_WORDS = 60
+
+# TextRank settings, as in the original paper
+DAMPING = 0.85
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-6
+
+# Picked sentences more similar than this to an earlier pick are skipped
+REDUNDANCY_THRESHOLD = 0.5
+
+# Stored in summary metadata when an LLM summary could not be generated
+# and the preview stands in for it
+SUMMARY_FALLBACK_KEY = 'summary_fallback'
+
+FALLBACK_NOTICE = (
+    "> The AI summary could not be generated, so these are the key sentences "
+    "extracted from the transcript. Process the episode again to retry."
+)
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each even few for from further
+get got had has have having he her here hers herself him himself his how i if in into is it its
+itself just know like lot me more most my myself no nor not now of off on once only or other our
+ours ourselves out over own really right same she should so some such than that the their theirs
+them themselves then there these they thing things think this those through to too um uh under
+until up very was we well were what when where which while who whom why will with would yeah you
+your yours yourself yourselves going gonna kind sort actually mean okay oh
+""".split())
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split transcript text into sentences at terminal punctuation.
+
+    Unpunctuated stretches are cut every MAX_SENTENCE_WORDS words so a
+    transcript without punctuation still yields preview-sized pieces.
+    """
+    sentences = []
+    for sentence in _SENTENCE_SPLIT.split(text):
+        words = sentence.split()
+        for start in range(0, len(words), MAX_SENTENCE_WORDS):
+            sentences.append(' '.join(words[start:start + MAX_SENTENCE_WORDS]))
+    return sentences
+
+
+def _merge_units(sentences: List[str], max_units: int) -> Tuple[List[str], int]:
+    """Merge neighbouring sentences into at most `max_units` passages. Returns (units, sentences per unit)."""
+    if len(sentences) <= max_units:
+        return sentences, 1
+    size = -(-len(sentences) // max_units)
+    return [' '.join(sentences[i:i + size]) for i in range(0, len(sentences), size)], size
+
+
+def _tfidf_matrix(units: List[str]) -> np.ndarray:
+    """
+    L2-normalized TF-IDF rows, one per unit.
+
+    Tokens are counted with a single np.add.at over (row, term) index
+    arrays instead of per-sentence Python dicts.
+    """
+    vocabulary: Dict[str, int] = {}
+    rows: List[int] = []
+    terms: List[int] = []
+    for row, unit in enumerate(units):
+        for word in _WORD.findall(unit.lower()):
+            if len(word) < 3 or word in STOPWORDS:
+                continue
+            rows.append(row)
+            terms.append(vocabulary.setdefault(word, len(vocabulary)))
+
+    if not terms:
+        return np.zeros((len(units), 0), dtype=np.float32)
+
+    rows_arr = np.asarray(rows, dtype=np.int64)
+    terms_arr = np.asarray(terms, dtype=np.int64)
+
+    # Document frequency from unique (row, term) pairs
+    pairs = np.unique(rows_arr * len(vocabulary) + terms_arr)
+    df = np.bincount(pairs % len(vocabulary), minlength=len(vocabulary))
+
+    shared = np.flatnonzero(df >= 2)
+    if shared.size == 0:
+        return np.zeros((len(units), 0), dtype=np.float32)
+    if shared.size > PREVIEW_MAX_TERMS:
+        shared = shared[np.argsort(-df[shared], kind='stable')[:PREVIEW_MAX_TERMS]]
+
+    columns = np.full(len(vocabulary), -1, dtype=np.int64)
+    columns[shared] = np.arange(shared.size)
+    keep = columns[terms_arr] >= 0
+
+    counts = np.zeros((len(units), shared.size), dtype=np.float32)
+    np.add.at(counts, (rows_arr[keep], columns[terms_arr[keep]]), 1.0)
+
+    idf = np.log((1.0 + len(units)) / (1.0 + df[shared])).astype(np.float32) + 1.0
+    matrix = np.log1p(counts) * idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def _textrank(similarity: np.ndarray) -> np.ndarray:
+    """PageRank over the sentence similarity graph, by power iteration."""
+    n = similarity.shape[0]
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    # Sentences with no links spread their rank evenly
+    transition = np.where(out_weight > 0, similarity / np.where(out_weight > 0, out_weight, 1), 1.0 / n)
+
+    scores = np.full(n, 1.0 / n, dtype=np.float64)
+    for _ in range(MAX_ITERATIONS):
+        updated = (1 - DAMPING) / n + DAMPING * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < TOLERANCE:
+            return updated
+        scores = updated
+    return scores
+
+
+def extractive_summary(transcript: str, sentences: int = PREVIEW_SENTENCES) -> str:
+    """
+    Pick the most central sentences of a transcript (TextRank over TF-IDF).
+
+    Runs locally in milliseconds, so a preview exists as soon as the
+    transcript does, and it can stand in for an LLM summary that failed.
+
+    Args:
+        transcript: Full transcript text
+        sentences: Number of sentences to pick
+
+    Returns:
+        Markdown bullet list of the picked sentences in transcript order,
+        or an empty string when the transcript is empty
+    """
+    units, size = _merge_units(split_sentences(transcript), PREVIEW_MAX_UNITS)
+    if not units:
+        return ''
+
+    lengths = np.array([len(unit.split()) for unit in units])
+    candidates = (lengths >= MIN_SENTENCE_WORDS) & (lengths <= MAX_SENTENCE_WORDS * size)
+    if not candidates.any():
+        # Short or unpunctuated transcripts: any unit will do
+        candidates[:] = True
+
+    matrix = _tfidf_matrix(units)
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, 0.0)
+    scores = _textrank(similarity.astype(np.float64))
+
+    picked: List[int] = []
+    for index in np.argsort(-scores, kind='stable'):
+        if len(picked) >= sentences:
+            break
+        if not candidates[index]:
+            continue
+        if picked and similarity[index, picked].max() > REDUNDANCY_THRESHOLD:
+            continue
+        picked.append(int(index))
+
+    return '\n'.join(f"- {units[index]}" for index in sorted(picked))
+
+
+def fallback_summary(preview: str) -> str:
+    """The preview, marked as a stand-in for an AI summary that failed."""
+    return f"{FALLBACK_NOTICE}\n\n{preview}"
@@ -0,0 +1,95 @@
+import os
+import logging
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional
+
+import httpx
+from defusedxml import ElementTree as SafeET
+from defusedxml import DefusedXmlException
+
+logger = logging.getLogger(__name__)
+
+# Large shows publish multi-megabyte feeds; anything past this is refused
+FEED_MAX_BYTES = int(os.getenv("FEED_MAX_BYTES", str(20 * 1024 * 1024)))
+FEED_TIMEOUT_SECONDS = float(os.getenv("FEED_TIMEOUT_SECONDS", "30"))
+
+ATOM_NS = '{http://www.w3.org/2005/Atom}'
+
+
+def _text(element: Optional[ET.Element]) -> Optional[str]:
+    if element is None or element.text is None:
+        return None
+    return element.text.strip() or None
+
+
+def parse_feed(content: bytes) -> List[Dict[str, Optional[str]]]:
+    """
+    List the episodes of an RSS or Atom podcast feed, in feed order.
+
+    The audio enclosure is used as the episode URL since it can be fed to
+    ffmpeg directly; the episode page link is the fallback.
+
+    Args:
+        content: Raw feed XML
+
+    Returns:
+        List of dicts with 'url' and 'title'
+    """
+    try:
+        # Feeds are untrusted: defusedxml refuses entity expansion and external entities
+        root = SafeET.fromstring(content)
+    except ET.ParseError as e:
+        raise ValueError(f"Feed is not valid XML: {str(e)}")
+    except DefusedXmlException as e:
+        raise ValueError(f"Feed uses forbidden XML features: {str(e)}")
+
+    episodes = []
+
+    # RSS 2.0
+    for item in root.iter('item'):
+        enclosure = item.find('enclosure')
+        url = enclosure.get('url') if enclosure is not None else None
+        url = url or _text(item.find('link'))
+        if url:
+            episodes.append({'url': url.strip(), 'title': _text(item.find('title'))})
+
+    # Atom
+    for entry in root.iter(f'{ATOM_NS}entry'):
+        links = entry.findall(f'{ATOM_NS}link')
+        enclosure = next((link for link in links if link.get('rel') == 'enclosure'), None)
+        alternate = next((link for link in links if link.get('rel') in (None, 'alternate')), None)
+        link = enclosure if enclosure is not None else alternate
+        if link is not None and link.get('href'):
+            episodes.append({'url': link.get('href').strip(), 'title': _text(entry.find(f'{ATOM_NS}title'))})
+
+    return episodes
+
+
+async def fetch_feed_episodes(feed_url: str, limit: Optional[int] = None) -> List[Dict[str, Optional[str]]]:
+    """
+    Download a podcast feed and list its episodes.
+
+    Args:
+        feed_url: RSS or Atom feed URL
+        limit: Keep only the first `limit` episodes (feeds list newest first)
+
+    Returns:
+        List of dicts with 'url' and 'title'
+    """
+    async with httpx.AsyncClient(timeout=FEED_TIMEOUT_SECONDS, follow_redirects=True) as client:
+        async with client.stream('GET', feed_url) as response:
+            response.raise_for_status()
+            chunks = []
+            size = 0
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if size > FEED_MAX_BYTES:
+                    raise ValueError(f"Feed is larger than {FEED_MAX_BYTES} bytes")
+                chunks.append(chunk)
+
+    episodes = parse_feed(b''.join(chunks))
+    logger.info(f"Feed {feed_url} lists {len(episodes)} episodes")
+
+    if limit is not None:
+        episodes = episodes[:limit]
+    return episodes
@@ -0,0 +1,297 @@
+import os
+import uuid
+import time
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from app.services.metrics import JOBS, JOBS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+# Number of pipelines allowed to run at the same time, which bounds how much
+# audio sits on disk at once. CPU, network and API quota are capped per stage
+# (see stage_limits), so jobs in different stages overlap instead of queuing.
+MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", "6"))
+
+# Upper bound on jobs waiting or running; submissions beyond it are rejected
+MAX_QUEUED_JOBS = int(os.getenv("MAX_QUEUED_JOBS", "100"))
+
+# How long finished jobs stay pollable before they are forgotten
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+
+# Idle event streams get a comment line this often so proxies keep them open
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue has no room for another submission."""
+
+
+class Job:
+    """State of a single podcast processing job."""
+
+    def __init__(self, job_id: str, podcast_url: str):
+        self.id = job_id
+        self.podcast_url = podcast_url
+        self.status = JOB_QUEUED
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.events: List[Dict[str, Any]] = []
+        self._subscribers: List[asyncio.Queue] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._started_monotonic = time.monotonic()
+        self._finished_monotonic: Optional[float] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JOB_COMPLETED, JOB_FAILED)
+
+    def emit(self, event_type: str, **data: Any):
+        """
+        Record a progress event and push it to every live subscriber.
+
+        Safe to call from pipeline worker threads; the event is handed over
+        to the event loop thread.
+        """
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+
+        if not on_loop and self._loop is not None:
+            self._loop.call_soon_threadsafe(functools.partial(self.emit, event_type, **data))
+            return
+
+        data['elapsed_seconds'] = round(time.monotonic() - self._started_monotonic, 3)
+        event = {'event': event_type, 'data': data}
+        self.events.append(event)
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    async def stream_events(self) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Yield past and future events until the job finishes.
+
+        Yields None after EVENT_HEARTBEAT_SECONDS without an event so the
+        caller can send a keep-alive.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        backlog = list(self.events)
+        self._subscribers.append(queue)
+        try:
+            for event in backlog:
+                yield event
+                if event['event'] in (JOB_COMPLETED, JOB_FAILED):
+                    return
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield event
+                if event['event'] in (JOB_COMPLETED, JOB_FAILED):
+                    return
+        finally:
+            self._subscribers.remove(queue)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'podcast_url': self.podcast_url,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error,
+            'result': self.result,
+        }
+
+
+class JobQueue:
+    """
+    In-process job queue for the podcast pipeline.
+
+    Jobs run as tasks on the server's event loop, at most `max_concurrent`
+    at a time. Blocking work inside a job (yt-dlp, ffmpeg, Whisper uploads)
+    is pushed onto a bounded thread pool via `run_blocking`, so the event
+    loop stays free to serve health checks and reads.
+    """
+
+    def __init__(self, max_concurrent: int, max_queued: int):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self._jobs: Dict[str, Job] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Coalescing key -> ID of the unfinished job doing that work
+        self._inflight: Dict[str, str] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent,
+            thread_name_prefix='pipeline'
+        )
+        # Created lazily so it binds to the loop uvicorn is running
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        return self._semaphore
+
+    @property
+    def pending_count(self) -> int:
+        """Number of jobs queued or running."""
+        return sum(1 for job in self._jobs.values() if not job.is_finished)
+
+    def submit(
+        self,
+        podcast_url: str,
+        pipeline: Callable[[Job], Awaitable[Dict[str, Any]]],
+        key: Optional[str] = None
+    ) -> Job:
+        """
+        Register a job and schedule it on the running event loop.
+
+        Submissions that share a `key` with an unfinished job are coalesced:
+        the existing job is returned and no new pipeline is started, so every
+        caller ends up polling the same result.
+
+        Args:
+            podcast_url: URL being processed (for reporting)
+            pipeline: Coroutine function that receives the job and returns its result
+            key: Optional coalescing key (e.g. the normalized URL)
+
+        Returns:
+            The newly created job, or the in-flight job with the same key
+        """
+        if key is not None and key in self._inflight:
+            job = self._jobs[self._inflight[key]]
+            logger.info(f"Coalescing request for {podcast_url} into job {job.id}")
+            return job
+
+        self._prune()
+
+        if self.pending_count >= self.max_queued:
+            raise QueueFullError(
+                f"Job queue is full ({self.max_queued} jobs pending), try again later"
+            )
+
+        job = Job(uuid.uuid4().hex, podcast_url)
+        job._loop = asyncio.get_running_loop()
+        job.emit('status', status=JOB_QUEUED)
+        self._jobs[job.id] = job
+        if key is not None:
+            self._inflight[key] = job.id
+        self._tasks[job.id] = asyncio.get_running_loop().create_task(
+            self._run(job, pipeline, key)
+        )
+        logger.info(f"Job {job.id} queued for {podcast_url} ({self.pending_count} pending)")
+        return job
+
+    def add_completed(self, podcast_url: str, result: Dict[str, Any]) -> Job:
+        """Register a job that is already complete (e.g. served from cache)."""
+        self._prune()
+
+        job = Job(uuid.uuid4().hex, podcast_url)
+        job._loop = asyncio.get_running_loop()
+        job.status = JOB_COMPLETED
+        job.result = result
+        job.started_at = job.finished_at = job.created_at
+        job._finished_monotonic = time.monotonic()
+        job.emit(JOB_COMPLETED, result=result, cached=True)
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def get_inflight(self, key: str) -> Optional[Job]:
+        """The unfinished job a submission with `key` would be coalesced into, if any."""
+        job_id = self._inflight.get(key)
+        return self._jobs.get(job_id) if job_id else None
+
+    async def wait(self, job: Job) -> Job:
+        """Wait until a job has finished (completed or failed)."""
+        task = self._tasks.get(job.id)
+        if task is not None:
+            await asyncio.shield(task)
+        return job
+
+    async def run_blocking(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking callable on the pipeline thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            functools.partial(func, *args, **kwargs)
+        )
+
+    async def _run(
+        self,
+        job: Job,
+        pipeline: Callable[[Job], Awaitable[Dict[str, Any]]],
+        key: Optional[str]
+    ):
+        try:
+            async with self._get_semaphore():
+                job.status = JOB_RUNNING
+                job.started_at = datetime.utcnow()
+                job.emit('status', status=JOB_RUNNING)
+                logger.info(f"Job {job.id} started")
+
+                job.result = await pipeline(job)
+                job.status = JOB_COMPLETED
+                job.emit(JOB_COMPLETED, result=job.result)
+                JOBS_TOTAL.inc(status=JOB_COMPLETED)
+                logger.info(f"Job {job.id} completed")
+        except Exception as e:
+            job.status = JOB_FAILED
+            job.error = str(e)
+            job.emit(JOB_FAILED, error=job.error)
+            JOBS_TOTAL.inc(status=JOB_FAILED)
+            logger.error(f"Job {job.id} failed: {str(e)}")
+        finally:
+            job.finished_at = datetime.utcnow()
+            job._finished_monotonic = time.monotonic()
+            self._tasks.pop(job.id, None)
+            if key is not None and self._inflight.get(key) == job.id:
+                del self._inflight[key]
+
+    def _prune(self):
+        """Forget finished jobs older than the retention window."""
+        cutoff = time.monotonic() - JOB_RETENTION_SECONDS
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job._finished_monotonic is not None and job._finished_monotonic < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        """Cancel running jobs and stop the worker threads."""
+        for task in list(self._tasks.values()):
+            task.cancel()
+        self._executor.shutdown(wait=False)
+
+    def status_counts(self) -> Dict[str, int]:
+        """Number of known jobs per status."""
+        counts = {status: 0 for status in (JOB_QUEUED, JOB_RUNNING, JOB_COMPLETED, JOB_FAILED)}
+        for job in list(self._jobs.values()):
+            counts[job.status] += 1
+        return counts
+
+
+job_queue = JobQueue(MAX_CONCURRENT_JOBS, MAX_QUEUED_JOBS)
+
+JOBS.set_function(lambda: {(status,): count for status, count in job_queue.status_counts().items()})
@@ -0,0 +1,65 @@
+import os
+import json
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+
+from app.database import DB_PATH
+from app.services.disk_cache import DiskCache
+
+logger = logging.getLogger(__name__)
+
+# Stored next to the summaries database so it shares the same volume
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(DB_PATH), 'llm_cache.db')
+)
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Entries older than this are treated as misses; 0 keeps them until evicted
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+# Set to "0" to always call OpenRouter
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+
+# Bump when the stored response format changes so old entries are ignored
+LLM_CACHE_VERSION = "v1"
+
+llm_cache = DiskCache(
+    LLM_CACHE_PATH,
+    LLM_CACHE_MAX_BYTES,
+    ttl_seconds=LLM_CACHE_TTL_SECONDS or None,
+    name="llm_cache"
+)
+
+
+def completion_cache_key(model: str, prompt: str, params: Dict[str, Any]) -> str:
+    """
+    Hash of everything that determines a completion: model, full prompt
+    text and sampling parameters (order-independent).
+    """
+    material = json.dumps(
+        {'model': model, 'prompt': prompt, 'params': params},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    digest = hashlib.sha256(material.encode('utf-8')).hexdigest()
+    return f"{LLM_CACHE_VERSION}:{digest}"
+
+
+def get_cached_completion(key: str) -> Optional[str]:
+    """Return the cached completion for `key`, or None on a miss."""
+    try:
+        return llm_cache.get(key)
+    except Exception as e:
+        # A broken cache must never fail a summary; treat it as a miss
+        logger.warning(f"LLM cache lookup failed: {str(e)}")
+        return None
+
+
+def store_completion(key: str, completion: str):
+    """Cache a completion under its request key."""
+    try:
+        llm_cache.set(key, completion)
+    except Exception as e:
+        logger.warning(f"Failed to store LLM response in cache: {str(e)}")
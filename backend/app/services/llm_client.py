@@ -0,0 +1,221 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.database import run_db
+from app.services.metrics import LLM_REQUEST_SECONDS, LLM_TOKENS
+from app.services.llm_cache import (
+    LLM_CACHE_ENABLED, completion_cache_key, get_cached_completion, store_completion
+)
+
+logger = logging.getLogger(__name__)
+
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+
+DEFAULT_MODEL = "openai/gpt-3.5-turbo"
+
+# Maximum number of OpenRouter requests in flight across the whole process
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+
+# Retries after the first attempt for 429/5xx responses and network errors
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+
+# Per-request timeout; long summaries can take a couple of minutes to generate
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "180"))
+
+# Backoff grows exponentially from the base and is capped
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "30"))
+
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """Raised when a chat completion cannot be obtained."""
+
+
+class OpenRouterClient:
+    """
+    Shared async client for OpenRouter chat completions.
+
+    Keeps one pooled keep-alive connection set for the whole process,
+    caps the number of concurrent requests and retries rate-limited or
+    failed calls with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        max_concurrency: int,
+        max_retries: int,
+        timeout: float
+    ):
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        # Both are created lazily so they bind to the running event loop
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                ),
+                headers={
+                    "Content-Type": "application/json",
+                    "HTTP-Referer": "https://github.com/alexanderclapp/podcast-transcription",
+                    "X-Title": "Podcast Transcription App"
+                }
+            )
+        return self._client
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _backoff_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After when present."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return min(float(retry_after), LLM_BACKOFF_MAX_SECONDS)
+                except ValueError:
+                    pass
+        ceiling = min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    async def chat_completion(
+        self,
+        prompt: str,
+        api_key: str,
+        model: str = DEFAULT_MODEL,
+        use_cache: bool = True,
+        **params: Any
+    ) -> str:
+        """
+        Send a single-message chat completion and return the reply text.
+
+        Replies are cached on disk by model, prompt and sampling
+        parameters, so repeating an identical request is free. With
+        `use_cache=False` the cache is not read (fresh sampling), but
+        the new reply still replaces the cached one.
+
+        Args:
+            prompt: User message content
+            api_key: OpenRouter API key
+            model: OpenRouter model identifier
+            use_cache: Serve an identical earlier reply when there is one
+            **params: Extra sampling parameters (temperature, max_tokens, ...)
+
+        Returns:
+            Content of the first choice
+        """
+        cache_key = completion_cache_key(model, prompt, params) if LLM_CACHE_ENABLED else None
+        if cache_key and use_cache:
+            cached = await run_db(get_cached_completion, cache_key)
+            if cached is not None:
+                return cached
+
+        content = await self._request_completion(prompt, api_key, model, params)
+        if cache_key:
+            await run_db(store_completion, cache_key, content)
+        return content
+
+    async def _request_completion(
+        self,
+        prompt: str,
+        api_key: str,
+        model: str,
+        params: Dict[str, Any]
+    ) -> str:
+        payload: Dict[str, Any] = {
+            "model": model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+        }
+        payload.update(params)
+        headers = {"Authorization": f"Bearer {api_key}"}
+
+        client = self._get_client()
+        last_error: Optional[str] = None
+
+        for attempt in range(self.max_retries + 1):
+            response = None
+            started = None
+            try:
+                async with self._get_semaphore():
+                    started = time.perf_counter()
+                    response = await client.post("/chat/completions", headers=headers, json=payload)
+                elapsed = time.perf_counter() - started
+
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    LLM_REQUEST_SECONDS.observe(elapsed, model=model, outcome='retryable_error')
+                    last_error = f"HTTP {response.status_code}: {response.text[:200]}"
+                else:
+                    LLM_REQUEST_SECONDS.observe(
+                        elapsed, model=model, outcome='ok' if response.is_success else 'error'
+                    )
+                    response.raise_for_status()
+                    result = response.json()
+                    self._record_usage(model, result.get("usage"))
+                    return result["choices"][0]["message"]["content"]
+
+            except (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError) as e:
+                if started is not None:
+                    LLM_REQUEST_SECONDS.observe(
+                        time.perf_counter() - started, model=model, outcome='network_error'
+                    )
+                last_error = f"{type(e).__name__}: {str(e)}"
+            except httpx.HTTPStatusError as e:
+                # Non-retryable status (bad request, auth, ...)
+                raise LLMError(f"OpenRouter returned HTTP {e.response.status_code}: {e.response.text[:200]}")
+            except (KeyError, IndexError, ValueError) as e:
+                raise LLMError(f"Unexpected OpenRouter response: {str(e)}")
+
+            if attempt < self.max_retries:
+                delay = self._backoff_delay(attempt, response)
+                logger.warning(
+                    f"OpenRouter request failed ({last_error}), "
+                    f"retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})"
+                )
+                await asyncio.sleep(delay)
+
+        raise LLMError(f"OpenRouter request failed after {self.max_retries + 1} attempts: {last_error}")
+
+    @staticmethod
+    def _record_usage(model: str, usage: Optional[Dict[str, Any]]):
+        if not usage:
+            return
+        LLM_TOKENS.inc(usage.get("prompt_tokens") or 0, model=model, kind="prompt")
+        LLM_TOKENS.inc(usage.get("completion_tokens") or 0, model=model, kind="completion")
+
+    async def aclose(self):
+        """Close pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+llm_client = OpenRouterClient(
+    OPENROUTER_BASE_URL,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_TIMEOUT_SECONDS
+)
@@ -0,0 +1,368 @@
+import os
+import re
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from app.services.llm_client import llm_client, DEFAULT_MODEL
+
+logger = logging.getLogger(__name__)
+
+# Rough conversion used for budgeting; English text averages ~4 chars per token
+CHARS_PER_TOKEN = 4
+
+# Transcripts up to this size are summarized in a single call
+SUMMARY_INPUT_MAX_CHARS = int(os.getenv("SUMMARY_INPUT_MAX_CHARS", "12000"))
+
+# Size of each transcript chunk sent to a "map" call
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "3000"))
+
+# Output budget for each map/reduce call
+SUMMARY_NOTES_MAX_TOKENS = int(os.getenv("SUMMARY_NOTES_MAX_TOKENS", "700"))
+
+# Map/reduce calls in flight per transcript (the LLM client also caps globally)
+SUMMARY_MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", "4"))
+
+# Give up reducing after this many passes and trim what is left
+SUMMARY_MAX_REDUCE_PASSES = 4
+
+# Recently condensed transcripts, so both summary types share one map-reduce
+_NOTES_CACHE_SIZE = 8
+_notes_cache: "OrderedDict[str, str]" = OrderedDict()
+# Runs in progress, keyed by _inflight_key(); fresh runs are kept apart
+# from cached ones so use_cache=False never picks up reused notes
+_notes_inflight: Dict[str, asyncio.Task] = {}
+
+MAP_PROMPT = """You are taking detailed notes on one section of a long podcast transcript. The notes will later be combined with notes from the other sections into a full summary, so preserve everything that matters.
+
+This is section {index} of {total}.
+
+Write dense bullet-point notes covering:
+- Every topic discussed, in the order it comes up
+- Key arguments, insights, frameworks and decisions
+- All specific numbers, dates, names, companies and examples
+- Up to two short verbatim quotes that capture pivotal ideas (in quotation marks)
+
+Do not add an introduction or conclusion. Do not add opinions not grounded in the transcript. Ignore ads and podcast housekeeping.
+
+**Transcript section:**
+
+{text}
+
+**Notes:**"""
+
+# Used while the transcript is still being transcribed, when the number of
+# sections is not known yet
+STREAM_MAP_PROMPT = MAP_PROMPT.replace(
+    "This is section {index} of {total}.",
+    "This is section {index}; the episode may continue after it."
+)
+
+# Map calls started ahead of the transcript's end that may be unfinished at
+# once; feeding more text waits, which holds back transcription in turn
+STREAM_MAP_BACKLOG = int(os.getenv("STREAM_MAP_BACKLOG", str(SUMMARY_MAP_CONCURRENCY * 2)))
+
+REDUCE_PROMPT = """You are merging consecutive sets of notes taken on sections of a long podcast transcript into a single set of notes.
+
+Keep the chronological order of topics. Merge duplicates, but keep every distinct insight, framework, number, name, example and quote. Use bullet points, with nested bullets for detail. Do not add an introduction or conclusion.
+
+**Section notes:**
+
+{text}
+
+**Merged notes:**"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate for budgeting."""
+    return len(text) // CHARS_PER_TOKEN
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """
+    Split text into chunks of at most `max_tokens`, cutting at sentence ends.
+
+    Sentences longer than a whole chunk are split on word boundaries.
+
+    Args:
+        text: Text to split
+        max_tokens: Token budget per chunk
+
+    Returns:
+        List of chunk strings, in order
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    sentences = re.split(r'(?<=[.!?])\s+', text.strip())
+
+    chunks = []
+    current: List[str] = []
+    current_len = 0
+
+    for sentence in sentences:
+        if len(sentence) > max_chars:
+            # Rare (transcripts without punctuation); fall back to words
+            words = sentence.split()
+            sentence_parts = []
+            part: List[str] = []
+            part_len = 0
+            for word in words:
+                if part and part_len + len(word) + 1 > max_chars:
+                    sentence_parts.append(' '.join(part))
+                    part, part_len = [], 0
+                part.append(word)
+                part_len += len(word) + 1
+            if part:
+                sentence_parts.append(' '.join(part))
+        else:
+            sentence_parts = [sentence]
+
+        for piece in sentence_parts:
+            if current and current_len + len(piece) + 1 > max_chars:
+                chunks.append(' '.join(current))
+                current, current_len = [], 0
+            current.append(piece)
+            current_len += len(piece) + 1
+
+    if current:
+        chunks.append(' '.join(current))
+
+    return chunks
+
+
+def _group_for_reduce(notes: List[str], max_tokens: int) -> List[List[str]]:
+    """Pack consecutive notes into groups that fit one reduce call (at least two per group)."""
+    groups: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    for note in notes:
+        tokens = estimate_tokens(note)
+        if len(current) >= 2 and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(note)
+        current_tokens += tokens
+
+    if current:
+        if len(current) == 1 and groups:
+            groups[-1].extend(current)
+        else:
+            groups.append(current)
+
+    return groups
+
+
+async def _complete(prompt: str, api_key: str, semaphore: asyncio.Semaphore, use_cache: bool) -> str:
+    async with semaphore:
+        return await llm_client.chat_completion(
+            prompt,
+            api_key,
+            model=DEFAULT_MODEL,
+            use_cache=use_cache,
+            temperature=0.3,
+            max_tokens=SUMMARY_NOTES_MAX_TOKENS
+        )
+
+
+async def _condense(transcript: str, api_key: str, max_chars: int, use_cache: bool) -> str:
+    semaphore = asyncio.Semaphore(SUMMARY_MAP_CONCURRENCY)
+
+    # Map: notes for every chunk, concurrently
+    chunks = split_into_chunks(transcript, SUMMARY_CHUNK_TOKENS)
+    logger.info(f"Map step: {len(chunks)} chunks ({len(transcript)} chars)")
+    notes = await asyncio.gather(*[
+        _complete(
+            MAP_PROMPT.format(index=index + 1, total=len(chunks), text=chunk),
+            api_key,
+            semaphore,
+            use_cache
+        )
+        for index, chunk in enumerate(chunks)
+    ])
+    return await _reduce(notes, api_key, max_chars, semaphore, use_cache)
+
+
+async def _reduce(
+    notes: List[str],
+    api_key: str,
+    max_chars: int,
+    semaphore: asyncio.Semaphore,
+    use_cache: bool
+) -> str:
+    """Merge neighbouring notes until everything fits the final prompt."""
+    notes = [note.strip() for note in notes]
+
+    reduce_budget = SUMMARY_CHUNK_TOKENS
+    passes = 0
+    while len('\n\n'.join(notes)) > max_chars and len(notes) > 1 and passes < SUMMARY_MAX_REDUCE_PASSES:
+        passes += 1
+        groups = _group_for_reduce(notes, reduce_budget)
+        logger.info(f"Reduce pass {passes}: {len(notes)} notes -> {len(groups)} groups")
+        notes = await asyncio.gather(*[
+            _complete(REDUCE_PROMPT.format(text='\n\n'.join(group)), api_key, semaphore, use_cache)
+            for group in groups
+        ])
+        notes = [note.strip() for note in notes]
+
+    combined = '\n\n'.join(notes)
+    if len(combined) > max_chars:
+        logger.warning(f"Notes still {len(combined)} chars after {passes} reduce passes, trimming")
+        combined = combined[:max_chars]
+    return combined
+
+
+def _notes_key(transcript: str, max_chars: int) -> str:
+    return f"{hashlib.sha256(transcript.encode('utf-8')).hexdigest()}:{max_chars}"
+
+
+def _inflight_key(key: str, use_cache: bool) -> str:
+    return key if use_cache else f"{key}:fresh"
+
+
+def _remember_notes(key: str, notes: str):
+    _notes_cache[key] = notes
+    while len(_notes_cache) > _NOTES_CACHE_SIZE:
+        _notes_cache.popitem(last=False)
+
+
+async def prepare_transcript(
+    transcript: str,
+    api_key: str,
+    max_chars: int = SUMMARY_INPUT_MAX_CHARS,
+    use_cache: bool = True
+) -> Tuple[str, bool]:
+    """
+    Fit a transcript into a single summarization prompt.
+
+    Short transcripts are returned unchanged. Longer ones are condensed
+    with map-reduce: the whole transcript is split into token-sized chunks,
+    each chunk is turned into notes concurrently, and the notes are merged
+    in reduce passes until they fit. Concurrent and repeated calls for the
+    same transcript share one map-reduce run. With `use_cache=False`
+    stored notes and LLM responses are ignored and the notes are
+    sampled again; such a call only shares a run with other
+    `use_cache=False` calls (the summary types of one forced job) and
+    its notes are not stored.
+
+    Args:
+        transcript: Full transcript text
+        api_key: OpenRouter API key
+        max_chars: Size the returned text must fit in
+        use_cache: Reuse notes and LLM responses from earlier runs
+
+    Returns:
+        Tuple of (text to summarize, whether it was condensed)
+    """
+    if len(transcript) <= max_chars:
+        return transcript, False
+
+    key = _notes_key(transcript, max_chars)
+
+    if use_cache and key in _notes_cache:
+        _notes_cache.move_to_end(key)
+        return _notes_cache[key], True
+
+    inflight_key = _inflight_key(key, use_cache)
+    task = _notes_inflight.get(inflight_key)
+    if task is None:
+        task = asyncio.ensure_future(_condense(transcript, api_key, max_chars, use_cache))
+        _notes_inflight[inflight_key] = task
+        try:
+            notes = await task
+        finally:
+            _notes_inflight.pop(inflight_key, None)
+
+        if use_cache:
+            _remember_notes(key, notes)
+        return notes, True
+
+    return await task, True
+
+
+class StreamingCondenser:
+    """
+    Runs the map step on a transcript while it is still being written.
+
+    Text is fed in order as transcription chunks land. Once the transcript
+    is too long for a single prompt, every full map-sized section is sent
+    for notes right away. finish() then only has the last section and
+    the reduce left, and registers that work under the finished
+    transcript's key, so the summarizers' prepare_transcript() calls wait
+    for it instead of starting their own map-reduce.
+    """
+
+    def __init__(self, api_key: str, use_cache: bool = True, max_chars: int = SUMMARY_INPUT_MAX_CHARS):
+        self.api_key = api_key
+        self.use_cache = use_cache
+        self.max_chars = max_chars
+        self._semaphore = asyncio.Semaphore(SUMMARY_MAP_CONCURRENCY)
+        self._notes: List[asyncio.Task] = []
+        # Text not yet sent to a map call
+        self._pending = ''
+        self._fed_chars = 0
+
+    def _start_map(self, text: str):
+        prompt = STREAM_MAP_PROMPT.format(index=len(self._notes) + 1, text=text)
+        self._notes.append(asyncio.ensure_future(
+            _complete(prompt, self.api_key, self._semaphore, self.use_cache)
+        ))
+
+    async def feed(self, text: str):
+        """Add the next piece of transcript, waiting while too many map calls are unfinished."""
+        if not text:
+            return
+        self._pending = f"{self._pending} {text}" if self._pending else text
+        self._fed_chars += len(text) + 1
+
+        # Short episodes are summarized in one call and need no notes
+        if self._fed_chars <= self.max_chars:
+            return
+
+        sections = split_into_chunks(self._pending, SUMMARY_CHUNK_TOKENS)
+        # The last section can still grow with the next piece
+        self._pending = sections.pop()
+        for section in sections:
+            while True:
+                unfinished = [task for task in self._notes if not task.done()]
+                if len(unfinished) < STREAM_MAP_BACKLOG:
+                    break
+                await asyncio.wait(unfinished, return_when=asyncio.FIRST_COMPLETED)
+            self._start_map(section)
+
+    def finish(self, transcript: str):
+        """
+        Hand the rest of the map-reduce for the complete transcript over to
+        prepare_transcript(). `transcript` must be the fed pieces joined
+        with spaces, exactly as it will be summarized.
+        """
+        if len(transcript) <= self.max_chars:
+            self.cancel()
+            return
+
+        if self._pending:
+            self._start_map(self._pending)
+            self._pending = ''
+        logger.info(f"Map step: {len(self._notes)} sections started while transcribing ({len(transcript)} chars)")
+
+        key = _notes_key(transcript, self.max_chars)
+        inflight_key = _inflight_key(key, self.use_cache)
+        task = asyncio.ensure_future(self._finish())
+
+        def done(task: asyncio.Task):
+            _notes_inflight.pop(inflight_key, None)
+            if self.use_cache and not task.cancelled() and task.exception() is None:
+                _remember_notes(key, task.result())
+
+        _notes_inflight[inflight_key] = task
+        task.add_done_callback(done)
+
+    async def _finish(self) -> str:
+        notes = await asyncio.gather(*self._notes)
+        return await _reduce(notes, self.api_key, self.max_chars, self._semaphore, self.use_cache)
+
+    def cancel(self):
+        """Drop map calls that are no longer needed."""
+        for task in self._notes:
+            task.cancel()
@@ -0,0 +1,367 @@
+import time
+import bisect
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default buckets (seconds) span quick DB reads up to hour-long transcriptions
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600
+)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """
+    Base for labelled metrics.
+
+    Updates take one uncontended lock and a dict lookup, so they are cheap
+    enough to call on every request and from worker threads.
+    """
+
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type_name}',
+        ]
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing value."""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+            for key, value in sorted(values.items())
+        ]
+
+
+class Gauge(_Metric):
+    """
+    Value that goes up and down.
+
+    A gauge can instead be bound to a function that is read at scrape
+    time, which costs nothing on the hot path.
+    """
+
+    type_name = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], Dict[Tuple[str, ...], float]]):
+        """
+        Read values from `function` at scrape time.
+
+        It returns {label values tuple: value}; use {(): value} when the
+        gauge has no labels.
+        """
+        self._function = function
+
+    def samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                values = dict(self._function())
+            except Exception as e:
+                logger.warning(f"Failed to collect {self.name}: {str(e)}")
+                values = {}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [
+            f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+            for key, value in sorted(values.items())
+        ]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    type_name = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall-clock duration of the enclosed block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = {key: (list(counts), total[0]) for key, (counts, total) in self._values.items()}
+
+        lines = []
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}'
+                )
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}')
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+registry = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return registry.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return registry.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS
+) -> Histogram:
+    return registry.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# Metrics shared across the app. They are defined here, in one place, so the
+# set of exported series is easy to review.
+
+PIPELINE_STAGE_SECONDS = histogram(
+    'podcast_pipeline_stage_duration_seconds',
+    'Time spent in each pipeline stage, by how it ended.',
+    ['stage', 'status']
+)
+JOBS_TOTAL = counter(
+    'podcast_jobs_total',
+    'Finished jobs by outcome.',
+    ['status']
+)
+JOBS = gauge(
+    'podcast_jobs',
+    'Jobs currently known to the queue, by status (queued jobs are the queue depth).',
+    ['status']
+)
+STAGE_SLOTS = gauge(
+    'podcast_stage_slots',
+    'Per-resource concurrency slots: limit, active and waiting.',
+    ['stage', 'state']
+)
+STAGE_WAIT_SECONDS = histogram(
+    'podcast_stage_wait_seconds',
+    'Time spent waiting for a per-resource concurrency slot.',
+    ['stage']
+)
+
+DOWNLOADED_BYTES = counter(
+    'podcast_audio_downloaded_bytes_total',
+    'Bytes of source audio fetched (as reported by the source when streamed).'
+)
+UPLOADED_BYTES = counter(
+    'podcast_audio_uploaded_bytes_total',
+    'Bytes of audio received through direct uploads.'
+)
+ENCODED_BYTES = counter(
+    'podcast_audio_encoded_bytes_total',
+    'Bytes of speech-encoded audio produced.'
+)
+AUDIO_SECONDS = counter(
+    'podcast_audio_seconds_total',
+    'Seconds of audio processed, by where the transcript came from.',
+    ['source']
+)
+TRIMMED_SECONDS = counter(
+    'podcast_audio_trimmed_seconds_total',
+    'Seconds of silence and music cut out before transcription.'
+)
+FFMPEG_SECONDS = histogram(
+    'podcast_ffmpeg_duration_seconds',
+    'Duration of ffmpeg runs by operation.',
+    ['operation']
+)
+TRANSCRIPTION_CHUNKS = counter(
+    'podcast_transcription_chunks_total',
+    'Audio chunks sent for transcription.'
+)
+SCRATCH_BUDGETS = gauge(
+    'podcast_scratch_budget_bytes',
+    'Scratch budget, by pool (jobs, staging or tmpfs).',
+    ['pool']
+)
+SCRATCH_RESERVED_BYTES = gauge(
+    'podcast_scratch_reserved_bytes',
+    'Scratch bytes reserved against each budget, by pool (jobs, staging or tmpfs).',
+    ['pool']
+)
+SCRATCH_USED_BYTES = gauge(
+    'podcast_scratch_used_bytes',
+    'Bytes actually on disk (or tmpfs) in files tracked by scratch spaces.'
+)
+SCRATCH_SPACES = gauge(
+    'podcast_scratch_spaces',
+    'Scratch spaces by state: admitted, staged (uploads not running yet) or waiting for room.',
+    ['state']
+)
+SCRATCH_WAIT_SECONDS = histogram(
+    'podcast_scratch_wait_seconds',
+    'Time jobs spent waiting for scratch space to be admitted.'
+)
+SCRATCH_SWEPT = counter(
+    'podcast_scratch_swept_total',
+    'Orphaned scratch directories and temp files removed by sweeps.'
+)
+WHISPER_SECONDS = histogram(
+    'podcast_whisper_request_duration_seconds',
+    'Duration of individual Whisper transcription requests.'
+)
+
+LLM_REQUEST_SECONDS = histogram(
+    'podcast_llm_request_duration_seconds',
+    'Duration of individual OpenRouter requests, by outcome.',
+    ['model', 'outcome']
+)
+LLM_TOKENS = counter(
+    'podcast_llm_tokens_total',
+    'Tokens reported by OpenRouter, by model and kind (prompt or completion).',
+    ['model', 'kind']
+)
+SUMMARY_FALLBACKS = counter(
+    'podcast_summary_fallbacks_total',
+    'LLM summaries replaced by the extractive preview after a failure, by summary type.',
+    ['summary']
+)
+
+CACHE_LOOKUPS = counter(
+    'podcast_cache_lookups_total',
+    'Cache lookups by cache and result (hit or miss).',
+    ['cache', 'result']
+)
+CACHE_EVICTIONS = counter(
+    'podcast_cache_evictions_total',
+    'Entries evicted from size-bounded caches.',
+    ['cache']
+)
+
+DB_QUERY_SECONDS = histogram(
+    'podcast_db_query_duration_seconds',
+    'Duration of database calls run through the DB thread pool, by function.',
+    ['operation']
+)
+
+
+def render_metrics() -> str:
+    """Current values of every metric in the Prometheus text format."""
+    return registry.render()
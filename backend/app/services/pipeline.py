@@ -0,0 +1,455 @@
+import os
+import time
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.services.audio_extractor import extract_audio_from_podcast
+from app.services.transcriber import transcribe_audio_segments
+from app.services.transcript_cache import (
+    hash_audio_file, get_cached_transcript, store_transcript, remember_source, has_cached_source
+)
+from app.services.summarizer import summarize_transcript
+from app.services.summarizer2 import summarize_transcript_type2
+from app.services.map_reduce import StreamingCondenser
+from app.services.streaming import stream_transcribe, PIPELINE_STREAMING
+from app.services.extractive import extractive_summary, fallback_summary, SUMMARY_FALLBACK_KEY
+from app.services.job_queue import job_queue, Job
+from app.services.scratch import ScratchSpace, scratch_manager
+from app.services.metrics import PIPELINE_STAGE_SECONDS, AUDIO_SECONDS, SUMMARY_FALLBACKS
+from app.database import (
+    run_db, save_summary, save_checkpoint, mark_checkpoint_failed, load_checkpoints, clear_checkpoints,
+    load_stage_checkpoints
+)
+
+logger = logging.getLogger(__name__)
+
+STAGE_EXTRACTING = "extracting"
+STAGE_TRANSCRIBING = "transcribing"
+STAGE_SUMMARIZING = "summarizing"
+STAGE_SAVING = "saving"
+
+# Checkpointed outputs, in pipeline order
+CHECKPOINT_AUDIO = "audio"
+CHECKPOINT_TRANSCRIPT = "transcript"
+CHECKPOINT_SUMMARY = "summary"
+CHECKPOINT_SUMMARY_TYPE_2 = "summary_type_2"
+# Status only; a failed save keeps every output checkpoint
+CHECKPOINT_SAVE = "save"
+
+# Audio kept by a failed run is protected from scratch sweeps for this long
+PIPELINE_RESUME_RETENTION_SECONDS = float(os.getenv("PIPELINE_RESUME_RETENTION_SECONDS", str(24 * 3600)))
+
+
+def _stage_started(job: Optional[Job], name: str) -> float:
+    """Emit a stage's started event. Returns the start time for _stage_completed."""
+    if job:
+        job.emit('stage', stage=name, status='started')
+    return time.monotonic()
+
+
+def _stage_completed(job: Optional[Job], name: str, started: float, status: str = 'completed'):
+    """Record a stage's duration and emit its completed (or failed) event."""
+    duration = time.monotonic() - started
+    PIPELINE_STAGE_SECONDS.observe(duration, stage=name, status=status)
+    if job:
+        job.emit(
+            'stage',
+            stage=name,
+            status=status,
+            duration_seconds=round(duration, 3)
+        )
+
+
+@contextmanager
+def _stage(job: Optional[Job], name: str):
+    """Emit started and completed/failed events (with timing) around a pipeline stage."""
+    started = _stage_started(job, name)
+    try:
+        yield
+    except BaseException:
+        _stage_completed(job, name, started, status='failed')
+        raise
+    _stage_completed(job, name, started)
+
+
+async def resumable_audio_paths() -> List[str]:
+    """Audio files kept by failed runs that a retry may still resume from."""
+    checkpoints = await run_db(load_stage_checkpoints, CHECKPOINT_AUDIO, PIPELINE_RESUME_RETENTION_SECONDS)
+    return [data['path'] for data in checkpoints]
+
+
+def _emit_resumed(job: Optional[Job], name: str):
+    """Tell listeners a stage was restored from a checkpoint instead of run."""
+    if job:
+        job.emit('stage', stage=name, status='resumed')
+
+
+async def _emit_partial(job: Optional[Job], field: str, pending: Awaitable[str]) -> str:
+    """Await a partial result and publish it as soon as it exists."""
+    value = await pending
+    if job:
+        job.emit('partial', **{field: value})
+    return value
+
+
+async def _checkpointed_summary(
+    podcast_url: str,
+    checkpoints: Dict[str, Dict[str, Any]],
+    stage: str,
+    summarize: Callable[[], Awaitable[str]]
+) -> str:
+    """Return a checkpointed summary, or generate one and checkpoint it as soon as it lands."""
+    if stage in checkpoints:
+        return checkpoints[stage]['text']
+    summary = await summarize()
+    await run_db(save_checkpoint, podcast_url, stage, {'text': summary})
+    return summary
+
+
+def _publish_metadata(
+    job: Optional[Job],
+    metadata: Dict[str, Any],
+    overrides: Optional[Dict[str, Any]]
+):
+    """Apply metadata overrides (in place) and publish the episode metadata."""
+    if overrides:
+        metadata.update({key: value for key, value in overrides.items() if value})
+    if job:
+        job.emit('partial', metadata=metadata)
+    print(f"✓ Audio extracted successfully")
+    print(f"  Title: {metadata.get('title', 'Unknown')}")
+    print(f"  Duration: {metadata.get('duration', 0)} seconds\n")
+
+
+def _apply_fallbacks(
+    job: Optional[Job],
+    metadata: Dict[str, Any],
+    preview: str,
+    summary_type_1: Any,
+    summary_type_2: Any
+) -> Tuple[str, Optional[str]]:
+    """
+    Replace failed LLM summaries so the job still completes.
+
+    A failed Type 1 summary becomes the extractive preview and a failed
+    Type 2 summary is left out. The failed types are listed in
+    metadata[SUMMARY_FALLBACK_KEY] so a later submission retries them.
+    Without a preview to fall back on, the Type 1 error is raised.
+    """
+    for result in (summary_type_1, summary_type_2):
+        # Cancellation is not a summary failure
+        if isinstance(result, BaseException) and not isinstance(result, Exception):
+            raise result
+
+    failed = []
+
+    if isinstance(summary_type_1, Exception):
+        if not preview:
+            raise summary_type_1
+        logger.warning(f"Type 1 summary failed, using extractive preview: {str(summary_type_1)}")
+        summary_type_1 = fallback_summary(preview)
+        failed.append('summary')
+        if job:
+            job.emit('partial', summary=summary_type_1)
+
+    if isinstance(summary_type_2, Exception):
+        logger.warning(f"Type 2 summary failed, leaving it out: {str(summary_type_2)}")
+        summary_type_2 = None
+        failed.append('summary_type_2')
+
+    for name in failed:
+        SUMMARY_FALLBACKS.inc(summary=name)
+    if failed:
+        metadata[SUMMARY_FALLBACK_KEY] = failed
+
+    return summary_type_1, summary_type_2
+
+
+async def run_pipeline(
+    podcast_url: str,
+    openai_api_key: str,
+    openrouter_api_key: str,
+    job: Optional[Job] = None,
+    metadata_overrides: Optional[Dict[str, Any]] = None,
+    fresh_summaries: bool = False,
+    audio_source: Optional[Callable[[str, ScratchSpace], Tuple[str, Dict[str, Any]]]] = None,
+    scratch: Optional[ScratchSpace] = None,
+    source_url: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Process a podcast end to end:
+    1. Extract audio from URL
+    2. Transcribe audio
+    3. Generate summaries
+    4. Save to database
+
+    Every blocking stage runs on the job queue's thread pool so the
+    event loop is never held up by downloads or API calls. The two
+    summaries are generated concurrently through the shared LLM client.
+    Each stage's output (audio file and metadata, transcript, each
+    summary) is checkpointed in the database as it completes. A retry
+    after a failure starts at the first incomplete stage: the audio is
+    kept until its transcript is checkpointed, and completed summaries
+    are not generated again. Checkpoints are dropped once the episode
+    is saved without fallbacks.
+    An extractive preview is computed locally right after transcription;
+    if an LLM summary fails, the preview takes its place (flagged in
+    metadata) instead of failing the whole job.
+    When a job is given, stage events and partial results are published
+    on it as the pipeline advances.
+    With PIPELINE_STREAMING=1, URL jobs without checkpoints overlap steps
+    1 and 2: chunks are transcribed while the episode downloads and the
+    summary map step starts on the transcript as it grows (see
+    stream_transcribe).
+
+    Args:
+        podcast_url: Podcast episode URL, normalized; the key for checkpoints
+            and the saved summary
+        openai_api_key: OpenAI API key for transcription
+        openrouter_api_key: OpenRouter API key for summarization
+        job: Job to report progress on (optional)
+        metadata_overrides: Values that replace what the extractor found,
+            e.g. the episode title from a feed when the URL is a bare audio file
+        fresh_summaries: Sample new summaries instead of reusing cached LLM responses
+        audio_source: Replaces the URL extractor: called with (source_url, scratch)
+            on a worker thread, returns (audio_file_path, metadata). Used for uploads.
+        scratch: Already admitted scratch space (e.g. holding an upload); the
+            pipeline takes it over and closes it
+        source_url: URL the audio is fetched from, as the user submitted it
+            (defaults to podcast_url)
+
+    Returns:
+        Dict matching the PodcastResponse schema
+    """
+    audio_file_path = None
+    metadata = {}
+    audio_source = audio_source or extract_audio_from_podcast
+    source_url = source_url or podcast_url
+    # Checkpoint stage in progress, recorded as failed if the run raises
+    current_stage = CHECKPOINT_AUDIO
+    # The downloaded audio outlives a failed run until its transcript is checkpointed
+    keep_audio = False
+
+    def report_chunks(done: int, total: int):
+        if job:
+            job.emit('progress', stage=STAGE_TRANSCRIBING, completed=done, total=total)
+
+    try:
+        print(f"\n{'='*60}")
+        print(f"Processing podcast: {podcast_url}")
+        print(f"{'='*60}\n")
+
+        checkpoints = await run_db(load_checkpoints, podcast_url)
+        if fresh_summaries:
+            checkpoints.pop(CHECKPOINT_SUMMARY, None)
+            checkpoints.pop(CHECKPOINT_SUMMARY_TYPE_2, None)
+        audio_checkpoint = checkpoints.get(CHECKPOINT_AUDIO)
+        transcript_checkpoint = checkpoints.get(CHECKPOINT_TRANSCRIPT)
+        if audio_checkpoint and not transcript_checkpoint and not os.path.exists(audio_checkpoint['path']):
+            # The kept audio is gone (e.g. the machine restarted); download again
+            audio_checkpoint = None
+        if checkpoints:
+            print(f"Resuming from checkpoints: {', '.join(sorted(checkpoints))}\n")
+
+        if scratch is not None and not scratch.admitted:
+            # A staged upload only takes its share of the budget now that the job runs
+            await job_queue.run_blocking(scratch.admit)
+        if scratch is None and not transcript_checkpoint:
+            # Waits while other jobs hold the scratch disk budget
+            scratch = await job_queue.run_blocking(scratch_manager.open)
+
+        streaming = (
+            PIPELINE_STREAMING
+            and audio_source is extract_audio_from_podcast
+            and not audio_checkpoint
+            and not transcript_checkpoint
+        )
+        if streaming and await run_db(has_cached_source, podcast_url):
+            # Chunks go out before the audio hash is known; a transcript cached
+            # for this URL's audio is only found by the sequential path
+            print("  (transcript likely cached; not streaming)")
+            streaming = False
+
+        if streaming:
+            # Steps 1 and 2 overlapped: chunks are transcribed while the rest
+            # downloads, and summary notes are started as the transcript grows
+            print("Steps 1-2/4: Transcribing while the audio downloads...")
+            condenser = StreamingCondenser(openrouter_api_key, use_cache=not fresh_summaries)
+            extracting_started = _stage_started(job, STAGE_EXTRACTING)
+            transcribing_started = _stage_started(job, STAGE_TRANSCRIBING)
+            extracted = False
+
+            async def on_audio(path: str, found_metadata: Dict[str, Any]):
+                nonlocal audio_file_path, keep_audio, current_stage, extracted
+                audio_file_path = path
+                await run_db(
+                    save_checkpoint, podcast_url, CHECKPOINT_AUDIO,
+                    {'path': path, 'metadata': found_metadata}
+                )
+                keep_audio = True
+                current_stage = CHECKPOINT_TRANSCRIPT
+                extracted = True
+                _stage_completed(job, STAGE_EXTRACTING, extracting_started)
+                _publish_metadata(job, found_metadata, metadata_overrides)
+
+            try:
+                audio_file_path, metadata, transcript, segments = await stream_transcribe(
+                    source_url, scratch, openai_api_key, condenser, on_audio, report_chunks
+                )
+                audio_hash = await job_queue.run_blocking(hash_audio_file, audio_file_path)
+                await run_db(store_transcript, audio_hash, transcript, segments)
+                await run_db(remember_source, podcast_url, audio_hash)
+                await run_db(
+                    save_checkpoint, podcast_url, CHECKPOINT_TRANSCRIPT,
+                    {'transcript': transcript, 'segments': segments}
+                )
+            except BaseException:
+                condenser.cancel()
+                if not extracted:
+                    _stage_completed(job, STAGE_EXTRACTING, extracting_started, status='failed')
+                _stage_completed(job, STAGE_TRANSCRIBING, transcribing_started, status='failed')
+                raise
+            # The summarizers pick up the notes mapped while transcribing
+            condenser.finish(transcript)
+            keep_audio = False
+            _stage_completed(job, STAGE_TRANSCRIBING, transcribing_started)
+            AUDIO_SECONDS.inc(metadata.get('duration') or 0, source='whisper')
+        else:
+            # Step 1: Extract audio
+            print("Step 1/4: Extracting audio from podcast URL...")
+            if audio_checkpoint:
+                audio_file_path = audio_checkpoint['path']
+                metadata = audio_checkpoint['metadata']
+                if scratch:
+                    scratch.adopt(audio_file_path)
+                _emit_resumed(job, STAGE_EXTRACTING)
+            else:
+                with _stage(job, STAGE_EXTRACTING):
+                    audio_file_path, metadata = await job_queue.run_blocking(
+                        audio_source, source_url, scratch
+                    )
+                    await run_db(
+                        save_checkpoint, podcast_url, CHECKPOINT_AUDIO,
+                        {'path': audio_file_path, 'metadata': metadata}
+                    )
+            keep_audio = not transcript_checkpoint
+            _publish_metadata(job, metadata, metadata_overrides)
+
+            # Step 2: Transcribe
+            print("Step 2/4: Transcribing audio (this may take a while)...")
+            current_stage = CHECKPOINT_TRANSCRIPT
+            if transcript_checkpoint:
+                transcript = transcript_checkpoint['transcript']
+                # Checkpoints written before segments were kept have none
+                segments = transcript_checkpoint.get('segments', [])
+                _emit_resumed(job, STAGE_TRANSCRIBING)
+            else:
+                with _stage(job, STAGE_TRANSCRIBING):
+                    # The same episode often arrives through different URLs; key on the audio itself
+                    audio_hash = await job_queue.run_blocking(hash_audio_file, audio_file_path)
+                    cached = await run_db(get_cached_transcript, audio_hash)
+                    await run_db(remember_source, podcast_url, audio_hash)
+                    if cached:
+                        transcript, segments = cached
+                        transcript_source = 'cache'
+                        print("  (transcript served from cache)")
+                    else:
+                        transcript, segments = await job_queue.run_blocking(
+                            transcribe_audio_segments, audio_file_path, openai_api_key, report_chunks, scratch
+                        )
+                        await run_db(store_transcript, audio_hash, transcript, segments)
+                        transcript_source = 'whisper'
+                    await run_db(
+                        save_checkpoint, podcast_url, CHECKPOINT_TRANSCRIPT,
+                        {'transcript': transcript, 'segments': segments}
+                    )
+                keep_audio = False
+                AUDIO_SECONDS.inc(metadata.get('duration') or 0, source=transcript_source)
+        if job:
+            job.emit('partial', transcript=transcript)
+        print(f"✓ Transcription completed")
+        print(f"  Transcript length: {len(transcript)} characters\n")
+
+        current_stage = CHECKPOINT_SUMMARY
+
+        # Key sentences in milliseconds, shown while the LLM summaries are written
+        preview = await job_queue.run_blocking(extractive_summary, transcript)
+        if job:
+            job.emit('partial', preview=preview)
+
+        # Step 3: Generate Type 1 (expert-level) and Type 2 (structured) summaries concurrently
+        print("Step 3/4: Generating Type 1 and Type 2 summaries...")
+        with _stage(job, STAGE_SUMMARIZING):
+            summary_type_1, summary_type_2 = await asyncio.gather(
+                _emit_partial(job, 'summary', _checkpointed_summary(
+                    podcast_url, checkpoints, CHECKPOINT_SUMMARY,
+                    lambda: summarize_transcript(
+                        transcript, openrouter_api_key, use_cache=not fresh_summaries
+                    )
+                )),
+                _emit_partial(job, 'summary_type_2', _checkpointed_summary(
+                    podcast_url, checkpoints, CHECKPOINT_SUMMARY_TYPE_2,
+                    lambda: summarize_transcript_type2(
+                        transcript, openrouter_api_key, use_cache=not fresh_summaries
+                    )
+                )),
+                return_exceptions=True
+            )
+            for stage, result in ((CHECKPOINT_SUMMARY, summary_type_1), (CHECKPOINT_SUMMARY_TYPE_2, summary_type_2)):
+                if isinstance(result, Exception):
+                    await run_db(mark_checkpoint_failed, podcast_url, stage, str(result))
+            summary_type_1, summary_type_2 = _apply_fallbacks(
+                job, metadata, preview, summary_type_1, summary_type_2
+            )
+        print(f"✓ Summaries generated")
+        print(f"  Type 1 summary length: {len(summary_type_1)} characters")
+        print(f"  Type 2 summary length: {len(summary_type_2 or '')} characters\n")
+
+        # Step 4: Save to database
+        print("Step 4/4: Saving to database...")
+        current_stage = CHECKPOINT_SAVE
+        with _stage(job, STAGE_SAVING):
+            summary_id = await run_db(
+                save_summary,
+                podcast_url=podcast_url,
+                transcript=transcript,
+                summary_type_1=summary_type_1,
+                summary_type_2=summary_type_2,
+                metadata=metadata,
+                podcast_title=metadata.get('title', 'Unknown'),
+                summary_preview=preview,
+                segments=segments
+            )
+        if not metadata.get(SUMMARY_FALLBACK_KEY):
+            # Fallback results are retried later; their checkpoints let that retry skip ahead
+            await run_db(clear_checkpoints, podcast_url)
+        print(f"✓ Saved to database (ID: {summary_id})\n")
+        print(f"{'='*60}")
+        print("Processing complete!")
+        print(f"{'='*60}\n")
+
+        return {
+            'transcript': transcript,
+            'summary': summary_type_1,
+            'summary_type_2': summary_type_2,
+            'preview': preview,
+            'metadata': metadata,
+            'summary_id': summary_id,
+        }
+
+    except Exception as e:
+        logger.error(f"Error processing podcast: {str(e)}")
+        try:
+            await run_db(mark_checkpoint_failed, podcast_url, current_stage, str(e))
+        except Exception as checkpoint_error:
+            logger.warning(f"Failed to record failed stage: {str(checkpoint_error)}")
+        raise Exception(f"Error processing podcast: {str(e)}")
+    finally:
+        # Clean up scratch files, keeping the audio if a retry will resume from it
+        if scratch is not None:
+            if keep_audio:
+                scratch.keep(audio_file_path)
+                logger.info(f"Keeping audio file for resume: {audio_file_path}")
+            scratch.close()
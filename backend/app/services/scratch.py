@@ -0,0 +1,537 @@
+import os
+import re
+import time
+import uuid
+import shutil
+import asyncio
+import tempfile
+import threading
+import logging
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set
+
+from app.database import DB_PATH
+from app.services.metrics import (
+    SCRATCH_BUDGETS, SCRATCH_RESERVED_BYTES, SCRATCH_USED_BYTES, SCRATCH_SPACES,
+    SCRATCH_WAIT_SECONDS, SCRATCH_SWEPT
+)
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Every job gets its own directory under here
+SCRATCH_DIR = os.getenv("SCRATCH_DIR", os.path.join(tempfile.gettempdir(), 'podcast-scratch'))
+
+# Disk reserved by all jobs together; new jobs wait until there is room
+SCRATCH_BUDGET_BYTES = int(os.getenv("SCRATCH_BUDGET_BYTES", str(2048 * MB)))
+
+# Reserved for each job on admission: the speech audio plus copies of its chunks.
+# Sources that must be downloaded before encoding reserve their size on top.
+SCRATCH_JOB_RESERVE_BYTES = int(os.getenv("SCRATCH_JOB_RESERVE_BYTES", str(128 * MB)))
+
+# A job waiting longer than this for scratch space fails instead
+SCRATCH_ADMISSION_TIMEOUT_SECONDS = float(os.getenv("SCRATCH_ADMISSION_TIMEOUT_SECONDS", "900"))
+
+# Disk that uploads waiting in the job queue may hold, outside the job budget.
+# They only count against the budget once their job runs; an upload that
+# would take staging over this cap is refused.
+SCRATCH_STAGING_BUDGET_BYTES = int(os.getenv("SCRATCH_STAGING_BUDGET_BYTES", str(SCRATCH_BUDGET_BYTES)))
+
+# Optional RAM-backed directory (e.g. /dev/shm) for small files such as
+# transcription chunks; empty keeps everything on disk
+SCRATCH_TMPFS_DIR = os.getenv("SCRATCH_TMPFS_DIR", "")
+SCRATCH_TMPFS_MAX_FILE_BYTES = int(os.getenv("SCRATCH_TMPFS_MAX_FILE_BYTES", str(8 * MB)))
+SCRATCH_TMPFS_BUDGET_BYTES = int(os.getenv("SCRATCH_TMPFS_BUDGET_BYTES", str(64 * MB)))
+
+# How often orphaned scratch files are looked for (also done at startup)
+SCRATCH_SWEEP_INTERVAL_SECONDS = float(os.getenv("SCRATCH_SWEEP_INTERVAL_SECONDS", "600"))
+
+# Directories of another live process are only swept once this old
+SCRATCH_FOREIGN_MAX_AGE_SECONDS = float(os.getenv("SCRATCH_FOREIGN_MAX_AGE_SECONDS", str(24 * 3600)))
+
+# Audio left in the system temp dir by versions before the scratch directory:
+# tempfile names (prefix plus 8 random characters) with the extensions yt-dlp
+# and the old MP3 compression step produced. Nothing else there is touched.
+LEGACY_TEMP_FILE_PATTERN = re.compile(
+    r'(compressed_)?podcast_[a-z0-9_]{8}\.(mp3|m4a|mp4|aac|webm|opus|ogg|part)'
+)
+LEGACY_MAX_AGE_SECONDS = 3600
+
+# The summaries database may live in the temp dir too (no volume mounted)
+PROTECTED_TEMP_FILES = {
+    os.path.abspath(DB_PATH) + suffix for suffix in ('', '-wal', '-shm', '-journal')
+}
+
+SPACE_PREFIX = 'job-'
+
+
+class ScratchBudgetError(Exception):
+    """Raised when a job cannot be given scratch space in time."""
+
+
+def _remove(path: str) -> bool:
+    """Delete a file or directory tree; True if something was removed."""
+    try:
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        else:
+            os.unlink(path)
+        return True
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        logger.warning(f"Failed to remove scratch path {path}: {str(e)}")
+        return False
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ScratchSpace:
+    """
+    Scratch files of one job.
+
+    Every file handed out (or adopted) is tracked. close() deletes all of
+    them, and anything else left in the job's directories, except files
+    marked with keep(), then gives the job's reservation back.
+
+    A staged space (see ScratchManager.stage) is not admitted yet: its
+    reservation counts against the staging cap until admit() is called.
+    """
+
+    def __init__(self, manager: "ScratchManager", name: str, reserved: int, admitted: bool = True):
+        self.manager = manager
+        self.name = name
+        self.directory = os.path.join(manager.root, name)
+        self.reserved = reserved
+        self.admitted = admitted
+        # Path -> bytes charged to the tmpfs budget (0 for files on disk)
+        self._artifacts: Dict[str, int] = {}
+        self._kept: Set[str] = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def path(self, filename: str, expected_bytes: Optional[int] = None) -> str:
+        """
+        Path for a new scratch file.
+
+        Files expected to be small go to the tmpfs directory when one is
+        configured and its budget allows.
+        """
+        tmpfs_bytes = self.manager._claim_tmpfs(expected_bytes)
+        base = self.manager.tmpfs_root if tmpfs_bytes else self.manager.root
+        directory = os.path.join(base, self.name)
+        os.makedirs(directory, exist_ok=True)
+
+        path = os.path.join(directory, filename)
+        with self._lock:
+            self._artifacts[path] = tmpfs_bytes
+        return path
+
+    def adopt(self, path: str):
+        """Track an existing file, e.g. audio kept by a failed run of the same episode."""
+        self.manager._unretain(path)
+        with self._lock:
+            self._artifacts.setdefault(path, 0)
+
+    def keep(self, path: str):
+        """Leave a file in place when the space is closed."""
+        with self._lock:
+            self._kept.add(path)
+
+    def reserve(self, extra_bytes: int):
+        """
+        Grow this job's reservation, e.g. once a download's size is known.
+
+        Raises:
+            ScratchBudgetError: If the space is staged and staging is full
+        """
+        if extra_bytes > 0:
+            self.manager._grow(self, extra_bytes)
+
+    def admit(self, timeout: float = SCRATCH_ADMISSION_TIMEOUT_SECONDS):
+        """
+        Move a staged space into the job budget, waiting for room like open().
+
+        Call once the job holds its queue slot. Does nothing if already admitted.
+
+        Raises:
+            ScratchBudgetError: If no room was freed within `timeout` seconds
+        """
+        self.manager._admit(self, timeout)
+
+    def release(self, path: str):
+        """Delete one file now and stop tracking it."""
+        with self._lock:
+            tmpfs_bytes = self._artifacts.pop(path, 0)
+            self._kept.discard(path)
+        _remove(path)
+        self.manager._release_tmpfs(tmpfs_bytes)
+
+    def usage(self) -> int:
+        """Bytes currently on disk (or tmpfs) in tracked files."""
+        with self._lock:
+            paths = list(self._artifacts)
+        return sum(_file_size(path) for path in paths)
+
+    def close(self):
+        """Delete everything not kept and return the reservation. Safe to call twice."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            artifacts = dict(self._artifacts)
+            kept = set(self._kept)
+            self._artifacts.clear()
+
+        for path, tmpfs_bytes in artifacts.items():
+            if path not in kept:
+                _remove(path)
+            self.manager._release_tmpfs(tmpfs_bytes)
+
+        own_dirs = [os.path.join(base, self.name) for base in (self.manager.root, self.manager.tmpfs_root) if base]
+        # Adopted files live in the directory of the run that kept them
+        parent_dirs = {os.path.dirname(path) for path in artifacts if path not in kept}
+        for directory in own_dirs:
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.listdir(directory):
+                path = os.path.join(directory, entry)
+                if path not in kept:
+                    # Also catches files named by tools (yt-dlp, ffmpeg) rather than by us
+                    _remove(path)
+        for directory in set(own_dirs) | parent_dirs:
+            if self.manager._is_space_dir(directory):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    pass
+
+        self.manager._close(self, kept)
+
+
+class ScratchManager:
+    """
+    Global bookkeeping for job scratch space.
+
+    Jobs are admitted against a disk budget: opening a space reserves
+    `job_reserve_bytes` and blocks while the reservations of the other
+    admitted spaces leave no room (a job is always admitted when it would
+    be alone, so one oversized job cannot stall forever). Growing an
+    admitted job's reservation never blocks, so jobs can't deadlock on
+    each other.
+
+    Uploads arrive before their job has a queue slot, so they are staged
+    instead: a staged space never waits and is not part of the budget, so
+    it cannot hold back the running jobs its own job is queued behind. It
+    is admitted, against the budget, once its job starts.
+
+    Directories are named after the owning process, so a sweep can tell
+    orphans (left by a crash or a previous run) from live jobs.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        budget_bytes: int,
+        job_reserve_bytes: int,
+        tmpfs_root: str = "",
+        tmpfs_max_file_bytes: int = 0,
+        tmpfs_budget_bytes: int = 0,
+        staging_budget_bytes: Optional[int] = None
+    ):
+        self.root = os.path.abspath(root)
+        self.budget_bytes = budget_bytes
+        self.job_reserve_bytes = job_reserve_bytes
+        self.tmpfs_root = os.path.abspath(tmpfs_root) if tmpfs_root else ""
+        self.tmpfs_max_file_bytes = tmpfs_max_file_bytes
+        self.tmpfs_budget_bytes = tmpfs_budget_bytes
+        self.staging_budget_bytes = budget_bytes if staging_budget_bytes is None else staging_budget_bytes
+        # Bytes reserved by admitted spaces (against the budget) and by staged ones
+        self.reserved = 0
+        self.staged = 0
+        self.admitted = 0
+        self.tmpfs_used = 0
+        self.waiting = 0
+        self._spaces: Dict[str, ScratchSpace] = {}
+        # Files kept by closed spaces in this process (resume audio), protected
+        # until a sweep's `protected` list is taken after they were kept
+        self._retained: Set[str] = set()
+        self._cond = threading.Condition()
+
+    def open(self, reserve_bytes: Optional[int] = None, timeout: float = SCRATCH_ADMISSION_TIMEOUT_SECONDS) -> ScratchSpace:
+        """
+        Admit a job and return its scratch space, waiting for budget if needed.
+
+        Raises:
+            ScratchBudgetError: If no room was freed within `timeout` seconds
+        """
+        reserve = self.job_reserve_bytes if reserve_bytes is None else reserve_bytes
+        started = time.monotonic()
+
+        with self._cond:
+            self._wait_for_room(reserve, started + timeout)
+            self.reserved += reserve
+            self.admitted += 1
+            space = self._new_space(reserve, admitted=True)
+
+        SCRATCH_WAIT_SECONDS.observe(time.monotonic() - started)
+        return space
+
+    def stage(self, reserve_bytes: Optional[int] = None) -> ScratchSpace:
+        """
+        Return a space for a job that is not running yet, without waiting.
+
+        Raises:
+            ScratchBudgetError: If the staging cap has no room left
+        """
+        reserve = self.job_reserve_bytes if reserve_bytes is None else reserve_bytes
+        with self._cond:
+            self._check_staging(reserve)
+            self.staged += reserve
+            return self._new_space(reserve, admitted=False)
+
+    def _new_space(self, reserve: int, admitted: bool) -> ScratchSpace:
+        space = ScratchSpace(self, f"{SPACE_PREFIX}{os.getpid()}-{uuid.uuid4().hex[:12]}", reserve, admitted)
+        self._spaces[space.name] = space
+        os.makedirs(space.directory, exist_ok=True)
+        return space
+
+    def _wait_for_room(self, reserve: int, deadline: float):
+        # Called holding the condition; staged spaces are not counted
+        self.waiting += 1
+        try:
+            while self.admitted and self.reserved + reserve > self.budget_bytes:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise ScratchBudgetError(
+                        f"No scratch space available: {self.reserved // MB}MB of "
+                        f"{self.budget_bytes // MB}MB reserved by {self.admitted} jobs"
+                    )
+                self._cond.wait(remaining)
+        finally:
+            self.waiting -= 1
+
+    def _check_staging(self, extra_bytes: int, own_bytes: int = 0):
+        # Like admission, one upload alone is always let in
+        if self.staged > own_bytes and self.staged + extra_bytes > self.staging_budget_bytes:
+            raise ScratchBudgetError(
+                f"No scratch space available for uploads: {self.staged // MB}MB of "
+                f"{self.staging_budget_bytes // MB}MB held by queued uploads"
+            )
+
+    def _admit(self, space: ScratchSpace, timeout: float):
+        started = time.monotonic()
+        with self._cond:
+            if space.admitted:
+                return
+            self._wait_for_room(space.reserved, started + timeout)
+            self.staged -= space.reserved
+            self.reserved += space.reserved
+            self.admitted += 1
+            space.admitted = True
+            # Staging room was freed
+            self._cond.notify_all()
+        SCRATCH_WAIT_SECONDS.observe(time.monotonic() - started)
+
+    def _grow(self, space: ScratchSpace, extra_bytes: int):
+        with self._cond:
+            if not space.admitted:
+                self._check_staging(extra_bytes, space.reserved)
+                space.reserved += extra_bytes
+                self.staged += extra_bytes
+                return
+            space.reserved += extra_bytes
+            self.reserved += extra_bytes
+            if self.reserved > self.budget_bytes:
+                logger.warning(
+                    f"Scratch reservations ({self.reserved // MB}MB) are over budget "
+                    f"({self.budget_bytes // MB}MB); new jobs will wait"
+                )
+
+    def _close(self, space: ScratchSpace, kept: Set[str]):
+        with self._cond:
+            if self._spaces.pop(space.name, None) is not None:
+                if space.admitted:
+                    self.reserved -= space.reserved
+                    self.admitted -= 1
+                else:
+                    self.staged -= space.reserved
+            self._retained.update(kept)
+            self._cond.notify_all()
+
+    def _unretain(self, path: str):
+        with self._cond:
+            self._retained.discard(path)
+
+    def _claim_tmpfs(self, expected_bytes: Optional[int]) -> int:
+        if not self.tmpfs_root or not expected_bytes or expected_bytes > self.tmpfs_max_file_bytes:
+            return 0
+        with self._cond:
+            if self.tmpfs_used + expected_bytes > self.tmpfs_budget_bytes:
+                return 0
+            self.tmpfs_used += expected_bytes
+        return expected_bytes
+
+    def _release_tmpfs(self, tmpfs_bytes: int):
+        if tmpfs_bytes:
+            with self._cond:
+                self.tmpfs_used -= tmpfs_bytes
+
+    def _is_space_dir(self, path: str) -> bool:
+        parent, name = os.path.split(path)
+        return name.startswith(SPACE_PREFIX) and parent in (self.root, self.tmpfs_root)
+
+    def _is_orphan(self, path: str, name: str, protected_dirs: Set[str]) -> bool:
+        with self._cond:
+            if name in self._spaces:
+                return False
+            retained_dirs = {os.path.dirname(kept) for kept in self._retained}
+        if path in protected_dirs or path in retained_dirs:
+            return False
+
+        try:
+            pid = int(name[len(SPACE_PREFIX):].split('-', 1)[0])
+        except ValueError:
+            pid = None
+        # Our own inactive directories, and those of dead processes, are orphans.
+        # In containers the PID is often the same after a restart, which is covered
+        # by the first case.
+        if pid == os.getpid() or (pid is not None and not _pid_alive(pid)):
+            return True
+        try:
+            return time.time() - os.path.getmtime(path) > SCRATCH_FOREIGN_MAX_AGE_SECONDS
+        except OSError:
+            return False
+
+    def sweep(self, protected: Iterable[str] = ()) -> int:
+        """
+        Remove orphaned scratch directories and legacy temp files.
+
+        Args:
+            protected: Files that must survive (audio a failed run kept for resuming)
+
+        Returns:
+            Number of directories and files removed
+        """
+        protected_dirs = {os.path.dirname(os.path.abspath(path)) for path in protected}
+        with self._cond:
+            retained_before = set(self._retained)
+        removed = 0
+
+        for base in (self.root, self.tmpfs_root):
+            if not base or not os.path.isdir(base):
+                continue
+            for name in os.listdir(base):
+                path = os.path.join(base, name)
+                if name.startswith(SPACE_PREFIX) and self._is_orphan(path, name, protected_dirs):
+                    removed += _remove(path)
+
+        temp_dir = tempfile.gettempdir()
+        cutoff = time.time() - LEGACY_MAX_AGE_SECONDS
+        for name in os.listdir(temp_dir):
+            if not LEGACY_TEMP_FILE_PATTERN.fullmatch(name):
+                continue
+            path = os.path.join(temp_dir, name)
+            if os.path.abspath(path) in PROTECTED_TEMP_FILES or not os.path.isfile(path):
+                continue
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    removed += _remove(path)
+            except OSError:
+                pass
+
+        # The next sweep's `protected` list is taken after this one and covers these
+        with self._cond:
+            self._retained -= retained_before
+
+        if removed:
+            SCRATCH_SWEPT.inc(removed)
+            logger.info(f"Scratch sweep removed {removed} orphaned entries")
+        return removed
+
+    def space_counts(self) -> Dict[str, int]:
+        """Admitted and staged spaces, and jobs waiting for room."""
+        with self._cond:
+            return {
+                'admitted': self.admitted,
+                'staged': len(self._spaces) - self.admitted,
+                'waiting': self.waiting,
+            }
+
+    def used_bytes(self) -> int:
+        """Bytes actually on disk (or tmpfs) across all open spaces."""
+        with self._cond:
+            spaces = list(self._spaces.values())
+        return sum(space.usage() for space in spaces)
+
+    def stats(self) -> Dict[str, int]:
+        """Budget, reservations and actual usage, in bytes, plus job counts."""
+        counts = self.space_counts()
+        with self._cond:
+            stats = {
+                'budget_bytes': self.budget_bytes,
+                'reserved_bytes': self.reserved,
+                'staged_bytes': self.staged,
+                'tmpfs_used_bytes': self.tmpfs_used,
+                'jobs': counts['admitted'],
+                'staged': counts['staged'],
+                'waiting': counts['waiting'],
+            }
+        stats['used_bytes'] = self.used_bytes()
+        return stats
+
+
+scratch_manager = ScratchManager(
+    SCRATCH_DIR,
+    SCRATCH_BUDGET_BYTES,
+    SCRATCH_JOB_RESERVE_BYTES,
+    tmpfs_root=SCRATCH_TMPFS_DIR,
+    tmpfs_max_file_bytes=SCRATCH_TMPFS_MAX_FILE_BYTES,
+    tmpfs_budget_bytes=SCRATCH_TMPFS_BUDGET_BYTES,
+    staging_budget_bytes=SCRATCH_STAGING_BUDGET_BYTES
+)
+
+
+async def sweep_periodically(protected_paths: Callable[[], Awaitable[Iterable[str]]]):
+    """Sweep orphans now and then every SCRATCH_SWEEP_INTERVAL_SECONDS, until cancelled."""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            protected = await protected_paths()
+            await loop.run_in_executor(None, scratch_manager.sweep, protected)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Scratch sweep failed: {str(e)}")
+        await asyncio.sleep(SCRATCH_SWEEP_INTERVAL_SECONDS)
+
+
+SCRATCH_BUDGETS.set_function(lambda: {
+    ('jobs',): scratch_manager.budget_bytes,
+    ('staging',): scratch_manager.staging_budget_bytes,
+    ('tmpfs',): scratch_manager.tmpfs_budget_bytes,
+})
+SCRATCH_RESERVED_BYTES.set_function(lambda: {
+    ('jobs',): scratch_manager.reserved,
+    ('staging',): scratch_manager.staged,
+    ('tmpfs',): scratch_manager.tmpfs_used,
+})
+SCRATCH_USED_BYTES.set_function(lambda: {(): scratch_manager.used_bytes()})
+SCRATCH_SPACES.set_function(lambda: {
+    (state,): count for state, count in scratch_manager.space_counts().items()
+})
@@ -0,0 +1,119 @@
+import sys
+import bisect
+from array import array
+from typing import Dict, List, Tuple
+
+# Times are stored as whole milliseconds in unsigned 32-bit ints (good for ~49 days)
+TIME_TYPECODE = 'I'
+OFFSET_TYPECODE = 'I'
+
+# Arrays are stored little-endian whatever the machine
+_SWAP = sys.byteorder != 'little'
+
+
+def _to_blob(values: array) -> bytes:
+    if _SWAP:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_blob(typecode: str, blob: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(blob)
+    if _SWAP:
+        values.byteswap()
+    return values
+
+
+def pack_segments(segments: List[Dict]) -> Dict[str, bytes]:
+    """
+    Pack timed segments into a compact columnar form.
+
+    Start and end times become packed millisecond arrays. All segment
+    texts are concatenated into one UTF-8 buffer, with an offsets array
+    (one entry per segment plus a final end offset) marking where each
+    segment's text starts. A segment costs 12 bytes plus its text.
+
+    Args:
+        segments: Segments with start, end (seconds) and text, in time order
+
+    Returns:
+        Dict of 'starts', 'ends', 'offsets' and 'text' blobs
+    """
+    starts = array(TIME_TYPECODE)
+    ends = array(TIME_TYPECODE)
+    offsets = array(OFFSET_TYPECODE, [0])
+    text = bytearray()
+
+    for segment in sorted(segments, key=lambda segment: segment['start']):
+        start_ms = max(0, int(round(segment['start'] * 1000)))
+        starts.append(start_ms)
+        ends.append(max(start_ms, int(round(segment['end'] * 1000))))
+        text += segment['text'].encode('utf-8')
+        offsets.append(len(text))
+
+    return {
+        'starts': _to_blob(starts),
+        'ends': _to_blob(ends),
+        'offsets': _to_blob(offsets),
+        'text': bytes(text),
+    }
+
+
+class SegmentIndex:
+    """
+    The time and offset arrays of packed segments, without the text.
+
+    Enough to find which segments overlap a time range and which byte
+    range of the text buffer holds them, so only that part of the text
+    has to be read.
+    """
+
+    def __init__(self, starts: bytes, ends: bytes, offsets: bytes):
+        self.starts = _from_blob(TIME_TYPECODE, starts)
+        self.ends = _from_blob(TIME_TYPECODE, ends)
+        self.offsets = _from_blob(OFFSET_TYPECODE, offsets)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def duration(self) -> float:
+        return (max(self.ends) / 1000) if len(self.ends) else 0.0
+
+    def find(self, start: float, end: float) -> Tuple[int, int]:
+        """
+        Index range [lo, hi) of the segments overlapping [start, end) seconds.
+
+        Uses binary search on the start times, so cost is logarithmic in
+        the number of segments plus the number of matches.
+        """
+        start_ms = int(start * 1000)
+        end_ms = int(end * 1000)
+
+        hi = bisect.bisect_left(self.starts, end_ms)
+        # The segment that starts before the range may still run into it
+        lo = max(0, bisect.bisect_right(self.starts, start_ms) - 1)
+        while lo < hi and self.ends[lo] <= start_ms:
+            lo += 1
+        return lo, hi
+
+    def byte_range(self, lo: int, hi: int) -> Tuple[int, int]:
+        """Byte offsets [first, last) in the text buffer of segments lo..hi-1."""
+        return self.offsets[lo], self.offsets[hi]
+
+    def segments(self, lo: int, hi: int, text: bytes) -> List[Dict]:
+        """
+        Unpack segments lo..hi-1, given just their slice of the text buffer
+        (as returned for byte_range(lo, hi)).
+        """
+        base = self.offsets[lo]
+        return [
+            {
+                'start': self.starts[i] / 1000,
+                'end': self.ends[i] / 1000,
+                'text': text[self.offsets[i] - base:self.offsets[i + 1] - base].decode('utf-8'),
+            }
+            for i in range(lo, hi)
+        ]
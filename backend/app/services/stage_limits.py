@@ -0,0 +1,98 @@
+import os
+import time
+import threading
+import logging
+from contextlib import contextmanager, ExitStack
+from typing import Dict, Iterator, Sequence
+
+from app.services.metrics import STAGE_SLOTS, STAGE_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Each pipeline stage is limited by a different resource, so each gets its
+# own cap. Jobs flow through the stages independently and overall throughput
+# is set by whichever resource is slowest, not by running jobs one by one.
+STAGE_DOWNLOAD = "download"      # network-bound: yt-dlp / ffmpeg reading the source
+STAGE_FFMPEG = "ffmpeg"          # CPU-bound: encoding, silence detection, chunk cuts
+STAGE_TRANSCRIBE = "transcribe"  # rate-limited: Whisper uploads
+
+STAGE_LIMITS = {
+    STAGE_DOWNLOAD: int(os.getenv("STAGE_DOWNLOAD_CONCURRENCY", "4")),
+    STAGE_FFMPEG: int(os.getenv("STAGE_FFMPEG_CONCURRENCY", str(os.cpu_count() or 2))),
+    STAGE_TRANSCRIBE: int(os.getenv(
+        "STAGE_TRANSCRIBE_CONCURRENCY",
+        os.getenv("TRANSCRIBE_MAX_WORKERS", "4")
+    )),
+}
+
+
+class StageLimiter:
+    """
+    Concurrency cap for one stage, shared by every job in the process.
+
+    The stages run inside worker threads, so this is a thread semaphore.
+    Active and waiting counts are tracked for progress reporting.
+    """
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = threading.BoundedSemaphore(self.limit)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self) -> Iterator[None]:
+        with self._lock:
+            self.waiting += 1
+        started = time.perf_counter()
+        self._semaphore.acquire()
+        STAGE_WAIT_SECONDS.observe(time.perf_counter() - started, stage=self.name)
+        with self._lock:
+            self.waiting -= 1
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'limit': self.limit, 'active': self.active, 'waiting': self.waiting}
+
+
+_limiters = {name: StageLimiter(name, limit) for name, limit in STAGE_LIMITS.items()}
+
+
+def stage_limit(name: str):
+    """
+    Context manager holding a slot of the given stage for its duration.
+
+    Nested slots must always be taken in the order download, ffmpeg,
+    transcribe so two jobs can never wait on each other.
+    """
+    return _limiters[name].acquire()
+
+
+@contextmanager
+def stage_slots(names: Sequence[str]) -> Iterator[None]:
+    """Hold a slot of each of the given stages, taken in the order given."""
+    with ExitStack() as stack:
+        for name in names:
+            stack.enter_context(stage_limit(name))
+        yield
+
+
+def stage_stats() -> Dict[str, Dict[str, int]]:
+    """Current limit, active and waiting counts for every stage."""
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
+
+
+STAGE_SLOTS.set_function(lambda: {
+    (name, state): value
+    for name, stats in stage_stats().items()
+    for state, value in stats.items()
+})
@@ -0,0 +1,142 @@
+import os
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.services.audio_extractor import extract_audio_from_podcast, StreamStopped
+from app.services.transcriber import submit_streamed_chunk, TRANSCRIBE_MAX_WORKERS
+from app.services.transcription_backends import get_backend
+from app.services.map_reduce import StreamingCondenser
+from app.services.job_queue import job_queue
+from app.services.scratch import ScratchSpace
+
+logger = logging.getLogger(__name__)
+
+# Run download, transcription and summary notes overlapped instead of one
+# after the other (URL jobs only)
+PIPELINE_STREAMING = os.getenv("PIPELINE_STREAMING", "0") == "1"
+
+# Finished chunks waiting for a transcription slot. When full, handing on the
+# next chunk waits (ffmpeg keeps downloading meanwhile; chunks are small).
+STREAM_QUEUE_CHUNKS = int(os.getenv("STREAM_QUEUE_CHUNKS", "2"))
+
+# Chunks of one episode transcribed at once (the Whisper pool caps all jobs)
+STREAM_TRANSCRIBE_WORKERS = int(os.getenv("STREAM_TRANSCRIBE_WORKERS", str(TRANSCRIBE_MAX_WORKERS)))
+
+# Marks the end of the chunk stream
+_DONE = None
+
+
+async def stream_transcribe(
+    podcast_url: str,
+    scratch: ScratchSpace,
+    openai_api_key: str,
+    condenser: StreamingCondenser,
+    on_audio: Callable[[str, Dict], Awaitable[None]],
+    progress_callback: Optional[Callable[[int, int], None]] = None
+) -> Tuple[str, Dict, str, List[Dict]]:
+    """
+    Download, transcribe and condense an episode with the stages overlapped.
+
+    Three stages joined by bounded queues:
+    1. The download thread encodes the episode and cuts it into chunks as
+       the audio arrives (extract_audio_from_podcast with on_chunk).
+    2. Transcription workers send each finished chunk to Whisper.
+    3. Transcribed chunks are fed, in order, to the condenser, which
+       starts summary map calls as soon as a section is complete.
+    Each stage waits when the next one falls behind: feeding the condenser
+    waits on its map backlog, which holds up the worker, which leaves
+    chunks in the queue, which blocks the download thread from handing on
+    more. Total time approaches the download time plus one chunk.
+
+    Args:
+        podcast_url: Podcast episode URL
+        scratch: Job scratch space for the audio and chunks
+        openai_api_key: OpenAI API key for transcription
+        condenser: Receives the transcript text as it is produced
+        on_audio: Awaited with (audio_file_path, metadata) once the whole
+            episode has downloaded, while transcription may still be running
+        progress_callback: Called with (chunks done, chunks known so far)
+
+    Returns:
+        Tuple of (audio_file_path, metadata, transcript, segments)
+    """
+    loop = asyncio.get_running_loop()
+    backend = get_backend(openai_api_key)
+    chunks: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_CHUNKS)
+    stopped = threading.Event()
+
+    results: Dict[int, Tuple[str, List[Dict]]] = {}
+    texts: List[str] = []
+    segments: List[Dict] = []
+    feed_lock = asyncio.Lock()
+    progress = {'known': 0, 'done': 0}
+
+    def on_chunk(path: str, start: float, end: float):
+        # Runs on the download thread; blocks while the queue is full
+        index = progress['known']
+        progress['known'] += 1
+        pending = asyncio.run_coroutine_threadsafe(chunks.put((index, path, start)), loop)
+        while True:
+            if stopped.is_set():
+                pending.cancel()
+                raise StreamStopped("Streaming pipeline stopped")
+            try:
+                pending.result(timeout=0.5)
+                return
+            except concurrent.futures.TimeoutError:
+                continue
+
+    extraction = asyncio.ensure_future(job_queue.run_blocking(
+        extract_audio_from_podcast, podcast_url, scratch, on_chunk, stopped
+    ))
+
+    async def download():
+        # Shielded so a failure elsewhere can still wait for the thread to wind down
+        audio_file_path, metadata = await asyncio.shield(extraction)
+        for _ in range(STREAM_TRANSCRIBE_WORKERS):
+            await chunks.put(_DONE)
+        await on_audio(audio_file_path, metadata)
+        return audio_file_path, metadata
+
+    async def feed_in_order():
+        # Chunks finish out of order; the transcript and the condenser need them in order
+        async with feed_lock:
+            while len(texts) in results:
+                text, chunk_segments = results.pop(len(texts))
+                texts.append(text)
+                segments.extend(chunk_segments)
+                await condenser.feed(text)
+
+    async def transcribe():
+        while True:
+            item = await chunks.get()
+            if item is _DONE:
+                return
+            index, path, start = item
+            results[index] = await asyncio.wrap_future(
+                submit_streamed_chunk(backend, path, start, scratch)
+            )
+            progress['done'] += 1
+            if progress_callback:
+                progress_callback(progress['done'], progress['known'])
+            await feed_in_order()
+
+    logger.info(f"Streaming {podcast_url}: {STREAM_TRANSCRIBE_WORKERS} transcription workers")
+    tasks = [asyncio.ensure_future(download())]
+    tasks += [asyncio.ensure_future(transcribe()) for _ in range(STREAM_TRANSCRIBE_WORKERS)]
+    try:
+        done = await asyncio.gather(*tasks)
+    except BaseException:
+        stopped.set()
+        for task in tasks:
+            task.cancel()
+        # Let the download thread notice and stop ffmpeg before scratch is closed
+        await asyncio.gather(*tasks, extraction, return_exceptions=True)
+        raise
+
+    audio_file_path, metadata = done[0]
+    transcript = ' '.join(text for text in texts if text)
+    return audio_file_path, metadata, transcript, segments
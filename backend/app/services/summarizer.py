@@ -1,18 +1,24 @@
 import os
-import requests
 from typing import Optional
 import logging
+from app.services.llm_client import llm_client, DEFAULT_MODEL
+from app.services.map_reduce import prepare_transcript
 
 logger = logging.getLogger(__name__)
 
 
-def summarize_transcript(transcript: str, api_key: Optional[str] = None) -> str:
+async def summarize_transcript(
+    transcript: str,
+    api_key: Optional[str] = None,
+    use_cache: bool = True
+) -> str:
     """
     Generate summary of transcript using OpenRouter API (ChatGPT).
     
     Args:
         transcript: Full transcript text
         api_key: OpenRouter API key (optional, can use env var)
+        use_cache: Reuse identical earlier LLM responses (False samples afresh)
         
     Returns:
         Summary text
@@ -22,27 +28,13 @@ def summarize_transcript(transcript: str, api_key: Optional[str] = None) -> str:
     if not api_key:
         raise ValueError("OpenRouter API key is required")
     
-    # OpenRouter API endpoint
-    url = "https://openrouter.ai/api/v1/chat/completions"
-    
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "https://github.com/alexanderclapp/podcast-transcription",  # Optional
-        "X-Title": "Podcast Transcription App"  # Optional
-    }
-    
-    # Handle long transcripts by truncating if needed (OpenRouter has token limits)
-    # Most models can handle ~4000 tokens in context, so we'll limit transcript to ~8000 chars
-    max_transcript_length = 8000
-    truncated = False
-    if len(transcript) > max_transcript_length:
-        logger.warning(f"Transcript is very long ({len(transcript)} chars), truncating for summary")
-        transcript = transcript[:max_transcript_length] + "... [truncated]"
-        truncated = True
+    # Long transcripts are condensed with map-reduce so the summary covers the whole episode
+    transcript, condensed = await prepare_transcript(transcript, api_key, use_cache=use_cache)
+    if condensed:
+        logger.info(f"Summarizing condensed notes ({len(transcript)} chars) covering the full transcript")
     
     # Prepare expert-level prompt for summarization
-    transcript_note = " (note: transcript has been truncated)" if truncated else ""
+    transcript_note = " (note: condensed into section notes covering the full episode)" if condensed else ""
     
     prompt = f"""**Situation**
 
@@ -82,34 +74,21 @@ The total length should be optimized for a 10 minute reading time (approximately
 
 **Summary:**"""
     
-    payload = {
-        "model": "openai/gpt-3.5-turbo",
-        "messages": [
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        "temperature": 0.7,
-        "max_tokens": 3000  # Increased for longer, more detailed summaries (900-1500 words, ~10 min read)
-    }
-    
     try:
         logger.info("Generating summary using OpenRouter API")
         
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()
-        
-        result = response.json()
-        summary = result["choices"][0]["message"]["content"]
+        summary = await llm_client.chat_completion(
+            prompt,
+            api_key,
+            model=DEFAULT_MODEL,
+            use_cache=use_cache,
+            temperature=0.7,
+            max_tokens=3000  # Increased for longer, more detailed summaries (900-1500 words, ~10 min read)
+        )
         
         logger.info("Summary generated successfully")
         return summary
         
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error calling OpenRouter API: {str(e)}")
-        raise Exception(f"Failed to generate summary: {str(e)}")
     except Exception as e:
-        logger.error(f"Unexpected error during summarization: {str(e)}")
+        logger.error(f"Error calling OpenRouter API: {str(e)}")
         raise Exception(f"Failed to generate summary: {str(e)}")
-
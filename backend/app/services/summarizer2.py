@@ -1,12 +1,17 @@
 import os
-import requests
 from typing import Optional
 import logging
+from app.services.llm_client import llm_client, DEFAULT_MODEL
+from app.services.map_reduce import prepare_transcript
 
 logger = logging.getLogger(__name__)
 
 
-def summarize_transcript_type2(transcript: str, api_key: Optional[str] = None) -> str:
+async def summarize_transcript_type2(
+    transcript: str,
+    api_key: Optional[str] = None,
+    use_cache: bool = True
+) -> str:
     """
     Generate structured summary (Type 2) of transcript using OpenRouter API.
     Focuses on facts, frameworks, numbers, and structured format.
@@ -14,6 +19,7 @@ def summarize_transcript_type2(transcript: str, api_key: Optional[str] = None) -
     Args:
         transcript: Full transcript text
         api_key: OpenRouter API key (optional, can use env var)
+        use_cache: Reuse identical earlier LLM responses (False samples afresh)
         
     Returns:
         Structured summary text
@@ -23,16 +29,6 @@ def summarize_transcript_type2(transcript: str, api_key: Optional[str] = None) -
     if not api_key:
         raise ValueError("OpenRouter API key is required")
     
-    # OpenRouter API endpoint
-    url = "https://openrouter.ai/api/v1/chat/completions"
-    
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "https://github.com/alexanderclapp/podcast-transcription",
-        "X-Title": "Podcast Transcription App"
-    }
-    
     # Calculate target summary length
     # Target: ~3000 words, or 1/4 of transcript length if transcript is shorter than 3000 words
     transcript_word_count = len(transcript.split())
@@ -51,17 +47,12 @@ def summarize_transcript_type2(transcript: str, api_key: Optional[str] = None) -
     
     logger.info(f"Transcript word count: {transcript_word_count}, Target summary: {target_words} words, Tokens: min={min_tokens}, max={max_tokens}")
     
-    # Handle long transcripts by truncating if needed (keep more for longer summaries)
-    # For 3000 word summaries, we need more context
-    max_transcript_length = 12000  # Increased to allow for longer summaries
-    truncated = False
-    original_transcript = transcript
-    if len(transcript) > max_transcript_length:
-        logger.warning(f"Transcript is very long ({len(transcript)} chars), truncating for summary")
-        transcript = transcript[:max_transcript_length] + "... [truncated]"
-        truncated = True
+    # Long transcripts are condensed with map-reduce so the summary covers the whole episode
+    transcript, condensed = await prepare_transcript(transcript, api_key, use_cache=use_cache)
+    if condensed:
+        logger.info(f"Summarizing condensed notes ({len(transcript)} chars) covering the full transcript")
     
-    transcript_note = " (note: transcript has been truncated)" if truncated else ""
+    transcript_note = " (note: condensed into section notes covering the full episode)" if condensed else ""
     
     prompt = f"""You are a specialist summariser for long-form content: podcasts, interviews, fireside chats, and multi-hour transcripts.
 
@@ -115,35 +106,22 @@ Ignore podcast housekeeping ("follow us on Apple", etc.) unless relevant.
 
 **Summary:**"""
     
-    payload = {
-        "model": "openai/gpt-3.5-turbo",
-        "messages": [
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        "temperature": 0.7,
-        "min_tokens": min_tokens,  # Minimum tokens based on target length
-        "max_tokens": max_tokens  # Maximum tokens based on target length (with buffer)
-    }
-    
     try:
         logger.info("Generating Type 2 structured summary using OpenRouter API")
         
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()
-        
-        result = response.json()
-        summary = result["choices"][0]["message"]["content"]
+        summary = await llm_client.chat_completion(
+            prompt,
+            api_key,
+            model=DEFAULT_MODEL,
+            use_cache=use_cache,
+            temperature=0.7,
+            min_tokens=min_tokens,  # Minimum tokens based on target length
+            max_tokens=max_tokens  # Maximum tokens based on target length (with buffer)
+        )
         
         logger.info("Type 2 summary generated successfully")
         return summary
         
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error calling OpenRouter API: {str(e)}")
-        raise Exception(f"Failed to generate summary: {str(e)}")
     except Exception as e:
-        logger.error(f"Unexpected error during summarization: {str(e)}")
+        logger.error(f"Error calling OpenRouter API: {str(e)}")
         raise Exception(f"Failed to generate summary: {str(e)}")
-
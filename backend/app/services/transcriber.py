@@ -1,22 +1,58 @@
 import os
-from openai import OpenAI
-from typing import Optional
+import re
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
 import logging
 import subprocess
-import tempfile
+
+from app.services.audio_extractor import probe_duration
+from app.services.scratch import ScratchSpace, scratch_manager
+from app.services.stage_limits import stage_limit, STAGE_FFMPEG
+from app.services.vad import TimeMap, trim_non_speech
+from app.services.metrics import FFMPEG_SECONDS
+from app.services.transcription_backends import (
+    TranscriptionBackend, OPENAI_MAX_FILE_SIZE, get_backend
+)
 
 logger = logging.getLogger(__name__)
 
 # OpenAI Whisper API has a 25MB file size limit
-MAX_FILE_SIZE = 25 * 1024 * 1024  # 25MB in bytes
+MAX_FILE_SIZE = OPENAI_MAX_FILE_SIZE
+
+# "chunked" splits audio at silences and transcribes the pieces in parallel;
+# "compress" is the legacy single-upload mode that re-encodes oversized files
+TRANSCRIBE_MODE = os.getenv("TRANSCRIBE_MODE", "chunked")
+
+# Longest chunk to send in chunked mode. Shorter chunks mean more parallelism.
+CHUNK_MAX_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_SECONDS", "600"))
+
+# Chunks are also sized to stay safely under the upload limit
+CHUNK_MAX_BYTES = int(os.getenv("TRANSCRIBE_CHUNK_BYTES", str(20 * 1024 * 1024)))
+
+# Whisper uploads in flight across all jobs
+TRANSCRIBE_MAX_WORKERS = int(os.getenv("TRANSCRIBE_MAX_WORKERS", "4"))
+
+# Silence detection settings used to pick cut points
+SILENCE_NOISE_DB = os.getenv("TRANSCRIBE_SILENCE_NOISE", "-35dB")
+SILENCE_MIN_SECONDS = float(os.getenv("TRANSCRIBE_SILENCE_MIN_SECONDS", "0.4"))
+
+# Cut long silences and music out before transcribing. Off by default: it
+# costs an extra decode and encode per episode
+TRANSCRIBE_TRIM = os.getenv("TRANSCRIBE_TRIM", "0") == "1"
 
+_chunk_executor = ThreadPoolExecutor(
+    max_workers=TRANSCRIBE_MAX_WORKERS,
+    thread_name_prefix='whisper'
+)
 
-def _compress_audio_if_needed(audio_file_path: str) -> str:
+
+def _compress_audio_if_needed(audio_file_path: str, scratch: ScratchSpace) -> str:
     """
     Compress audio file if it exceeds the size limit.
     
     Args:
         audio_file_path: Path to original audio file
+        scratch: Job scratch space the compressed file is written to
         
     Returns:
         Path to compressed audio file (or original if under limit)
@@ -29,21 +65,22 @@ def _compress_audio_if_needed(audio_file_path: str) -> str:
     
     logger.warning(f"File size ({file_size / 1024 / 1024:.2f}MB) exceeds limit, compressing...")
     
-    # Create temporary compressed file
-    temp_dir = tempfile.gettempdir()
-    compressed_path = os.path.join(temp_dir, f"compressed_{os.path.basename(audio_file_path)}")
+    # Always MP3, whatever the source container
+    base_name, _ = os.path.splitext(os.path.basename(audio_file_path))
+    compressed_path = scratch.path(f"compressed_{base_name}.mp3")
     
     try:
         # Use ffmpeg to compress to lower bitrate (64kbps should be enough for speech)
         # and ensure it's under 25MB
-        subprocess.run([
-            'ffmpeg', '-i', audio_file_path,
-            '-codec:a', 'libmp3lame',
-            '-b:a', '64k',
-            '-ar', '16000',  # Sample rate good for speech
-            '-y',  # Overwrite output file
-            compressed_path
-        ], check=True, capture_output=True)
+        with stage_limit(STAGE_FFMPEG), FFMPEG_SECONDS.time(operation='compress'):
+            subprocess.run([
+                'ffmpeg', '-i', audio_file_path,
+                '-codec:a', 'libmp3lame',
+                '-b:a', '64k',
+                '-ar', '16000',  # Sample rate good for speech
+                '-y',  # Overwrite output file
+                compressed_path
+            ], check=True, capture_output=True)
         
         compressed_size = os.path.getsize(compressed_path)
         logger.info(f"Compressed file size: {compressed_size / 1024 / 1024:.2f}MB")
@@ -51,14 +88,15 @@ def _compress_audio_if_needed(audio_file_path: str) -> str:
         if compressed_size > MAX_FILE_SIZE:
             logger.warning("Compressed file still too large, trying 32kbps")
             # Try even lower bitrate
-            subprocess.run([
-                'ffmpeg', '-i', audio_file_path,
-                '-codec:a', 'libmp3lame',
-                '-b:a', '32k',
-                '-ar', '16000',
-                '-y',
-                compressed_path
-            ], check=True, capture_output=True)
+            with stage_limit(STAGE_FFMPEG), FFMPEG_SECONDS.time(operation='compress'):
+                subprocess.run([
+                    'ffmpeg', '-i', audio_file_path,
+                    '-codec:a', 'libmp3lame',
+                    '-b:a', '32k',
+                    '-ar', '16000',
+                    '-y',
+                    compressed_path
+                ], check=True, capture_output=True)
         
         return compressed_path
         
@@ -67,56 +105,348 @@ def _compress_audio_if_needed(audio_file_path: str) -> str:
         raise Exception(f"Failed to compress audio file: {str(e)}")
 
 
-def transcribe_audio(audio_file_path: str, api_key: Optional[str] = None) -> str:
+def _detect_silences(audio_file_path: str) -> List[float]:
     """
-    Transcribe audio file using OpenAI Whisper API.
-    Handles files over 25MB by compressing them first.
+    Find silent stretches with ffmpeg's silencedetect filter.
     
     Args:
         audio_file_path: Path to audio file
-        api_key: OpenAI API key (optional, can use env var)
         
     Returns:
-        Transcript text
+        Sorted midpoints (in seconds) of each detected silence
+    """
+    with stage_limit(STAGE_FFMPEG), FFMPEG_SECONDS.time(operation='silencedetect'):
+        result = subprocess.run([
+            'ffmpeg', '-hide_banner', '-nostats',
+            '-i', audio_file_path,
+            '-af', f'silencedetect=noise={SILENCE_NOISE_DB}:d={SILENCE_MIN_SECONDS}',
+            '-f', 'null', '-'
+        ], check=True, capture_output=True, text=True)
+    
+    starts = [float(x) for x in re.findall(r'silence_start: (-?[\d.]+)', result.stderr)]
+    ends = [float(x) for x in re.findall(r'silence_end: (-?[\d.]+)', result.stderr)]
+    return sorted((start + end) / 2 for start, end in zip(starts, ends))
+
+
+def _plan_chunks(duration: float, file_size: int, silences: List[float]) -> List[Tuple[float, float]]:
+    """
+    Choose chunk boundaries, preferring to cut inside silences.
+    
+    Each chunk is at most CHUNK_MAX_SECONDS long and, assuming a roughly
+    constant bitrate, under CHUNK_MAX_BYTES. Within the second half of
+    that window the latest silence is used as the cut point; if there is
+    none the chunk is cut at the window edge.
+    
+    Args:
+        duration: Audio duration in seconds
+        file_size: Audio file size in bytes
+        silences: Candidate cut points in seconds
+        
+    Returns:
+        List of (start, end) times in seconds
+    """
+    bytes_per_second = file_size / duration if duration > 0 else 0
+    max_len = CHUNK_MAX_SECONDS
+    if bytes_per_second > 0:
+        max_len = min(max_len, CHUNK_MAX_BYTES / bytes_per_second)
+    
+    chunks = []
+    start = 0.0
+    while duration - start > max_len:
+        window_end = start + max_len
+        window_start = start + max_len / 2
+        candidates = [t for t in silences if window_start <= t <= window_end]
+        cut = candidates[-1] if candidates else window_end
+        chunks.append((start, cut))
+        start = cut
+    chunks.append((start, duration))
+    return chunks
+
+
+def _extract_chunk(audio_file_path: str, start: float, end: float, output_path: str):
+    """Cut [start, end) out of the source without re-encoding."""
+    with stage_limit(STAGE_FFMPEG), FFMPEG_SECONDS.time(operation='extract_chunk'):
+        subprocess.run([
+            'ffmpeg', '-hide_banner', '-nostats',
+            '-ss', f'{start:.3f}',
+            '-t', f'{end - start:.3f}',
+            '-i', audio_file_path,
+            '-vn', '-c', 'copy',
+            '-y',
+            output_path
+        ], check=True, capture_output=True)
+
+
+def _transcribe_chunk(
+    backend: TranscriptionBackend,
+    audio_file_path: str,
+    start: float,
+    end: float,
+    scratch: ScratchSpace,
+    filename: str,
+    expected_bytes: int
+) -> Tuple[str, List[Dict]]:
+    """Extract one chunk and transcribe it with timestamps shifted to episode time."""
+    # Claimed only once the chunk runs, so small chunks in flight can use tmpfs
+    output_path = scratch.path(filename, expected_bytes=expected_bytes)
+    upload_path = output_path
+    try:
+        _extract_chunk(audio_file_path, start, end, output_path)
+        
+        # Stream-copied chunks of VBR audio can occasionally overshoot the estimate
+        upload_path = _compress_audio_if_needed(output_path, scratch)
+        return backend.transcribe_file(upload_path, offset=start)
+    finally:
+        # Chunks are released as soon as they are sent, so scratch holds only those in flight
+        scratch.release(output_path)
+        if upload_path != output_path:
+            scratch.release(upload_path)
+
+
+def _transcribe_chunked(
+    backend: TranscriptionBackend,
+    audio_file_path: str,
+    scratch: ScratchSpace,
+    progress_callback: Optional[Callable[[int, int], None]] = None
+) -> Tuple[str, List[Dict]]:
+    """
+    Split audio at silences and transcribe the chunks in parallel.
+    
+    Args:
+        backend: Transcription backend
+        audio_file_path: Path to audio file
+        scratch: Job scratch space for the chunk files
+        progress_callback: Called with (chunks done, total chunks) as chunks finish
+        
+    Returns:
+        Tuple of (text, segments) stitched back together in order
+    """
+    duration = probe_duration(audio_file_path)
+    file_size = os.path.getsize(audio_file_path)
+    
+    if duration <= CHUNK_MAX_SECONDS and file_size <= CHUNK_MAX_BYTES:
+        logger.info("Audio fits in a single chunk, transcribing directly")
+        result = backend.transcribe_file(audio_file_path)
+        if progress_callback:
+            progress_callback(1, 1)
+        return result
+    
+    silences = _detect_silences(audio_file_path)
+    chunks = _plan_chunks(duration, file_size, silences)
+    logger.info(
+        f"Transcribing {duration:.0f}s of audio in {len(chunks)} chunks "
+        f"({len(silences)} silences found, {TRANSCRIBE_MAX_WORKERS} parallel uploads)"
+    )
+    
+    _, ext = os.path.splitext(audio_file_path)
+    bytes_per_second = file_size / duration if duration > 0 else 0
+    
+    futures = [
+        _chunk_executor.submit(
+            _transcribe_chunk,
+            backend,
+            audio_file_path,
+            start,
+            end,
+            scratch,
+            f"chunk_{index:04d}{ext}",
+            int((end - start) * bytes_per_second)
+        )
+        for index, (start, end) in enumerate(chunks)
+    ]
+    
+    try:
+        if progress_callback:
+            progress_callback(0, len(futures))
+            for done, _ in enumerate(as_completed(futures), start=1):
+                progress_callback(done, len(futures))
+        
+        texts = []
+        segments = []
+        for future in futures:
+            chunk_text, chunk_segments = future.result()
+            texts.append(chunk_text)
+            segments.extend(chunk_segments)
+        
+        return ' '.join(text for text in texts if text), segments
+        
+    finally:
+        # Don't leave chunks running against files the caller is about to delete
+        for future in futures:
+            future.cancel()
+
+
+def _trim(audio_file_path: str, scratch: ScratchSpace) -> Tuple[Optional[str], Optional[TimeMap]]:
+    """
+    Cut silences and music out when TRANSCRIBE_TRIM is on.
+
+    Returns:
+        Tuple of (trimmed file, time map back to the original), or
+        (None, None) when the audio is to be sent as it is
+    """
+    if not TRANSCRIBE_TRIM:
+        return None, None
+    try:
+        trimmed_path, time_map = trim_non_speech(audio_file_path, scratch)
+    except Exception as e:
+        # Trimming only saves time; never fail a transcription over it
+        logger.warning(f"Skipping silence trimming: {str(e)}")
+        return None, None
+    if time_map is None:
+        return None, None
+    return trimmed_path, time_map
+
+
+def _transcribe_streamed_chunk(
+    backend: TranscriptionBackend,
+    chunk_path: str,
+    offset: float,
+    scratch: ScratchSpace
+) -> Tuple[str, List[Dict]]:
+    trimmed_path, time_map = _trim(chunk_path, scratch)
+    upload_path = trimmed_path or chunk_path
+    send_path = upload_path
+    try:
+        if backend.max_file_bytes is not None:
+            send_path = _compress_audio_if_needed(upload_path, scratch)
+        text, segments = backend.transcribe_file(send_path)
+        if time_map:
+            segments = time_map.remap_segments(segments)
+        return text, [
+            dict(segment, start=segment['start'] + offset, end=segment['end'] + offset)
+            for segment in segments
+        ]
+    finally:
+        # The chunk is done with once it has been sent
+        for path in {chunk_path, upload_path, send_path}:
+            scratch.release(path)
+
+
+def submit_streamed_chunk(
+    backend: TranscriptionBackend,
+    chunk_path: str,
+    offset: float,
+    scratch: ScratchSpace
+) -> Future:
+    """
+    Transcribe one chunk of an episode that is still downloading.
+
+    Runs on the shared Whisper pool, so streamed chunks count against the
+    same TRANSCRIBE_MAX_WORKERS cap as chunked transcriptions. The chunk
+    is trimmed like a whole episode would be and deleted once sent.
+
+    Args:
+        backend: Transcription backend
+        chunk_path: Chunk file in the job's scratch space
+        offset: Where the chunk starts in the episode, in seconds
+        scratch: Job scratch space
+
+    Returns:
+        Future of (text, segments), with timestamps in episode time
     """
-    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    return _chunk_executor.submit(_transcribe_streamed_chunk, backend, chunk_path, offset, scratch)
+
+
+def transcribe_audio_segments(
+    audio_file_path: str,
+    api_key: Optional[str] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    scratch: Optional[ScratchSpace] = None
+) -> Tuple[str, List[Dict]]:
+    """
+    Transcribe audio file with the configured backend, keeping segment timings.
+    
+    The local backend (TRANSCRIBE_BACKEND=local) takes the whole file in
+    one pass. With the OpenAI Whisper API, in chunked mode (the default)
+    long files are split at silences into pieces under the upload limit
+    and transcribed in parallel; in compress mode files over 25MB are
+    re-encoded to a lower bitrate first.
     
-    if not api_key:
-        raise ValueError("OpenAI API key is required")
+    With TRANSCRIBE_TRIM on (the default), long silences and music are
+    cut out first and segment timestamps are mapped back to the original
+    audio afterwards.
     
-    # Initialize OpenAI client
-    client = OpenAI(api_key=api_key)
+    Args:
+        audio_file_path: Path to audio file
+        api_key: OpenAI API key (optional, can use env var)
+        progress_callback: Called with (chunks done, total chunks) as transcription advances
+        scratch: Job scratch space for intermediate files (a temporary one
+            is opened when not given)
+        
+    Returns:
+        Tuple of (transcript text, list of segments with start, end and text)
+    """
+    backend = get_backend(api_key)
     
+    owns_scratch = scratch is None
+    if owns_scratch:
+        scratch = scratch_manager.open()
     compressed_path = None
+    trimmed_path = None
+    time_map = None
     
     try:
-        logger.info(f"Starting transcription for file: {audio_file_path}")
+        logger.info(
+            f"Starting transcription for file: {audio_file_path} "
+            f"(backend: {backend.name}, mode: {TRANSCRIBE_MODE})"
+        )
         
-        # Compress if needed
-        audio_to_transcribe = _compress_audio_if_needed(audio_file_path)
-        compressed_path = audio_to_transcribe if audio_to_transcribe != audio_file_path else None
+        trimmed_path, time_map = _trim(audio_file_path, scratch)
+        if trimmed_path:
+            audio_file_path = trimmed_path
         
-        # Open the audio file
-        with open(audio_to_transcribe, 'rb') as audio_file:
-            # Use Whisper API for transcription
-            transcript = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                response_format="text"
-            )
+        if backend.max_file_bytes is None and not backend.parallel_chunks:
+            # No upload limit and nothing to gain from splitting: one pass
+            if progress_callback:
+                progress_callback(0, 1)
+            transcript, segments = backend.transcribe_file(audio_file_path)
+            if progress_callback:
+                progress_callback(1, 1)
+        elif TRANSCRIBE_MODE == "chunked":
+            transcript, segments = _transcribe_chunked(backend, audio_file_path, scratch, progress_callback)
+        else:
+            # Compress if needed
+            audio_to_transcribe = _compress_audio_if_needed(audio_file_path, scratch)
+            compressed_path = audio_to_transcribe if audio_to_transcribe != audio_file_path else None
+            transcript, segments = backend.transcribe_file(audio_to_transcribe)
+            if progress_callback:
+                progress_callback(1, 1)
+        
+        if time_map:
+            segments = time_map.remap_segments(segments)
         
         logger.info("Transcription completed successfully")
-        return transcript
+        return transcript, segments
         
     except Exception as e:
         logger.error(f"Error during transcription: {str(e)}")
         raise Exception(f"Failed to transcribe audio: {str(e)}")
     finally:
         # Clean up compressed file if we created one
-        if compressed_path and compressed_path != audio_file_path and os.path.exists(compressed_path):
-            try:
-                os.unlink(compressed_path)
-                logger.info(f"Cleaned up compressed file: {compressed_path}")
-            except Exception as e:
-                logger.warning(f"Failed to clean up compressed file: {str(e)}")
+        if compressed_path:
+            scratch.release(compressed_path)
+            logger.info(f"Cleaned up compressed file: {compressed_path}")
+        if trimmed_path:
+            scratch.release(trimmed_path)
+        if owns_scratch:
+            scratch.close()
+
 
+def transcribe_audio(
+    audio_file_path: str,
+    api_key: Optional[str] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None
+) -> str:
+    """
+    Transcribe audio file with the configured backend.
+    
+    Args:
+        audio_file_path: Path to audio file
+        api_key: OpenAI API key (optional, can use env var)
+        progress_callback: Called with (chunks done, total chunks) as transcription advances
+        
+    Returns:
+        Transcript text
+    """
+    transcript, _ = transcribe_audio_segments(audio_file_path, api_key, progress_callback)
+    return transcript
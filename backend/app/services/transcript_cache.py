@@ -0,0 +1,106 @@
+import os
+import json
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from app.database import DB_PATH
+from app.services.disk_cache import DiskCache
+from app.services.transcription_backends import backend_cache_tag
+
+logger = logging.getLogger(__name__)
+
+# Stored next to the summaries database so it shares the same volume
+TRANSCRIPT_CACHE_PATH = os.getenv(
+    "TRANSCRIPT_CACHE_PATH",
+    os.path.join(os.path.dirname(DB_PATH), 'transcript_cache.db')
+)
+TRANSCRIPT_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Bump when the transcription output format changes so old entries are ignored
+TRANSCRIPT_CACHE_VERSION = "v1"
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+transcript_cache = DiskCache(
+    TRANSCRIPT_CACHE_PATH,
+    TRANSCRIPT_CACHE_MAX_BYTES,
+    name="transcript_cache"
+)
+
+
+def hash_audio_file(audio_file_path: str) -> str:
+    """Return the SHA-256 hex digest of an audio file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(audio_file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_key(audio_hash: str) -> str:
+    # Keyed by model too: transcripts from different backends are not interchangeable
+    return f"{backend_cache_tag()}:{TRANSCRIPT_CACHE_VERSION}:{audio_hash}"
+
+
+def _source_key(podcast_url: str) -> str:
+    return f"source:{podcast_url}"
+
+
+def get_cached_transcript(audio_hash: str) -> Optional[Tuple[str, List[Dict]]]:
+    """
+    Look up the transcript for a given audio content hash.
+
+    Args:
+        audio_hash: SHA-256 of the audio file
+
+    Returns:
+        Tuple of (transcript, segments) on a hit, None on a miss
+    """
+    try:
+        value = transcript_cache.get(_cache_key(audio_hash))
+    except Exception as e:
+        # A broken cache must never fail the pipeline; treat it as a miss
+        logger.warning(f"Transcript cache lookup failed: {str(e)}")
+        return None
+
+    if value is None:
+        return None
+
+    entry = json.loads(value)
+    logger.info(f"Transcript cache hit for audio {audio_hash[:12]}")
+    return entry['transcript'], entry.get('segments', [])
+
+
+def store_transcript(audio_hash: str, transcript: str, segments: List[Dict]):
+    """Cache a transcript and its segments under the audio content hash."""
+    try:
+        transcript_cache.set(
+            _cache_key(audio_hash),
+            json.dumps({'transcript': transcript, 'segments': segments})
+        )
+    except Exception as e:
+        logger.warning(f"Failed to store transcript in cache: {str(e)}")
+
+
+def remember_source(podcast_url: str, audio_hash: str):
+    """Record which audio `podcast_url` last resolved to."""
+    try:
+        transcript_cache.set(_source_key(podcast_url), audio_hash)
+    except Exception as e:
+        logger.warning(f"Failed to store transcript source in cache: {str(e)}")
+
+
+def has_cached_source(podcast_url: str) -> bool:
+    """
+    Whether the audio `podcast_url` last resolved to has a cached transcript.
+
+    Lets a job decide before downloading whether the transcript will
+    likely come from the cache. Neither entry counts as a lookup.
+    """
+    try:
+        audio_hash = transcript_cache.peek(_source_key(podcast_url))
+        return audio_hash is not None and transcript_cache.peek(_cache_key(audio_hash)) is not None
+    except Exception as e:
+        logger.warning(f"Transcript cache lookup failed: {str(e)}")
+        return False
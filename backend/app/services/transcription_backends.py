@@ -0,0 +1,208 @@
+import os
+import threading
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from openai import OpenAI
+
+from app.services.stage_limits import stage_limit, STAGE_TRANSCRIBE
+from app.services.metrics import TRANSCRIPTION_CHUNKS, WHISPER_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# "openai" uploads to the Whisper API; "local" runs faster-whisper on this machine
+TRANSCRIBE_BACKEND = os.getenv("TRANSCRIBE_BACKEND", "openai")
+
+# OpenAI Whisper API has a 25MB file size limit
+OPENAI_MAX_FILE_SIZE = 25 * 1024 * 1024
+OPENAI_MODEL = "whisper-1"
+
+# Local backend: CTranslate2 model name or path, quantization and threading.
+# int8 keeps a "small" model around 500MB resident and fast on plain CPUs.
+LOCAL_WHISPER_MODEL = os.getenv("LOCAL_WHISPER_MODEL", "small")
+LOCAL_WHISPER_COMPUTE_TYPE = os.getenv("LOCAL_WHISPER_COMPUTE_TYPE", "int8")
+LOCAL_WHISPER_CPU_THREADS = int(os.getenv("LOCAL_WHISPER_CPU_THREADS", str(os.cpu_count() or 4)))
+# Transcriptions the resident model runs at once (each uses CPU_THREADS threads)
+LOCAL_WHISPER_WORKERS = int(os.getenv("LOCAL_WHISPER_WORKERS", "1"))
+LOCAL_WHISPER_BEAM_SIZE = int(os.getenv("LOCAL_WHISPER_BEAM_SIZE", "1"))
+LOCAL_WHISPER_DOWNLOAD_ROOT = os.getenv("LOCAL_WHISPER_DOWNLOAD_ROOT") or None
+
+
+Segments = List[Dict]
+
+
+class TranscriptionBackend:
+    """
+    Something that turns one audio file into text and timed segments.
+
+    `max_file_bytes` is the largest file it accepts (None for no limit);
+    files over it are split or compressed by the transcriber first.
+    `parallel_chunks` says whether splitting long audio into chunks that
+    are transcribed concurrently is worthwhile.
+    """
+
+    name = ""
+    max_file_bytes: Optional[int] = None
+    parallel_chunks = False
+
+    def cache_tag(self) -> str:
+        """Identifies the model, so cached transcripts from another one are not reused."""
+        raise NotImplementedError
+
+    def transcribe_file(self, audio_file_path: str, offset: float = 0.0) -> Tuple[str, Segments]:
+        """
+        Transcribe one file.
+
+        Args:
+            audio_file_path: Path to the audio file
+            offset: Seconds to add to every segment timestamp
+
+        Returns:
+            Tuple of (text, segments) where each segment has start, end and text
+        """
+        raise NotImplementedError
+
+
+class OpenAIWhisperBackend(TranscriptionBackend):
+    """The hosted Whisper API. Uploads are capped at 25MB and billed per minute."""
+
+    name = "openai"
+    max_file_bytes = OPENAI_MAX_FILE_SIZE
+    parallel_chunks = True
+
+    def __init__(self, api_key: str):
+        self.client = OpenAI(api_key=api_key)
+
+    def cache_tag(self) -> str:
+        return OPENAI_MODEL
+
+    def transcribe_file(self, audio_file_path: str, offset: float = 0.0) -> Tuple[str, Segments]:
+        with stage_limit(STAGE_TRANSCRIBE), open(audio_file_path, 'rb') as audio_file:
+            with WHISPER_SECONDS.time():
+                response = self.client.audio.transcriptions.create(
+                    model=OPENAI_MODEL,
+                    file=audio_file,
+                    response_format="verbose_json"
+                )
+        TRANSCRIPTION_CHUNKS.inc()
+
+        segments = [
+            {
+                'start': float(segment.start) + offset,
+                'end': float(segment.end) + offset,
+                'text': segment.text.strip(),
+            }
+            for segment in (getattr(response, 'segments', None) or [])
+        ]
+        return response.text.strip(), segments
+
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """
+    faster-whisper (CTranslate2) running on the local CPU.
+
+    The model is loaded once and stays resident for the life of the
+    process. There is no size limit and nothing is uploaded, so whole
+    episodes are transcribed in one pass. Concurrency is capped at
+    LOCAL_WHISPER_WORKERS because every transcription already uses
+    LOCAL_WHISPER_CPU_THREADS threads.
+    """
+
+    name = "local"
+    max_file_bytes = None
+    parallel_chunks = False
+
+    _model = None
+    _model_lock = threading.Lock()
+    _slots = threading.BoundedSemaphore(max(1, LOCAL_WHISPER_WORKERS))
+
+    def cache_tag(self) -> str:
+        return f"faster-whisper:{LOCAL_WHISPER_MODEL}:{LOCAL_WHISPER_COMPUTE_TYPE}"
+
+    @classmethod
+    def load_model(cls):
+        """Load the model on first use (or at startup) and keep it."""
+        if cls._model is not None:
+            return cls._model
+
+        with cls._model_lock:
+            if cls._model is None:
+                try:
+                    from faster_whisper import WhisperModel
+                except ImportError:
+                    raise RuntimeError(
+                        "TRANSCRIBE_BACKEND=local needs the faster-whisper package (pip install faster-whisper)"
+                    )
+
+                logger.info(
+                    f"Loading local Whisper model {LOCAL_WHISPER_MODEL} "
+                    f"({LOCAL_WHISPER_COMPUTE_TYPE}, {LOCAL_WHISPER_CPU_THREADS} threads)"
+                )
+                cls._model = WhisperModel(
+                    LOCAL_WHISPER_MODEL,
+                    device="cpu",
+                    compute_type=LOCAL_WHISPER_COMPUTE_TYPE,
+                    cpu_threads=LOCAL_WHISPER_CPU_THREADS,
+                    num_workers=max(1, LOCAL_WHISPER_WORKERS),
+                    download_root=LOCAL_WHISPER_DOWNLOAD_ROOT,
+                )
+        return cls._model
+
+    def transcribe_file(self, audio_file_path: str, offset: float = 0.0) -> Tuple[str, Segments]:
+        model = self.load_model()
+
+        with self._slots, WHISPER_SECONDS.time():
+            # Segments are generated lazily; decoding happens while iterating
+            generated, _ = model.transcribe(audio_file_path, beam_size=LOCAL_WHISPER_BEAM_SIZE)
+            segments = [
+                {
+                    'start': float(segment.start) + offset,
+                    'end': float(segment.end) + offset,
+                    'text': segment.text.strip(),
+                }
+                for segment in generated
+            ]
+        TRANSCRIPTION_CHUNKS.inc()
+
+        text = ' '.join(segment['text'] for segment in segments if segment['text'])
+        return text, segments
+
+
+def backend_requires_api_key() -> bool:
+    """Whether the configured backend needs OPENAI_API_KEY."""
+    return TRANSCRIBE_BACKEND != LocalWhisperBackend.name
+
+
+def get_backend(api_key: Optional[str] = None) -> TranscriptionBackend:
+    """
+    The configured transcription backend.
+
+    Args:
+        api_key: OpenAI API key (only used by the openai backend)
+    """
+    if TRANSCRIBE_BACKEND == LocalWhisperBackend.name:
+        return LocalWhisperBackend()
+
+    if TRANSCRIBE_BACKEND != OpenAIWhisperBackend.name:
+        raise ValueError(f"Unknown TRANSCRIBE_BACKEND: {TRANSCRIBE_BACKEND}")
+
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OpenAI API key is required")
+    return OpenAIWhisperBackend(api_key)
+
+
+def backend_cache_tag() -> str:
+    """Cache tag of the configured backend, without needing credentials."""
+    if TRANSCRIBE_BACKEND == LocalWhisperBackend.name:
+        return LocalWhisperBackend().cache_tag()
+    return OPENAI_MODEL
+
+
+def warm_up():
+    """Load the local model ahead of the first request (no-op for the API backend)."""
+    if TRANSCRIBE_BACKEND == LocalWhisperBackend.name:
+        try:
+            LocalWhisperBackend.load_model()
+        except Exception as e:
+            logger.error(f"Failed to preload local Whisper model: {str(e)}")
@@ -0,0 +1,206 @@
+import os
+import re
+import asyncio
+import hashlib
+import logging
+from typing import AsyncIterator, Dict, List, Optional
+
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+
+from app.services.metrics import UPLOADED_BYTES
+from app.services.scratch import ScratchSpace, ScratchBudgetError
+
+logger = logging.getLogger(__name__)
+
+# Upload bodies are written to scratch disk in blocks of this size, so memory
+# per upload stays at about one block whatever the file size
+UPLOAD_BLOCK_BYTES = int(os.getenv("UPLOAD_BLOCK_BYTES", str(1024 * 1024)))
+
+# Largest accepted audio file
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+# Form fields other than the file are small; anything bigger is rejected
+UPLOAD_MAX_FIELD_BYTES = 4096
+
+UPLOAD_FILE_FIELD = 'file'
+
+
+class UploadError(Exception):
+    """Raised for malformed or oversized uploads."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class UploadedAudio:
+    """An audio file received into scratch space, with its SHA-256 and form fields."""
+
+    def __init__(self, path: str, filename: str, size: int, sha256: str, fields: Dict[str, str]):
+        self.path = path
+        self.filename = filename
+        self.size = size
+        self.sha256 = sha256
+        self.fields = fields
+
+
+def _safe_extension(filename: str) -> str:
+    _, ext = os.path.splitext(filename)
+    return ext.lower() if re.fullmatch(r'\.[A-Za-z0-9]{1,8}', ext) else ''
+
+
+class _UploadWriter:
+    """
+    Multipart parser callbacks that route the file part to disk and keep
+    the other (small) fields in memory.
+
+    The parser calls back synchronously with slices of the chunk it was
+    given; slices are queued and written out after each chunk, so the
+    disk writes can run off the event loop.
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, str] = {}
+        self.filename: Optional[str] = None
+        self.pending: List[bytes] = []
+        self._header_field = b''
+        self._header_value = b''
+        self._headers: Dict[bytes, bytes] = {}
+        self._name: Optional[str] = None
+        self._in_file = False
+        self._field_value = bytearray()
+
+    def callbacks(self) -> Dict:
+        return {
+            'on_part_begin': self.on_part_begin,
+            'on_part_data': self.on_part_data,
+            'on_part_end': self.on_part_end,
+            'on_header_field': self.on_header_field,
+            'on_header_value': self.on_header_value,
+            'on_header_end': self.on_header_end,
+            'on_headers_finished': self.on_headers_finished,
+        }
+
+    def on_part_begin(self):
+        self._headers = {}
+        self._name = None
+        self._in_file = False
+        self._field_value = bytearray()
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b''
+        self._header_value = b''
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b'content-disposition', b''))
+        self._name = options.get(b'name', b'').decode('utf-8', errors='replace')
+        if self._name == UPLOAD_FILE_FIELD:
+            if self.filename is not None:
+                raise UploadError("Only one file can be uploaded at a time")
+            self._in_file = True
+            self.filename = options.get(b'filename', b'upload').decode('utf-8', errors='replace')
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self.pending.append(data[start:end])
+            return
+        self._field_value += data[start:end]
+        if len(self._field_value) > UPLOAD_MAX_FIELD_BYTES:
+            raise UploadError(f"Form field '{self._name}' is too large")
+
+    def on_part_end(self):
+        if not self._in_file and self._name:
+            self.fields[self._name] = self._field_value.decode('utf-8', errors='replace')
+        self._in_file = False
+
+
+async def receive_upload(
+    content_type: str,
+    content_length: Optional[int],
+    body: AsyncIterator[bytes],
+    scratch: ScratchSpace
+) -> UploadedAudio:
+    """
+    Stream a multipart/form-data upload to scratch disk.
+
+    The file part (field `file`) is written in UPLOAD_BLOCK_BYTES blocks
+    and hashed on the fly; nothing larger than one block plus one network
+    chunk is held in memory. Other fields (e.g. `title`) are returned as
+    strings.
+
+    Args:
+        content_type: Request Content-Type (must carry the multipart boundary)
+        content_length: Request Content-Length, used to reserve scratch space
+        body: The raw request body stream
+        scratch: Job scratch space the file is written to
+
+    Returns:
+        The received file
+
+    Raises:
+        UploadError: If the body is not a valid upload, is too large, or
+            there is no room to stage it
+    """
+    media_type, options = parse_options_header(content_type or '')
+    boundary = options.get(b'boundary')
+    if media_type != b'multipart/form-data' or not boundary:
+        raise UploadError("Expected a multipart/form-data body", status_code=415)
+    if content_length is not None:
+        if content_length > UPLOAD_MAX_BYTES:
+            raise UploadError(f"Upload is larger than {UPLOAD_MAX_BYTES} bytes", status_code=413)
+        try:
+            scratch.reserve(content_length)
+        except ScratchBudgetError as e:
+            raise UploadError(str(e), status_code=503)
+
+    writer = _UploadWriter()
+    parser = MultipartParser(boundary, writer.callbacks())
+    loop = asyncio.get_running_loop()
+    digest = hashlib.sha256()
+    block = bytearray()
+    size = 0
+    path = scratch.path('upload.part')
+
+    try:
+        with open(path, 'wb') as f:
+            async for chunk in body:
+                parser.write(chunk)
+                for piece in writer.pending:
+                    size += len(piece)
+                    if size > UPLOAD_MAX_BYTES:
+                        raise UploadError(f"Upload is larger than {UPLOAD_MAX_BYTES} bytes", status_code=413)
+                    digest.update(piece)
+                    block += piece
+                writer.pending.clear()
+
+                while len(block) >= UPLOAD_BLOCK_BYTES:
+                    await loop.run_in_executor(None, f.write, bytes(block[:UPLOAD_BLOCK_BYTES]))
+                    del block[:UPLOAD_BLOCK_BYTES]
+
+            parser.finalize()
+            if block:
+                await loop.run_in_executor(None, f.write, bytes(block))
+    except MultipartParseError as e:
+        scratch.release(path)
+        raise UploadError(f"Malformed multipart body: {str(e)}")
+
+    if writer.filename is None or size == 0:
+        scratch.release(path)
+        raise UploadError(f"No audio file in the '{UPLOAD_FILE_FIELD}' field")
+
+    UPLOADED_BYTES.inc(size)
+    # Keep the original extension so ffmpeg can use it as a format hint
+    final_path = scratch.path('upload' + _safe_extension(writer.filename))
+    os.replace(path, final_path)
+    scratch.release(path)
+
+    logger.info(f"Received upload {writer.filename} ({size / 1024 / 1024:.1f}MB, sha256 {digest.hexdigest()[:12]})")
+    return UploadedAudio(final_path, writer.filename, size, digest.hexdigest(), writer.fields)
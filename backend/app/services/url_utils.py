@@ -0,0 +1,74 @@
+from typing import Set
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query parameters that only carry click attribution on any site. Generic
+# names such as `ref` or `source` are not here: on some hosts they pick the
+# content, and two episodes must never share a key.
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid',
+}
+TRACKING_PREFIXES = ('utm_',)
+
+# Share-link parameters of hosts known to ignore them, per host (subdomains included)
+HOST_TRACKING_PARAMS = {
+    'podcasts.apple.com': {'at', 'ct', 'ls', 'mt', 'uo', 'itsct', 'itscg'},
+    'spotify.com': {'si'},
+    'youtube.com': {'si', 'feature'},
+    'youtu.be': {'si', 'feature'},
+}
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def _host_tracking_params(host: str) -> Set[str]:
+    params = set()
+    for domain, names in HOST_TRACKING_PARAMS.items():
+        if host == domain or host.endswith('.' + domain):
+            params |= names
+    return params
+
+
+def normalize_podcast_url(url: str) -> str:
+    """
+    Normalize a podcast URL so equivalent links map to the same cache key.
+
+    Lowercases the scheme and host, drops default ports, fragments,
+    trailing slashes and tracking parameters, and sorts the remaining
+    query parameters. Only parameters known to be tracking are dropped
+    (see TRACKING_PARAMS and HOST_TRACKING_PARAMS); anything else, such as
+    Apple Podcasts' `i` episode ID, is kept, and so is userinfo.
+
+    Args:
+        url: URL as submitted by the client
+
+    Returns:
+        Normalized URL string
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS:
+        # Internal identifiers such as upload://<sha256> are already canonical
+        return url.strip()
+    host = (parts.hostname or '').lower()
+
+    netloc = host
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+    userinfo, at, _ = parts.netloc.rpartition('@')
+    if at:
+        netloc = f"{userinfo}@{netloc}"
+
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/')
+
+    dropped = TRACKING_PARAMS | _host_tracking_params(host)
+    query = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in dropped
+        and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query.sort()
+
+    return urlunsplit((scheme, netloc, path, urlencode(query), ''))
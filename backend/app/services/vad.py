@@ -0,0 +1,289 @@
+import os
+import bisect
+import logging
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.audio_extractor import SPEECH_EXTENSION, speech_encode_args
+from app.services.scratch import ScratchSpace
+from app.services.stage_limits import stage_limit, STAGE_FFMPEG
+from app.services.metrics import FFMPEG_SECONDS, TRIMMED_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Analysis runs on 16kHz mono PCM in non-overlapping 32ms frames. The trim
+# pass re-frames the audio the same way, so cuts land exactly on frame edges.
+VAD_SAMPLE_RATE = 16000
+FRAME_SAMPLES = 512
+FRAME_SECONDS = FRAME_SAMPLES / VAD_SAMPLE_RATE
+
+# PCM is read from ffmpeg this many frames at a time (~2MB), so memory does
+# not grow with episode length; only two floats per frame are kept
+BLOCK_FRAMES = 2048
+
+# Flatness is measured over ~60Hz-4kHz, where speech energy sits
+FLATNESS_BINS = slice(2, 129)
+
+# Frames this far below the loud (95th percentile) level count as silence
+TRIM_SILENCE_DB = float(os.getenv("TRIM_SILENCE_DB", "35"))
+TRIM_SILENCE_MIN_SECONDS = float(os.getenv("TRIM_SILENCE_MIN_SECONDS", "2.0"))
+
+# Music is steady (little syllable-rate loudness modulation over a second)
+# and tonal (low flatness). Runs must be long so speech is never mistaken for it.
+TRIM_MUSIC_MODULATION_DB = float(os.getenv("TRIM_MUSIC_MODULATION_DB", "3.0"))
+TRIM_MUSIC_MAX_FLATNESS = float(os.getenv("TRIM_MUSIC_MAX_FLATNESS", "0.1"))
+TRIM_MUSIC_MIN_SECONDS = float(os.getenv("TRIM_MUSIC_MIN_SECONDS", "8.0"))
+MODULATION_WINDOW_FRAMES = int(round(1.0 / FRAME_SECONDS))
+
+# Audio kept on each side of a cut, so words are never clipped and Whisper
+# still hears a short pause
+TRIM_PADDING_SECONDS = float(os.getenv("TRIM_PADDING_SECONDS", "0.25"))
+
+# Re-encoding is skipped when less than this would be cut
+TRIM_MIN_SAVED_SECONDS = float(os.getenv("TRIM_MIN_SAVED_SECONDS", "10"))
+
+
+class TimeMap:
+    """
+    Maps times in trimmed audio back to times in the original.
+
+    Built from the kept spans of the original (in seconds, in order); the
+    trimmed audio is those spans played back to back.
+    """
+
+    def __init__(self, kept_spans: List[Tuple[float, float]]):
+        self.source_starts = [start for start, _ in kept_spans]
+        self.lengths = [end - start for start, end in kept_spans]
+        self.trimmed_starts = [0.0]
+        for length in self.lengths[:-1]:
+            self.trimmed_starts.append(self.trimmed_starts[-1] + length)
+
+    @property
+    def trimmed_duration(self) -> float:
+        return sum(self.lengths)
+
+    def to_source(self, t: float, is_end: bool = False) -> float:
+        """
+        Original time of trimmed time `t`.
+
+        A time exactly on a cut belongs to the span after it, or with
+        `is_end` to the span before it, so a segment ending at a cut does
+        not stretch over the removed audio.
+        """
+        if is_end:
+            index = bisect.bisect_left(self.trimmed_starts, t) - 1
+        else:
+            index = bisect.bisect_right(self.trimmed_starts, t) - 1
+        index = min(max(index, 0), len(self.lengths) - 1)
+        offset = min(max(t - self.trimmed_starts[index], 0.0), self.lengths[index])
+        return round(self.source_starts[index] + offset, 3)
+
+    def remap_segments(self, segments: List[Dict]) -> List[Dict]:
+        """Copy of `segments` with start and end moved to original time."""
+        return [
+            {
+                **segment,
+                'start': self.to_source(segment['start']),
+                'end': self.to_source(segment['end'], is_end=True),
+            }
+            for segment in segments
+        ]
+
+
+def _frame_features(samples: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Log energy (dB) and spectral flatness of each whole frame in `samples`."""
+    frames = samples[:len(samples) - len(samples) % FRAME_SAMPLES].reshape(-1, FRAME_SAMPLES)
+    frames = frames.astype(np.float32) / 32768.0
+
+    energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+
+    power = np.abs(np.fft.rfft(frames * np.hanning(FRAME_SAMPLES), axis=1)) ** 2
+    band = power[:, FLATNESS_BINS] + 1e-12
+    flatness = np.exp(np.mean(np.log(band), axis=1)) / np.mean(band, axis=1)
+
+    return energy_db.astype(np.float32), flatness.astype(np.float32)
+
+
+def analyze_audio(audio_file_path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decode audio to 16kHz mono PCM with ffmpeg and compute per-frame features.
+
+    PCM is streamed from ffmpeg's stdout in blocks and reduced to features
+    as it arrives.
+
+    Returns:
+        Tuple of (energy in dB, spectral flatness), one value per frame
+    """
+    command = [
+        'ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'error',
+        '-i', audio_file_path,
+        '-vn', '-ac', '1', '-ar', str(VAD_SAMPLE_RATE),
+        '-f', 's16le', '-'
+    ]
+    block_bytes = BLOCK_FRAMES * FRAME_SAMPLES * 2
+    energies = []
+    flatnesses = []
+
+    with stage_limit(STAGE_FFMPEG), FFMPEG_SECONDS.time(operation='vad_decode'):
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            pending = b''
+            while True:
+                data = process.stdout.read(block_bytes)
+                if not data:
+                    break
+                pending += data
+                usable = len(pending) - len(pending) % (FRAME_SAMPLES * 2)
+                if usable:
+                    energy_db, flatness = _frame_features(np.frombuffer(pending[:usable], dtype='<i2'))
+                    energies.append(energy_db)
+                    flatnesses.append(flatness)
+                    pending = pending[usable:]
+            # With -loglevel error, stderr is a few lines at most
+            stderr = process.stderr.read()
+            process.wait()
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+    if process.returncode != 0:
+        message = stderr.decode('utf-8', errors='replace').strip()
+        raise Exception(f"ffmpeg failed to decode audio: {message or process.returncode}")
+
+    if not energies:
+        return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+    return np.concatenate(energies), np.concatenate(flatnesses)
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and end (exclusive) frame indices of each run of True in `mask`."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _long_runs(mask: np.ndarray, min_frames: int) -> np.ndarray:
+    """`mask` with runs shorter than `min_frames` cleared."""
+    starts, ends = _runs(mask)
+    long_mask = np.zeros(len(mask), dtype=bool)
+    for start, end in zip(starts, ends):
+        if end - start >= min_frames:
+            long_mask[start:end] = True
+    return long_mask
+
+
+def _shrink(mask: np.ndarray, frames: int) -> np.ndarray:
+    """`mask` with every run narrowed by `frames` on each side, except at the edges of the audio."""
+    starts, ends = _runs(mask)
+    shrunk = np.zeros(len(mask), dtype=bool)
+    for start, end in zip(starts, ends):
+        keep_before = 0 if start == 0 else frames
+        keep_after = 0 if end == len(mask) else frames
+        if end - start > keep_before + keep_after:
+            shrunk[start + keep_before:end - keep_after] = True
+    return shrunk
+
+
+def _rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    kernel = np.ones(window, dtype=np.float32) / window
+    # Centered like mode='same', but never longer than `values` (which
+    # 'same' is when the audio is shorter than the window)
+    start = (window - 1) // 2
+    return np.convolve(values, kernel, mode='full')[start:start + len(values)]
+
+
+def find_non_speech(energy_db: np.ndarray, flatness: np.ndarray) -> np.ndarray:
+    """
+    Mark frames to cut: long silences and long stretches of music.
+
+    Returns:
+        Boolean array, True for frames that can be removed
+    """
+    if len(energy_db) == 0:
+        return np.zeros(0, dtype=bool)
+
+    # Relative to the episode's own loudness, so it works at any mastering level
+    silent = energy_db < np.percentile(energy_db, 95) - TRIM_SILENCE_DB
+
+    # Loudness spread over a second: speech swings with every syllable
+    mean = _rolling_mean(energy_db, MODULATION_WINDOW_FRAMES)
+    spread = np.sqrt(np.maximum(_rolling_mean(energy_db ** 2, MODULATION_WINDOW_FRAMES) - mean ** 2, 0))
+    tonal = _rolling_mean(flatness, MODULATION_WINDOW_FRAMES) < TRIM_MUSIC_MAX_FLATNESS
+    music = (spread < TRIM_MUSIC_MODULATION_DB) & tonal & ~silent
+
+    padding = int(round(TRIM_PADDING_SECONDS / FRAME_SECONDS))
+    cut = _shrink(_long_runs(silent, int(TRIM_SILENCE_MIN_SECONDS / FRAME_SECONDS)), padding)
+    # The one-second window blurs where music stops by up to half a window
+    cut |= _shrink(
+        _long_runs(music | silent, int(TRIM_MUSIC_MIN_SECONDS / FRAME_SECONDS)),
+        padding + MODULATION_WINDOW_FRAMES // 2
+    )
+    return cut
+
+
+def _write_trimmed(audio_file_path: str, kept_frames: List[Tuple[int, int]], scratch: ScratchSpace) -> str:
+    """Encode only the kept frame ranges of the source into one speech file."""
+    selection = '+'.join(f'between(n,{start},{end - 1})' for start, end in kept_frames)
+    # Re-framed exactly like the analysis, so frame n here is frame n there
+    graph = (
+        f"aformat=channel_layouts=mono,aresample={VAD_SAMPLE_RATE},"
+        f"asetnsamples=n={FRAME_SAMPLES}:p=0,"
+        f"aselect='{selection}',asetpts=N/SR/TB"
+    )
+    # Hundreds of spans make a long expression; pass it as a file
+    base_name, _ = os.path.splitext(os.path.basename(audio_file_path))
+    script_path = scratch.path(f"{base_name}_trim.txt")
+    output_path = scratch.path(
+        f"{base_name}_trimmed{SPEECH_EXTENSION}",
+        expected_bytes=os.path.getsize(audio_file_path)
+    )
+    try:
+        with open(script_path, 'w') as f:
+            f.write(graph)
+        with stage_limit(STAGE_FFMPEG), FFMPEG_SECONDS.time(operation='trim'):
+            subprocess.run(
+                ['ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'error',
+                 '-i', audio_file_path, '-filter_script:a', script_path]
+                + speech_encode_args() + ['-y', output_path],
+                check=True, capture_output=True
+            )
+    except Exception:
+        scratch.release(output_path)
+        raise
+    finally:
+        scratch.release(script_path)
+    return output_path
+
+
+def trim_non_speech(audio_file_path: str, scratch: ScratchSpace) -> Tuple[str, Optional[TimeMap]]:
+    """
+    Cut long silences and music out of an episode before transcription.
+
+    Args:
+        audio_file_path: Path to the episode audio
+        scratch: Job scratch space the trimmed file is written to
+
+    Returns:
+        Tuple of (path to transcribe, time map back to the original).
+        When too little would be cut, the original path and None.
+    """
+    energy_db, flatness = analyze_audio(audio_file_path)
+    cut = find_non_speech(energy_db, flatness)
+
+    cut_seconds = float(np.count_nonzero(cut)) * FRAME_SECONDS
+    if cut_seconds < TRIM_MIN_SAVED_SECONDS or cut.all():
+        logger.info(f"Not trimming: only {cut_seconds:.0f}s of non-speech found")
+        return audio_file_path, None
+
+    starts, ends = _runs(~cut)
+    kept_frames = list(zip(starts.tolist(), ends.tolist()))
+    trimmed_path = _write_trimmed(audio_file_path, kept_frames, scratch)
+
+    TRIMMED_SECONDS.inc(cut_seconds)
+    logger.info(
+        f"Trimmed {cut_seconds:.0f}s of silence and music "
+        f"({cut_seconds / (len(cut) * FRAME_SECONDS):.0%}) in {len(kept_frames) - 1} cuts"
+    )
+    return trimmed_path, TimeMap([(start * FRAME_SECONDS, end * FRAME_SECONDS) for start, end in kept_frames])
@@ -0,0 +1,230 @@
+"""
+Local stand-ins for the OpenAI transcription and OpenRouter chat APIs.
+
+They answer in the same shape as the real services after a configurable
+delay, and fail a configurable share of requests (HTTP 500 for
+transcription, 429 with Retry-After for chat) so retry paths are exercised.
+Point the app at them with OPENAI_BASE_URL and OPENROUTER_BASE_URL.
+
+Run standalone:
+    python -m benchmarks.fake_services --port 8900 --whisper-latency 2
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+WORDS = (
+    "podcast episode market growth interest rates inflation startup founder "
+    "product customers revenue strategy research climate energy battery "
+    "policy election history science memory sleep training model data "
+    "privacy security network latency database compression audio speech"
+).split()
+
+# Roughly how many words are spoken per second of audio
+WORDS_PER_SECOND = 2.5
+SEGMENT_SECONDS = 5.0
+
+
+@dataclass
+class FakeServiceConfig:
+    whisper_latency: float = 1.0  # Fixed seconds per transcription request
+    whisper_latency_per_minute: float = 0.5  # Extra seconds per minute of audio
+    llm_latency: float = 1.0  # Fixed seconds per chat completion
+    llm_latency_per_token: float = 0.002  # Extra seconds per completion token
+    jitter: float = 0.2  # +/- fraction applied to every delay
+    failure_rate: float = 0.0  # Share of requests answered with an error
+    audio_bitrate: int = 24000  # Used to estimate audio length from upload size
+    seed: int = 0
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self._random = random.Random(self.seed)
+        self._lock = threading.Lock()
+
+    def count(self, name: str):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def uniform(self, low: float, high: float) -> float:
+        with self._lock:
+            return self._random.uniform(low, high)
+
+    def delay(self, seconds: float):
+        time.sleep(max(0.0, seconds * (1 + self.uniform(-self.jitter, self.jitter))))
+
+    def should_fail(self) -> bool:
+        return self.failure_rate > 0 and self.uniform(0, 1) < self.failure_rate
+
+
+def _fake_segments(seconds: float, rng: random.Random) -> Tuple[str, List[Dict]]:
+    segments = []
+    start = 0.0
+    while start < seconds:
+        end = min(seconds, start + SEGMENT_SECONDS)
+        words = max(1, int((end - start) * WORDS_PER_SECOND))
+        text = ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+        segments.append({
+            'id': len(segments),
+            'seek': 0,
+            'start': round(start, 2),
+            'end': round(end, 2),
+            'text': ' ' + text,
+            'tokens': [],
+            'temperature': 0.0,
+            'avg_logprob': -0.2,
+            'compression_ratio': 1.4,
+            'no_speech_prob': 0.01,
+        })
+        start = end
+    return ' '.join(segment['text'].strip() for segment in segments), segments
+
+
+def _fake_markdown(tokens: int, rng: random.Random) -> str:
+    lines = ['## Episode Summary', '']
+    words = 0
+    while words < tokens * 0.75:
+        if len(lines) % 6 == 2:
+            lines.append(f"### {rng.choice(WORDS).capitalize()} and {rng.choice(WORDS)}")
+        sentence = ' '.join(rng.choice(WORDS) for _ in range(14))
+        lines.append(f"- {sentence.capitalize()}.")
+        words += 14
+    return '\n'.join(lines)
+
+
+class FakeServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config: FakeServiceConfig = FakeServiceConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict, headers: Dict[str, str] = None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+        if self.path.endswith('/audio/transcriptions'):
+            self._transcription(body)
+        elif self.path.endswith('/chat/completions'):
+            self._chat_completion(body)
+        else:
+            self._send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+
+    def _transcription(self, body: bytes):
+        config = self.config
+        config.count('transcription_requests')
+
+        # The multipart body is almost entirely the audio file
+        seconds = len(body) * 8 / config.audio_bitrate
+        config.delay(config.whisper_latency + config.whisper_latency_per_minute * seconds / 60)
+
+        if config.should_fail():
+            config.count('transcription_failures')
+            self._send_json(500, {'error': {'message': 'Simulated server error'}})
+            return
+
+        rng = random.Random(config.uniform(0, 1))
+        text, segments = _fake_segments(seconds, rng)
+        self._send_json(200, {
+            'task': 'transcribe',
+            'language': 'english',
+            'duration': round(seconds, 2),
+            'text': text,
+            'segments': segments,
+        })
+
+    def _chat_completion(self, body: bytes):
+        config = self.config
+        config.count('chat_requests')
+
+        try:
+            request = json.loads(body)
+        except ValueError:
+            self._send_json(400, {'error': {'message': 'Invalid JSON'}})
+            return
+
+        prompt = ' '.join(message.get('content', '') for message in request.get('messages', []))
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = min(int(request.get('max_tokens') or 1000), 800)
+        config.delay(config.llm_latency + config.llm_latency_per_token * completion_tokens)
+
+        if config.should_fail():
+            config.count('chat_failures')
+            self._send_json(429, {'error': {'message': 'Simulated rate limit'}}, {'Retry-After': '0'})
+            return
+
+        rng = random.Random(config.uniform(0, 1))
+        self._send_json(200, {
+            'id': f'gen-{rng.getrandbits(32):08x}',
+            'object': 'chat.completion',
+            'model': request.get('model', 'fake'),
+            'choices': [{
+                'index': 0,
+                'finish_reason': 'stop',
+                'message': {'role': 'assistant', 'content': _fake_markdown(completion_tokens, rng)},
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+            },
+        })
+
+
+def start_fake_services(config: FakeServiceConfig, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """
+    Serve both fake APIs from one server on a background thread.
+
+    OpenAI clients use http://host:port/v1 and OpenRouter clients use
+    http://host:port/api/v1. Call shutdown() on the result to stop it.
+    """
+    handler = type('ConfiguredFakeServiceHandler', (FakeServiceHandler,), {'config': config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fake-services', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--whisper-latency', type=float, default=1.0)
+    parser.add_argument('--whisper-latency-per-minute', type=float, default=0.5)
+    parser.add_argument('--llm-latency', type=float, default=1.0)
+    parser.add_argument('--llm-latency-per-token', type=float, default=0.002)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = FakeServiceConfig(
+        whisper_latency=args.whisper_latency,
+        whisper_latency_per_minute=args.whisper_latency_per_minute,
+        llm_latency=args.llm_latency,
+        llm_latency_per_token=args.llm_latency_per_token,
+        failure_rate=args.failure_rate,
+    )
+    server = start_fake_services(config, args.host, args.port)
+    print(f"OPENAI_BASE_URL=http://{args.host}:{args.port}/v1")
+    print(f"OPENROUTER_BASE_URL=http://{args.host}:{args.port}/api/v1")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
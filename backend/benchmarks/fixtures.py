@@ -0,0 +1,67 @@
+"""
+Synthetic podcast audio for benchmarks, generated with ffmpeg.
+
+The audio is a pitch-modulated tone that pauses for a second every few
+seconds, so silence detection finds cut points the way it would in
+speech. Files are encoded like a typical published episode (stereo MP3)
+so the app's speech transcoding does real work, and are cached on disk
+between runs.
+"""
+import os
+import functools
+import threading
+import subprocess
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Sequence, Tuple
+
+# 1 minute, 10 minutes and 30 minutes
+DEFAULT_DURATIONS = (60, 600, 1800)
+
+SOURCE_BITRATE = "96k"
+
+# Tone for 8s, then 1s of (near) silence
+SPEECH_EXPRESSION = "0.25*sin(2*PI*(160+60*sin(2*PI*3*t))*t)*lt(mod(t\\,9)\\,8)"
+
+
+def generate_fixture(directory: str, seconds: int) -> str:
+    """Create (or reuse) a synthetic episode of the given length. Returns its path."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"episode_{seconds}s.mp3")
+    if os.path.exists(path):
+        return path
+
+    partial = path + '.partial.mp3'
+    subprocess.run([
+        'ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', f"aevalsrc=exprs='{SPEECH_EXPRESSION}':sample_rate=44100:duration={seconds}",
+        '-f', 'lavfi', '-i', f"anoisesrc=amplitude=0.002:sample_rate=44100:duration={seconds}",
+        '-filter_complex', 'amix=inputs=2:duration=first:normalize=0',
+        '-ac', '2', '-c:a', 'libmp3lame', '-b:a', SOURCE_BITRATE,
+        '-y', partial
+    ], check=True)
+    os.replace(partial, path)
+    return path
+
+
+def generate_fixtures(directory: str, durations: Sequence[int] = DEFAULT_DURATIONS) -> Dict[int, str]:
+    """Create every fixture; returns {seconds: path}."""
+    return {seconds: generate_fixture(directory, seconds) for seconds in durations}
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_directory(directory: str, host: str = '127.0.0.1', port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Serve fixtures over HTTP on a background thread, like a podcast host.
+
+    Returns:
+        Tuple of (server, base URL)
+    """
+    handler = functools.partial(_QuietHandler, directory=directory)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fixture-server', daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
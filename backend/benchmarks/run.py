@@ -0,0 +1,535 @@
+"""
+Offline end-to-end benchmark for the podcast API.
+
+Starts the fake OpenAI/OpenRouter services, serves synthetic episodes
+over HTTP, launches the API server against them, then:
+
+1. Processes episodes through POST /api/process-podcast with a fixed
+   number in flight, following each job's event stream to time every
+   pipeline stage.
+2. Hammers the read endpoints (listing, summary detail, conditional
+   summary detail and search) with concurrent requests.
+
+Reports p50/p95/p99 latency and throughput for each, plus the peak RSS of
+the server process tree (including ffmpeg children) while each pipeline
+stage was running. Nothing leaves the machine and no API keys are used.
+
+Run from backend/ (needs ffmpeg and ffprobe on PATH):
+    python -m benchmarks.run --episodes 6 --concurrency 3
+    python -m benchmarks.run --json results.json
+    python -m benchmarks.run --baseline results.json --max-regression 0.2
+    python -m benchmarks.run --smoke
+
+--smoke processes one short episode with no simulated latency and a few
+reads, in seconds, and exits non-zero if anything failed; the test suite
+runs it when ffmpeg is available.
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import asyncio
+import tempfile
+import threading
+import subprocess
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import httpx
+
+from benchmarks.fake_services import FakeServiceConfig, WORDS, start_fake_services
+from benchmarks.fixtures import DEFAULT_DURATIONS, generate_fixtures, serve_directory
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER_START_TIMEOUT_SECONDS = 60
+RSS_SAMPLE_INTERVAL_SECONDS = 0.1
+
+# What --smoke sets, overriding the options given
+SMOKE_OPTIONS = {
+    'episodes': 1,
+    'concurrency': 1,
+    'durations': '20',
+    'read_requests': 5,
+    'read_concurrency': 2,
+    'whisper_latency': 0.0,
+    'whisper_latency_per_minute': 0.0,
+    'llm_latency': 0.0,
+    'llm_latency_per_token': 0.0,
+    'failure_rate': 0.0,
+}
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Linear-interpolated percentile of `values` (pct in 0-100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values: List[float], wall_seconds: Optional[float] = None) -> Dict[str, Any]:
+    summary = {
+        'count': len(values),
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'max': max(values) if values else None,
+    }
+    if wall_seconds:
+        summary['throughput_per_second'] = len(values) / wall_seconds
+    return summary
+
+
+def _process_tree_rss(pid: int) -> Optional[int]:
+    """Resident memory (bytes) of a process and all its descendants, from /proc."""
+    total = 0
+    pending = [pid]
+    seen = set()
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+            for task in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{task}/children') as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            if current == pid:
+                return None
+    return total
+
+
+class RSSSampler:
+    """
+    Samples the server's process-tree RSS in the background.
+
+    Each sample is attributed to every label `active_labels()` returns at
+    that moment, giving the peak RSS seen while each stage was running.
+    """
+
+    def __init__(self, pid: int, active_labels: Callable[[], Iterable[str]]):
+        self.pid = pid
+        self.active_labels = active_labels
+        self.peak: Optional[int] = None
+        self.peak_by_label: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(RSS_SAMPLE_INTERVAL_SECONDS):
+            rss = _process_tree_rss(self.pid)
+            if rss is None:
+                continue
+            self.peak = max(self.peak or 0, rss)
+            for label in list(self.active_labels()):
+                self.peak_by_label[label] = max(self.peak_by_label.get(label, 0), rss)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def start_server(port: int, env: Dict[str, str], log_path: str) -> subprocess.Popen:
+    """Launch the API with uvicorn (output to `log_path`) and wait until /health answers."""
+    with open(log_path, 'wb') as log:
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'app.main:app',
+             '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+            cwd=BACKEND_DIR,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    deadline = time.monotonic() + SERVER_START_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API server exited with code {process.returncode}, see {log_path}")
+        try:
+            if httpx.get(f'http://127.0.0.1:{port}/health', timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("API server did not start in time")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class PipelineRun:
+    """Collects end-to-end and per-stage timings while episodes are processed."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.stage_durations: Dict[str, List[float]] = {}
+        self.active_stages: Dict[str, int] = {}
+        self.failures: List[str] = []
+        self.summary_ids: List[int] = []
+        self.audio_seconds = 0.0
+
+    def active(self) -> List[str]:
+        return [stage for stage, count in self.active_stages.items() if count > 0]
+
+    async def process(self, client: httpx.AsyncClient, url: str, audio_seconds: float):
+        started = time.perf_counter()
+        response = await client.post('/api/process-podcast', json={'url': url, 'force': True})
+        response.raise_for_status()
+        job_id = response.json()['job_id']
+
+        open_stages = set()
+        outcome = None
+        try:
+            async for event, data in _sse_events(client, f'/api/jobs/{job_id}/events'):
+                if event == 'stage' and data.get('status') == 'started':
+                    open_stages.add(data['stage'])
+                    self.active_stages[data['stage']] = self.active_stages.get(data['stage'], 0) + 1
+                elif event == 'stage' and data.get('status') in ('completed', 'failed'):
+                    open_stages.discard(data['stage'])
+                    self.active_stages[data['stage']] -= 1
+                    if data['status'] == 'completed':
+                        self.stage_durations.setdefault(data['stage'], []).append(data['duration_seconds'])
+                elif event in ('completed', 'failed'):
+                    outcome = (event, data)
+                    break
+        finally:
+            for stage in open_stages:
+                self.active_stages[stage] -= 1
+
+        if outcome and outcome[0] == 'completed':
+            self.latencies.append(time.perf_counter() - started)
+            self.audio_seconds += audio_seconds
+            summary_id = (outcome[1].get('result') or {}).get('summary_id')
+            if summary_id:
+                self.summary_ids.append(summary_id)
+        else:
+            self.failures.append(outcome[1].get('error', 'unknown') if outcome else 'event stream ended early')
+
+
+async def _sse_events(client: httpx.AsyncClient, path: str):
+    """Yield (event, data) pairs from a server-sent event stream."""
+    async with client.stream('GET', path, timeout=None) as response:
+        event, data = None, []
+        async for line in response.aiter_lines():
+            if line.startswith('event:'):
+                event = line[6:].strip()
+            elif line.startswith('data:'):
+                data.append(line[5:].strip())
+            elif not line and event:
+                yield event, json.loads('\n'.join(data) or '{}')
+                event, data = None, []
+
+
+async def run_pipeline_scenario(
+    client: httpx.AsyncClient,
+    episodes: List[Dict[str, Any]],
+    concurrency: int,
+    run: PipelineRun
+) -> float:
+    """Process every episode with `concurrency` in flight. Returns wall seconds."""
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(episode):
+        async with gate:
+            try:
+                await run.process(client, episode['url'], episode['seconds'])
+            except Exception as e:
+                run.failures.append(f"{type(e).__name__}: {str(e)}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(episode) for episode in episodes))
+    return time.perf_counter() - started
+
+
+async def run_read_scenario(
+    client: httpx.AsyncClient,
+    summary_ids: List[int],
+    requests: int,
+    concurrency: int
+) -> Dict[str, Dict[str, Any]]:
+    """Time the read endpoints under concurrent load."""
+    rng = random.Random(0)
+    etags: Dict[int, str] = {}
+    for summary_id in summary_ids:
+        response = await client.get(f'/api/summaries/{summary_id}')
+        if response.headers.get('etag'):
+            etags[summary_id] = response.headers['etag']
+
+    scenarios = {
+        'list_summaries': lambda: client.get('/api/summaries', params={'limit': 20}),
+        'summary_detail': lambda: client.get(
+            f'/api/summaries/{rng.choice(summary_ids)}', headers={'Accept-Encoding': 'gzip'}
+        ),
+        'summary_not_modified': lambda: _conditional_get(client, rng.choice(summary_ids), etags),
+        'search': lambda: client.get('/api/search', params={'q': rng.choice(WORDS)}),
+    }
+
+    results = {}
+    for name, request in scenarios.items():
+        latencies: List[float] = []
+        errors = 0
+        gate = asyncio.Semaphore(concurrency)
+
+        async def one():
+            nonlocal errors
+            async with gate:
+                started = time.perf_counter()
+                response = await request()
+                latencies.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        results[name] = dict(summarize(latencies, time.perf_counter() - started), errors=errors)
+    return results
+
+
+def _conditional_get(client: httpx.AsyncClient, summary_id: int, etags: Dict[int, str]):
+    headers = {'If-None-Match': etags[summary_id]} if summary_id in etags else {}
+    return client.get(f'/api/summaries/{summary_id}', headers=headers)
+
+
+def _format_seconds(value: Optional[float]) -> str:
+    if value is None:
+        return '-'
+    return f'{value * 1000:.1f}ms' if value < 1 else f'{value:.2f}s'
+
+
+def _format_bytes(value: Optional[int]) -> str:
+    return f'{value / 1024 / 1024:.0f}MB' if value else '-'
+
+
+def print_report(results: Dict[str, Any]):
+    pipeline = results['pipeline']
+    print(f"\n{'='*78}")
+    print(f"Pipeline: {pipeline['episodes']} episodes, {pipeline['concurrency']} in flight, "
+          f"{pipeline['failures']} failed, {pipeline['wall_seconds']:.1f}s wall")
+    print(f"  throughput: {pipeline['episodes_per_minute']:.2f} episodes/min, "
+          f"{pipeline['audio_minutes_per_minute']:.1f} audio min/min, "
+          f"peak RSS {_format_bytes(pipeline['peak_rss_bytes'])}")
+    print(f"{'='*78}")
+    print(f"{'':24}{'count':>7}{'p50':>11}{'p95':>11}{'p99':>11}{'peak RSS':>12}")
+    rows = [('end to end', pipeline['end_to_end'], pipeline['peak_rss_bytes'])]
+    rows += [
+        (f"  {stage}", stats, pipeline['peak_rss_by_stage'].get(stage))
+        for stage, stats in pipeline['stages'].items()
+    ]
+    for name, stats, rss in rows:
+        print(f"{name:24}{stats['count']:>7}{_format_seconds(stats['p50']):>11}"
+              f"{_format_seconds(stats['p95']):>11}{_format_seconds(stats['p99']):>11}{_format_bytes(rss):>12}")
+
+    print(f"\n{'Reads':24}{'count':>7}{'p50':>11}{'p95':>11}{'p99':>11}{'req/s':>12}")
+    for name, stats in results['reads'].items():
+        print(f"{name:24}{stats['count']:>7}{_format_seconds(stats['p50']):>11}"
+              f"{_format_seconds(stats['p95']):>11}{_format_seconds(stats['p99']):>11}"
+              f"{stats.get('throughput_per_second', 0):>12.0f}")
+    print()
+
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """List every p95 that got slower than the baseline by more than `max_regression`."""
+    pairs = [('pipeline end to end', results['pipeline']['end_to_end'], baseline['pipeline']['end_to_end'])]
+    for stage, stats in results['pipeline']['stages'].items():
+        if stage in baseline['pipeline']['stages']:
+            pairs.append((f'stage {stage}', stats, baseline['pipeline']['stages'][stage]))
+    for name, stats in results['reads'].items():
+        if name in baseline['reads']:
+            pairs.append((f'read {name}', stats, baseline['reads'][name]))
+
+    regressions = []
+    for name, current, previous in pairs:
+        if current.get('p95') is None or not previous.get('p95'):
+            continue
+        change = current['p95'] / previous['p95'] - 1
+        if change > max_regression:
+            regressions.append(
+                f"{name}: p95 {_format_seconds(previous['p95'])} -> {_format_seconds(current['p95'])} (+{change:.0%})"
+            )
+    return regressions
+
+
+async def _benchmark(args, base_url: str, episodes: List[Dict[str, Any]], server_pid: int) -> Dict[str, Any]:
+    run = PipelineRun()
+    async with httpx.AsyncClient(base_url=base_url, timeout=600) as client:
+        with RSSSampler(server_pid, run.active) as sampler:
+            wall = await run_pipeline_scenario(client, episodes, args.concurrency, run)
+
+        reads = {}
+        if run.summary_ids:
+            reads = await run_read_scenario(client, run.summary_ids, args.read_requests, args.read_concurrency)
+
+    return {
+        'pipeline': {
+            'episodes': len(episodes),
+            'concurrency': args.concurrency,
+            'failures': len(run.failures),
+            'failure_messages': run.failures[:10],
+            'wall_seconds': wall,
+            'episodes_per_minute': len(run.latencies) / wall * 60,
+            'audio_minutes_per_minute': run.audio_seconds / wall,
+            'end_to_end': summarize(run.latencies),
+            'stages': {stage: summarize(values) for stage, values in run.stage_durations.items()},
+            'peak_rss_bytes': sampler.peak,
+            'peak_rss_by_stage': sampler.peak_by_label,
+        },
+        'reads': reads,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--episodes', type=int, default=6, help='Episodes to process')
+    parser.add_argument('--concurrency', type=int, default=3, help='Episodes in flight at once')
+    parser.add_argument('--durations', default=','.join(str(d) for d in DEFAULT_DURATIONS),
+                        help='Fixture lengths in seconds, used round-robin')
+    parser.add_argument('--read-requests', type=int, default=500, help='Requests per read endpoint')
+    parser.add_argument('--read-concurrency', type=int, default=20)
+    parser.add_argument('--whisper-latency', type=float, default=1.0)
+    parser.add_argument('--whisper-latency-per-minute', type=float, default=0.5)
+    parser.add_argument('--llm-latency', type=float, default=1.0)
+    parser.add_argument('--llm-latency-per-token', type=float, default=0.002)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--fixtures-dir', default=os.path.join(tempfile.gettempdir(), 'podcast-bench-fixtures'))
+    parser.add_argument('--transcript-cache', action='store_true',
+                        help='Keep the transcript cache on (repeated fixtures then skip Whisper)')
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--baseline', help='Results file from an earlier run to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='Allowed p95 slowdown against the baseline before failing')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='Extra environment for the API server (repeatable)')
+    parser.add_argument('--smoke', action='store_true',
+                        help='Quick end-to-end check: one short episode, no simulated latency, a few reads')
+    args = parser.parse_args(argv)
+    if args.smoke:
+        for name, value in SMOKE_OPTIONS.items():
+            setattr(args, name, value)
+    return args
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Start the fake services, fixtures and API server, benchmark them and return the results."""
+    durations = [int(value) for value in args.durations.split(',') if value]
+    print(f"Generating fixtures in {args.fixtures_dir}...")
+    fixtures = generate_fixtures(args.fixtures_dir, durations)
+
+    fake_config = FakeServiceConfig(
+        whisper_latency=args.whisper_latency,
+        whisper_latency_per_minute=args.whisper_latency_per_minute,
+        llm_latency=args.llm_latency,
+        llm_latency_per_token=args.llm_latency_per_token,
+        failure_rate=args.failure_rate,
+    )
+    fake_server = start_fake_services(fake_config)
+    fake_url = f"http://127.0.0.1:{fake_server.server_address[1]}"
+    fixture_server, fixture_url = serve_directory(args.fixtures_dir)
+
+    # Unique query strings keep episodes from coalescing or hitting stored results
+    run_id = int(time.time())
+    episodes = []
+    for index in range(args.episodes):
+        seconds = durations[index % len(durations)]
+        name = os.path.basename(fixtures[seconds])
+        episodes.append({'url': f"{fixture_url}/{name}?bench={run_id}-{index}", 'seconds': seconds})
+
+    workdir = tempfile.mkdtemp(prefix='podcast-bench-')
+    port = _free_port()
+    env = dict(os.environ)
+    env.update({
+        'OPENAI_API_KEY': 'benchmark',
+        'OPENROUTER_API_KEY': 'benchmark',
+        'OPENAI_BASE_URL': f'{fake_url}/v1',
+        'OPENROUTER_BASE_URL': f'{fake_url}/api/v1',
+        'DB_PATH': os.path.join(workdir, 'podcast_summaries.db'),
+        'TRANSCRIPT_CACHE_PATH': os.path.join(workdir, 'transcript_cache.db'),
+        'TMPDIR': workdir,
+    })
+    if not args.transcript_cache:
+        env['TRANSCRIPT_CACHE_MAX_BYTES'] = '0'
+    for item in args.env:
+        key, _, value = item.partition('=')
+        env[key] = value
+
+    log_path = os.path.join(workdir, 'server.log')
+    print(f"Starting API server on port {port} (data and server.log in {workdir})...")
+    server = start_server(port, env, log_path)
+    try:
+        results = asyncio.run(_benchmark(args, f'http://127.0.0.1:{port}', episodes, server.pid))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        fake_server.shutdown()
+        fixture_server.shutdown()
+
+    results['fake_services'] = dict(fake_config.counts)
+    return results
+
+
+def smoke_failures(results: Dict[str, Any]) -> List[str]:
+    """Everything that went wrong in a run, for --smoke."""
+    failures = list(results['pipeline']['failure_messages'])
+    if results['pipeline']['end_to_end']['count'] < results['pipeline']['episodes']:
+        failures.append(
+            f"{results['pipeline']['end_to_end']['count']} of {results['pipeline']['episodes']} episodes completed"
+        )
+    for name, stats in results['reads'].items():
+        if stats['errors']:
+            failures.append(f"read {name}: {stats['errors']} of {stats['count']} requests failed")
+    if not results['reads']:
+        failures.append("no summaries to read")
+    return failures
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    results = run(args)
+    print_report(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.max_regression)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No p95 regressions over {args.max_regression:.0%} against {args.baseline}")
+
+    if args.smoke:
+        failures = smoke_failures(results)
+        if failures:
+            print("Smoke run failed:")
+            for line in failures:
+                print(f"  {line}")
+            sys.exit(1)
+        print("Smoke run passed")
+
+
+if __name__ == '__main__':
+    main()
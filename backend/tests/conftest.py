@@ -0,0 +1,13 @@
+import pytest
+
+from app import database
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh summaries database for the test, on this thread's connection."""
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'summaries.db'))
+    database.init_db()
+    yield database
+    database.get_connection().close()
+    database._local.connections.pop(database.DB_PATH, None)
@@ -0,0 +1,17 @@
+import shutil
+
+import pytest
+
+from benchmarks import run
+
+pytestmark = pytest.mark.skipif(
+    not (shutil.which('ffmpeg') and shutil.which('ffprobe')),
+    reason='the benchmark needs ffmpeg and ffprobe'
+)
+
+
+def test_smoke_run_processes_an_episode_end_to_end(tmp_path):
+    args = run.parse_args(['--smoke', '--fixtures-dir', str(tmp_path / 'fixtures')])
+    results = run.run(args)
+    assert run.smoke_failures(results) == []
+    assert results['pipeline']['stages']
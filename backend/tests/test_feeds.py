@@ -0,0 +1,38 @@
+import pytest
+
+from app.services.feeds import parse_feed
+
+
+def test_rss_and_atom_episodes():
+    rss = b'''<?xml version="1.0"?>
+    <rss><channel>
+      <item><title>One</title><enclosure url="https://cdn.example.com/1.mp3"/></item>
+      <item><title>Two</title><link>https://example.com/2</link></item>
+    </channel></rss>'''
+    atom = b'''<feed xmlns="http://www.w3.org/2005/Atom">
+      <entry><title>Three</title><link rel="enclosure" href="https://cdn.example.com/3.mp3"/></entry>
+    </feed>'''
+
+    assert parse_feed(rss) == [
+        {'url': 'https://cdn.example.com/1.mp3', 'title': 'One'},
+        {'url': 'https://example.com/2', 'title': 'Two'},
+    ]
+    assert parse_feed(atom) == [{'url': 'https://cdn.example.com/3.mp3', 'title': 'Three'}]
+
+
+def test_entity_expansion_is_refused():
+    bomb = b'''<?xml version="1.0"?>
+    <!DOCTYPE rss [
+      <!ENTITY a "aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa">
+      <!ENTITY b "&a;&a;&a;&a;&a;&a;&a;&a;&a;&a;">
+      <!ENTITY c "&b;&b;&b;&b;&b;&b;&b;&b;&b;&b;">
+    ]>
+    <rss><channel><item><title>&c;</title><link>https://example.com/1</link></item></channel></rss>'''
+
+    with pytest.raises(ValueError, match="forbidden"):
+        parse_feed(bomb)
+
+
+def test_invalid_xml():
+    with pytest.raises(ValueError, match="not valid XML"):
+        parse_feed(b'<rss><channel>')
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from app.services import map_reduce
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    async def chat_completion(prompt, api_key, use_cache=True, **kwargs):
+        calls.append(use_cache)
+        number = len(calls)
+        await asyncio.sleep(0.01)
+        return f"{'cached' if use_cache else 'fresh'} notes {number}"
+
+    monkeypatch.setattr(map_reduce.llm_client, 'chat_completion', chat_completion)
+    monkeypatch.setattr(map_reduce, '_notes_cache', map_reduce.OrderedDict())
+    monkeypatch.setattr(map_reduce, '_notes_inflight', {})
+    return calls
+
+
+TRANSCRIPT = ' '.join(['word'] * 4000)
+
+
+def test_fresh_call_skips_stored_notes(calls):
+    async def run():
+        cached, _ = await map_reduce.prepare_transcript(TRANSCRIPT, 'key', max_chars=1000)
+        mapped = len(calls)
+        fresh, _ = await map_reduce.prepare_transcript(TRANSCRIPT, 'key', max_chars=1000, use_cache=False)
+        assert len(calls) > mapped
+        assert calls[mapped:] == [False] * (len(calls) - mapped)
+        assert fresh != cached
+        # The fresh notes do not replace the stored ones
+        again, _ = await map_reduce.prepare_transcript(TRANSCRIPT, 'key', max_chars=1000)
+        assert again == cached
+
+    asyncio.run(run())
+
+
+def test_fresh_call_does_not_join_cached_run(calls):
+    async def run():
+        cached, fresh, fresh_too = await asyncio.gather(
+            map_reduce.prepare_transcript(TRANSCRIPT, 'key', max_chars=1000),
+            map_reduce.prepare_transcript(TRANSCRIPT, 'key', max_chars=1000, use_cache=False),
+            map_reduce.prepare_transcript(TRANSCRIPT, 'key', max_chars=1000, use_cache=False),
+        )
+        assert 'cached' in cached[0] and 'fresh' not in cached[0]
+        assert 'fresh' in fresh[0] and 'cached' not in fresh[0]
+        # Both summary types of a forced job still share one run
+        assert fresh == fresh_too
+        assert calls.count(True) == calls.count(False)
+
+    asyncio.run(run())
@@ -0,0 +1,47 @@
+import pytest
+
+from app.services.pipeline import _stage
+from app.services.metrics import PIPELINE_STAGE_SECONDS
+
+
+class RecordingJob:
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event_type, **data):
+        self.events.append((event_type, data))
+
+
+def _count(stage, status):
+    line = f'podcast_pipeline_stage_duration_seconds_count{{stage="{stage}",status="{status}"}}'
+    for sample in PIPELINE_STAGE_SECONDS.samples():
+        if sample.startswith(line + ' '):
+            return float(sample.split()[-1])
+    return 0.0
+
+
+def test_stage_completes():
+    job = RecordingJob()
+    before = _count('test_ok', 'completed')
+
+    with _stage(job, 'test_ok'):
+        pass
+
+    assert [data['status'] for _, data in job.events] == ['started', 'completed']
+    assert 'duration_seconds' in job.events[1][1]
+    assert _count('test_ok', 'completed') == before + 1
+
+
+def test_failing_stage_emits_failed_and_is_timed():
+    job = RecordingJob()
+    before = _count('test_fail', 'failed')
+
+    with pytest.raises(RuntimeError):
+        with _stage(job, 'test_fail'):
+            raise RuntimeError("boom")
+
+    assert [data['status'] for _, data in job.events] == ['started', 'failed']
+    assert job.events[1][1]['stage'] == 'test_fail'
+    assert job.events[1][1]['duration_seconds'] >= 0
+    assert _count('test_fail', 'failed') == before + 1
+    assert _count('test_fail', 'completed') == 0
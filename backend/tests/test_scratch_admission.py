@@ -0,0 +1,96 @@
+import time
+import asyncio
+
+import pytest
+
+from app.services.job_queue import JobQueue, JOB_COMPLETED
+from app.services.scratch import ScratchManager, ScratchBudgetError, MB
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return ScratchManager(str(tmp_path / 'scratch'), budget_bytes=300 * MB, job_reserve_bytes=100 * MB)
+
+
+def test_queued_upload_does_not_hold_back_running_url_job(manager):
+    # One job slot, like MAX_CONCURRENT_JOBS=1: the upload's job is queued
+    # behind the URL job, while its staged body already holds 250MB
+    queue = JobQueue(max_concurrent=1, max_queued=10)
+    upload_space = manager.stage()
+    upload_space.reserve(250 * MB)
+    order = []
+
+    async def url_pipeline(job):
+        started = time.monotonic()
+        space = await queue.run_blocking(manager.open, None, 2)
+        order.append(('url admitted', time.monotonic() - started))
+        space.close()
+        return {}
+
+    async def upload_pipeline(job):
+        await queue.run_blocking(upload_space.admit, 2)
+        order.append(('upload admitted', manager.stats()['reserved_bytes']))
+        upload_space.close()
+        return {}
+
+    async def run():
+        url_job = queue.submit('https://example.com/ep', url_pipeline)
+        upload_job = queue.submit('upload://abc', upload_pipeline)
+        await queue.wait(url_job)
+        await queue.wait(upload_job)
+        return url_job, upload_job
+
+    url_job, upload_job = asyncio.run(run())
+    queue.shutdown()
+
+    assert url_job.status == JOB_COMPLETED, url_job.error
+    assert upload_job.status == JOB_COMPLETED, upload_job.error
+    assert order[0][0] == 'url admitted' and order[0][1] < 1
+    assert order[1] == ('upload admitted', 350 * MB)
+    assert manager.stats()['reserved_bytes'] == 0
+    assert manager.stats()['staged_bytes'] == 0
+
+
+def test_admitting_a_staged_space_waits_for_room(manager):
+    running = manager.open(250 * MB)
+    staged = manager.stage()
+    assert manager.stats()['reserved_bytes'] == 250 * MB
+
+    with pytest.raises(ScratchBudgetError):
+        staged.admit(timeout=0.1)
+
+    running.close()
+    staged.admit(timeout=0.1)
+    assert staged.admitted
+    assert manager.stats()['reserved_bytes'] == 100 * MB
+    staged.close()
+
+
+def test_staging_is_capped(tmp_path):
+    manager = ScratchManager(
+        str(tmp_path / 'scratch'), budget_bytes=300 * MB, job_reserve_bytes=100 * MB,
+        staging_budget_bytes=250 * MB
+    )
+    first = manager.stage()
+    # One upload alone is always let in, however large
+    first.reserve(400 * MB)
+    with pytest.raises(ScratchBudgetError):
+        manager.stage()
+
+    first.close()
+    second = manager.stage()
+    with pytest.raises(ScratchBudgetError):
+        manager.stage(200 * MB)
+    second.close()
+    assert manager.stats()['staged_bytes'] == 0
+
+
+def test_space_counts_split_staged_from_admitted(manager):
+    staged = manager.stage()
+    admitted = manager.open()
+    assert manager.space_counts() == {'admitted': 1, 'staged': 1, 'waiting': 0}
+    staged.admit()
+    assert manager.space_counts() == {'admitted': 2, 'staged': 0, 'waiting': 0}
+    staged.close()
+    admitted.close()
+    assert manager.space_counts() == {'admitted': 0, 'staged': 0, 'waiting': 0}
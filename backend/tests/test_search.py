@@ -0,0 +1,58 @@
+from app import database
+
+
+def _save(db, count):
+    for i in range(count):
+        db.save_summary(
+            f'https://example.com/{i}',
+            'market growth ' * (10 + i) + 'filler ' * 50,
+            f'summary {i}',
+            podcast_title=f'Episode {i}'
+        )
+
+
+def _count_decompressions(db):
+    calls = []
+    original = database.decompress_text
+
+    def counting(codec, blob):
+        calls.append(codec)
+        return original(codec, blob)
+
+    db.get_connection().create_function('decompress_text', 2, counting, deterministic=True)
+    return calls
+
+
+def test_pages_cover_all_matches_once(db):
+    _save(db, 7)
+
+    seen = []
+    offset = 0
+    while offset is not None:
+        results, offset = db.search_summaries('market', limit=3, offset=offset)
+        seen += [result['id'] for result in results]
+
+    assert sorted(seen) == list(range(1, 8))
+
+
+def test_last_page_has_no_next_offset(db):
+    _save(db, 6)
+    assert db.search_summaries('market', limit=3, offset=0)[1] == 3
+    assert db.search_summaries('market', limit=3, offset=3)[1] is None
+    assert db.search_summaries('market', limit=3, offset=6) == ([], None)
+
+
+def test_snippets_only_for_returned_rows(db):
+    _save(db, 20)
+    calls = _count_decompressions(db)
+
+    results, next_offset = db.search_summaries('market', limit=5)
+
+    assert len(results) == 5 and next_offset == 5
+    assert '<mark>market</mark>' in results[0]['snippet']
+    assert len(calls) == 5
+
+
+def test_no_match(db):
+    _save(db, 2)
+    assert db.search_summaries('zebra') == ([], None)
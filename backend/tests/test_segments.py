@@ -0,0 +1,99 @@
+import pytest
+
+from app.services.segments import pack_segments, SegmentIndex
+
+# Multi-byte text throughout, so a byte offset that is off by one splits a character
+SEGMENTS = [
+    {'start': 0.0, 'end': 2.5, 'text': 'Grüße aus Köln. '},
+    {'start': 2.5, 'end': 5.0, 'text': '日本語のテキスト。'},
+    {'start': 5.0, 'end': 7.25, 'text': ''},
+    {'start': 7.25, 'end': 9.0, 'text': 'Podcast 🎙️ time.'},
+    {'start': 12.0, 'end': 15.5, 'text': 'After a gap — ça va?'},
+]
+
+
+def _index(packed):
+    return SegmentIndex(packed['starts'], packed['ends'], packed['offsets'])
+
+
+def _slice(packed, lo, hi):
+    index = _index(packed)
+    first, last = index.byte_range(lo, hi)
+    return index.segments(lo, hi, packed['text'][first:last])
+
+
+def test_round_trip_non_ascii():
+    packed = pack_segments(SEGMENTS)
+    index = _index(packed)
+
+    assert len(index) == len(SEGMENTS)
+    assert index.duration == 15.5
+    assert _slice(packed, 0, len(SEGMENTS)) == SEGMENTS
+    # Each segment on its own, from just its bytes
+    for i, segment in enumerate(SEGMENTS):
+        assert _slice(packed, i, i + 1) == [segment]
+
+
+def test_packing_sorts_and_rounds_to_milliseconds():
+    packed = pack_segments([
+        {'start': 3.0004, 'end': 4.0, 'text': 'b'},
+        {'start': 1.0, 'end': 0.5, 'text': 'a'},
+    ])
+    assert _slice(packed, 0, 2) == [
+        {'start': 1.0, 'end': 1.0, 'text': 'a'},  # end never before start
+        {'start': 3.0, 'end': 4.0, 'text': 'b'},
+    ]
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    (0.0, 100.0, [0, 1, 2, 3, 4]),
+    # Exactly on edges: a segment ending at `start` is out, one starting at `end` too
+    (2.5, 5.0, [1]),
+    (2.5, 5.001, [1, 2]),
+    (2.499, 2.5, [0]),
+    # Inside one segment
+    (3.0, 4.0, [1]),
+    # Between segments, in the gap
+    (9.0, 12.0, []),
+    (10.0, 11.0, []),
+    (8.0, 13.0, [3, 4]),
+    # Past the end and before the start
+    (15.5, 20.0, []),
+    (16.0, 20.0, []),
+    (0.0, 0.0, []),
+])
+def test_find(start, end, expected):
+    index = _index(pack_segments(SEGMENTS))
+    lo, hi = index.find(start, end)
+    assert list(range(lo, hi)) == expected
+
+
+def test_empty():
+    packed = pack_segments([])
+    index = _index(packed)
+    assert len(index) == 0
+    assert index.duration == 0.0
+    assert index.find(0, 10) == (0, 0)
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    (0.0, None, [0, 1, 2, 3, 4]),
+    (2.5, 5.0, [1]),
+    (4.0, 8.0, [1, 2, 3]),
+    (9.0, 12.0, []),
+    (12.0, None, [4]),
+    (30.0, None, []),
+])
+def test_database_slices_match(db, start, end, expected):
+    summary_id = db.save_summary('https://example.com/ep', 'transcript', 'summary', segments=SEGMENTS)
+
+    result = db.get_transcript_segments(summary_id, start, end)
+
+    assert result['segments'] == [SEGMENTS[i] for i in expected]
+    assert result['total_segments'] == len(SEGMENTS)
+    assert result['duration'] == 15.5
+
+
+def test_database_without_segments(db):
+    summary_id = db.save_summary('https://example.com/ep', 'transcript', 'summary')
+    assert db.get_transcript_segments(summary_id) is None
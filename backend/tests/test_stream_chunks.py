@@ -0,0 +1,102 @@
+import os
+import sys
+import queue
+import stat
+import threading
+import textwrap
+
+import pytest
+
+from app.services import stage_limits, audio_extractor
+from app.services.stage_limits import StageLimiter, stage_limit, STAGE_DOWNLOAD, STAGE_FFMPEG
+from app.services.scratch import ScratchManager
+from app.services.audio_extractor import transcode_to_speech_chunks, StreamStopped
+
+CHUNKS = 4
+
+# Stands in for ffmpeg's segment muxer: writes the episode and a few chunks,
+# listing each finished chunk in the CSV segment list
+FAKE_FFMPEG = textwrap.dedent(f"""\
+    #!{sys.executable}
+    import os, sys, time
+    args = sys.argv[1:]
+    list_path = args[args.index('-segment_list') + 1]
+    output_path = args[args.index('-y') + 1]
+    chunk_pattern = args[-1]
+    with open(output_path, 'wb') as f:
+        f.write(b'audio')
+    for i in range({CHUNKS}):
+        path = chunk_pattern % i
+        with open(path, 'wb') as f:
+            f.write(b'chunk')
+        with open(list_path, 'a') as f:
+            f.write(f"{{os.path.basename(path)}},{{i * 10.0}},{{(i + 1) * 10.0}}\\n")
+        time.sleep(0.2)
+""")
+
+
+@pytest.fixture
+def scratch(tmp_path, monkeypatch):
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    ffmpeg = bin_dir / 'ffmpeg'
+    ffmpeg.write_text(FAKE_FFMPEG)
+    ffmpeg.chmod(ffmpeg.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setattr(audio_extractor, 'STREAM_POLL_SECONDS', 0.01)
+
+    manager = ScratchManager(str(tmp_path / 'scratch'), budget_bytes=1 << 30, job_reserve_bytes=1 << 20)
+    space = manager.open()
+    yield space
+    space.close()
+
+
+@pytest.fixture
+def single_ffmpeg_slot(monkeypatch):
+    monkeypatch.setitem(stage_limits._limiters, STAGE_FFMPEG, StageLimiter(STAGE_FFMPEG, 1))
+    monkeypatch.setitem(stage_limits._limiters, STAGE_DOWNLOAD, StageLimiter(STAGE_DOWNLOAD, 1))
+
+
+def test_blocked_consumer_needing_ffmpeg_slot_does_not_deadlock(scratch, single_ffmpeg_slot):
+    # Like the streaming pipeline: a bounded queue between the download thread
+    # and a worker that needs the only ffmpeg slot for each chunk
+    handed_on = queue.Queue(maxsize=1)
+    processed = []
+
+    def on_chunk(path, start, end):
+        handed_on.put(start, timeout=10)
+
+    def consume():
+        for _ in range(CHUNKS):
+            start = handed_on.get(timeout=10)
+            with stage_limit(STAGE_FFMPEG):
+                processed.append(start)
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+    transcode_to_speech_chunks(
+        'source.mp3', scratch.path('audio.ogg'), scratch, on_chunk,
+        stages=(STAGE_DOWNLOAD, STAGE_FFMPEG)
+    )
+    consumer.join(timeout=10)
+
+    assert processed == [0.0, 10.0, 20.0, 30.0]
+    assert stage_limits.stage_stats()[STAGE_FFMPEG]['active'] == 0
+
+
+def test_stop_abandons_the_stream(scratch, single_ffmpeg_slot):
+    stop = threading.Event()
+    handed_on = []
+
+    def on_chunk(path, start, end):
+        handed_on.append(start)
+        stop.set()
+
+    with pytest.raises(StreamStopped):
+        transcode_to_speech_chunks(
+            'source.mp3', scratch.path('audio.ogg'), scratch, on_chunk,
+            stages=(STAGE_DOWNLOAD, STAGE_FFMPEG), stop=stop
+        )
+
+    assert handed_on == [0.0]
+    assert stage_limits.stage_stats()[STAGE_FFMPEG]['active'] == 0
@@ -0,0 +1,42 @@
+import pytest
+
+from app import database
+from app.services import transcript_cache
+from app.services.disk_cache import DiskCache
+
+URL = 'https://example.com/episode.mp3'
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    path = str(tmp_path / 'transcript_cache.db')
+    cache = DiskCache(path, 10 * 1024 * 1024, name='transcript_cache')
+    monkeypatch.setattr(transcript_cache, 'transcript_cache', cache)
+    yield cache
+    database.get_connection(path).close()
+    database._local.connections.pop(path, None)
+
+
+def test_source_needs_a_cached_transcript(cache):
+    assert not transcript_cache.has_cached_source(URL)
+    transcript_cache.remember_source(URL, 'a' * 64)
+    assert not transcript_cache.has_cached_source(URL)
+    transcript_cache.store_transcript('a' * 64, 'hello', [])
+    assert transcript_cache.has_cached_source(URL)
+    assert not transcript_cache.has_cached_source('https://example.com/other.mp3')
+
+
+def test_source_follows_the_latest_audio(cache):
+    transcript_cache.store_transcript('a' * 64, 'hello', [])
+    transcript_cache.remember_source(URL, 'a' * 64)
+    # The URL now serves different audio, which has no transcript yet
+    transcript_cache.remember_source(URL, 'b' * 64)
+    assert not transcript_cache.has_cached_source(URL)
+
+
+def test_checking_a_source_does_not_count_as_a_lookup(cache):
+    transcript_cache.store_transcript('a' * 64, 'hello', [])
+    transcript_cache.remember_source(URL, 'a' * 64)
+    transcript_cache.has_cached_source(URL)
+    transcript_cache.has_cached_source('https://example.com/other.mp3')
+    assert (cache.hits, cache.misses) == (0, 0)
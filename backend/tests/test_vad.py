@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from app.services.vad import (
+    TimeMap, find_non_speech, _frame_features,
+    VAD_SAMPLE_RATE, FRAME_SAMPLES, FRAME_SECONDS, TRIM_PADDING_SECONDS
+)
+
+rng = np.random.default_rng(0)
+
+
+def _time(seconds: float) -> np.ndarray:
+    return np.arange(int(seconds * VAD_SAMPLE_RATE)) / VAD_SAMPLE_RATE
+
+
+def speech(seconds: float) -> np.ndarray:
+    # Noise swelling at syllable rate, never quite silent
+    t = _time(seconds)
+    envelope = 0.05 + np.sin(2 * np.pi * 4 * t) ** 2
+    return rng.normal(0, 1, len(t)) * envelope * 6000
+
+
+def music(seconds: float) -> np.ndarray:
+    # A steady chord
+    t = _time(seconds)
+    return sum(np.sin(2 * np.pi * f * t) for f in (220, 277, 330, 440)) * 1500
+
+
+def silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * VAD_SAMPLE_RATE))
+
+
+def cut_of(*parts: np.ndarray) -> np.ndarray:
+    samples = np.clip(np.concatenate(parts), -32768, 32767).astype('<i2')
+    return find_non_speech(*_frame_features(samples))
+
+
+def frames(seconds: float) -> int:
+    return int(seconds * VAD_SAMPLE_RATE) // FRAME_SAMPLES
+
+
+def test_silence_between_speech_is_cut_with_padding():
+    cut = cut_of(speech(20), silence(5), speech(20))
+    padding = int(round(TRIM_PADDING_SECONDS / FRAME_SECONDS))
+    gap_start, gap_end = frames(20), frames(25)
+
+    assert not cut[:gap_start].any()
+    assert not cut[gap_end:].any()
+    assert not cut[gap_start:gap_start + padding].any()
+    assert not cut[gap_end - padding:gap_end].any()
+    assert cut[gap_start + padding + 1:gap_end - padding - 1].all()
+
+
+def test_silence_only_is_not_cut():
+    # Silence is relative to the episode's loud level, so nothing stands out
+    assert not cut_of(silence(30)).any()
+
+
+def test_music_alone_is_cut_but_speech_over_music_is_kept():
+    cut = cut_of(speech(20), music(20), speech(20) + music(20), speech(10))
+
+    assert cut[frames(20):frames(40)].mean() > 0.8
+    assert not cut[frames(40):].any()
+    assert not cut[:frames(20)].any()
+
+
+@pytest.mark.parametrize('part', [speech, music, silence])
+def test_audio_shorter_than_the_padding(part):
+    cut = cut_of(part(TRIM_PADDING_SECONDS / 2))
+    assert len(cut) == frames(TRIM_PADDING_SECONDS / 2)
+    assert not cut.any()
+
+
+def test_empty_audio():
+    assert len(find_non_speech(np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32))) == 0
+
+
+def test_time_map_moves_times_back_over_cuts():
+    # Kept 0-10s and 20-30s: trimmed 10s is original 20s
+    time_map = TimeMap([(0.0, 10.0), (20.0, 30.0)])
+
+    assert time_map.trimmed_duration == 20.0
+    assert time_map.to_source(5.0) == 5.0
+    assert time_map.to_source(12.5) == 22.5
+    # A time on the cut starts the next span, or ends the previous one
+    assert time_map.to_source(10.0) == 20.0
+    assert time_map.to_source(10.0, is_end=True) == 10.0
+    # Past either end it is clamped to the audio
+    assert time_map.to_source(-1.0) == 0.0
+    assert time_map.to_source(25.0, is_end=True) == 30.0
+
+
+def test_time_map_remaps_segments():
+    time_map = TimeMap([(2.0, 4.0), (10.0, 15.0)])
+    segments = [
+        {'start': 0.0, 'end': 2.0, 'text': 'a'},
+        {'start': 2.0, 'end': 4.5, 'text': 'b'},
+    ]
+
+    assert time_map.remap_segments(segments) == [
+        {'start': 2.0, 'end': 4.0, 'text': 'a'},
+        {'start': 10.0, 'end': 12.5, 'text': 'b'},
+    ]
+
+
+def test_time_map_single_span():
+    time_map = TimeMap([(3.0, 8.0)])
+    assert time_map.to_source(0.0) == 3.0
+    assert time_map.to_source(5.0, is_end=True) == 8.0
@@ -16,23 +16,82 @@ const apiClient = axios.create({
   },
 })
 
+// How often to poll a queued job when live progress events are unavailable
+const JOB_POLL_INTERVAL_MS = 3000
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms))
+
+const pollJob = async (jobId) => {
+  while (true) {
+    const job = (await apiClient.get(`/jobs/${jobId}`)).data
+    if (job.status === 'completed') return job.result
+    if (job.status === 'failed') throw new Error(job.error || 'Processing failed')
+    await sleep(JOB_POLL_INTERVAL_MS)
+  }
+}
+
+// Follow a job over server-sent events, falling back to polling if the stream fails
+const followJob = (jobId, onEvent) => new Promise((resolve, reject) => {
+  const source = new EventSource(`${API_URL}/jobs/${jobId}/events`)
+  const handle = (type) => (e) => onEvent(type, JSON.parse(e.data))
+
+  source.addEventListener('stage', handle('stage'))
+  source.addEventListener('progress', handle('progress'))
+  source.addEventListener('partial', handle('partial'))
+  source.addEventListener('completed', (e) => {
+    source.close()
+    resolve(JSON.parse(e.data).result)
+  })
+  source.addEventListener('failed', (e) => {
+    source.close()
+    reject(new Error(JSON.parse(e.data).error || 'Processing failed'))
+  })
+  source.onerror = () => {
+    source.close()
+    pollJob(jobId).then(resolve, reject)
+  }
+})
+
 function App() {
   const [loading, setLoading] = useState(false)
   const [results, setResults] = useState(null)
   const [error, setError] = useState(null)
   const [currentView, setCurrentView] = useState('form') // 'form', 'results', 'overview'
+  const [progress, setProgress] = useState({ stages: {}, chunks: null, partial: {} })
+
+  const handleJobEvent = (type, data) => {
+    setProgress((prev) => {
+      if (type === 'stage') {
+        return { ...prev, stages: { ...prev.stages, [data.stage]: data } }
+      }
+      if (type === 'progress') {
+        return { ...prev, chunks: { completed: data.completed, total: data.total } }
+      }
+      if (type === 'partial') {
+        const { elapsed_seconds, ...fields } = data
+        return { ...prev, partial: { ...prev.partial, ...fields } }
+      }
+      return prev
+    })
+  }
 
   const handleSubmit = async (url) => {
     setLoading(true)
     setError(null)
     setResults(null)
+    setProgress({ stages: {}, chunks: null, partial: {} })
 
     try {
       const response = await apiClient.post('/process-podcast', {
         url: url
       })
 
-      setResults(response.data)
+      // Processing runs in the background; stored results come back immediately
+      const result = response.data.status === 'completed'
+        ? response.data.result
+        : await followJob(response.data.job_id, handleJobEvent)
+
+      setResults(result)
       setCurrentView('results')
       setLoading(false)
     } catch (err) {
@@ -60,6 +119,11 @@ function App() {
     setCurrentView('form')
   }
 
+  const loadTranscript = async (summaryId) => {
+    const response = await apiClient.get(`/summaries/${summaryId}/transcript`)
+    return response.data.transcript
+  }
+
   const handleSelectSummary = async (summaryId) => {
     try {
       setLoading(true)
@@ -118,11 +182,12 @@ function App() {
             <PodcastForm onSubmit={handleSubmit} error={error} />
           )}
 
-          {currentView === 'form' && loading && <Loading />}
+          {currentView === 'form' && loading && <Loading progress={progress} />}
 
           {currentView === 'results' && results && (
             <Results 
               transcript={results.transcript} 
+              loadTranscript={results.summary_id ? () => loadTranscript(results.summary_id) : null}
               summary={results.summary}
               summaryType2={results.summary_type_2}
               metadata={results.metadata}
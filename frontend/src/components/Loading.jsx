@@ -1,4 +1,28 @@
-function Loading() {
+const STAGES = [
+  { key: 'extracting', label: 'Extracting audio from podcast URL' },
+  { key: 'transcribing', label: 'Transcribing audio content' },
+  { key: 'summarizing', label: 'Generating AI summary' },
+  { key: 'saving', label: 'Saving results' },
+]
+
+function Loading({ progress = { stages: {}, chunks: null, partial: {} } }) {
+  const { stages, chunks, partial } = progress
+
+  const stageDetail = (key) => {
+    const stage = stages[key]
+    if (!stage) return null
+    if (stage.status === 'completed') {
+      return `done in ${stage.duration_seconds.toFixed(1)}s`
+    }
+    if (stage.status === 'failed') {
+      return `failed after ${stage.duration_seconds.toFixed(1)}s`
+    }
+    if (key === 'transcribing' && chunks && chunks.total > 1) {
+      return `chunk ${chunks.completed}/${chunks.total}`
+    }
+    return 'in progress'
+  }
+
   return (
     <div className="text-center py-12">
       <div className="inline-block animate-spin rounded-full h-16 w-16 border-t-4 border-b-4 border-indigo-600 mb-4"></div>
@@ -6,25 +30,50 @@ function Loading() {
         Processing Podcast...
       </h2>
       <p className="text-gray-600 mb-4">
-        This may take a few minutes depending on the podcast length.
+        {partial.metadata?.title || 'This may take a few minutes depending on the podcast length.'}
       </p>
       <div className="space-y-2 text-left max-w-md mx-auto mt-6">
-        <div className="flex items-center text-gray-700">
-          <div className="w-2 h-2 bg-indigo-600 rounded-full mr-3 animate-pulse"></div>
-          <span>Extracting audio from podcast URL</span>
-        </div>
-        <div className="flex items-center text-gray-700">
-          <div className="w-2 h-2 bg-indigo-600 rounded-full mr-3 animate-pulse"></div>
-          <span>Transcribing audio content</span>
+        {STAGES.map(({ key, label }) => {
+          const stage = stages[key]
+          const done = stage?.status === 'completed'
+          const failed = stage?.status === 'failed'
+          return (
+            <div key={key} className="flex items-center text-gray-700">
+              <div
+                className={`w-2 h-2 rounded-full mr-3 ${
+                  done ? 'bg-green-600' : failed ? 'bg-red-600' : stage ? 'bg-indigo-600 animate-pulse' : 'bg-gray-300'
+                }`}
+              ></div>
+              <span className={stage ? '' : 'text-gray-400'}>{label}</span>
+              {stage && (
+                <span className="ml-auto text-sm text-gray-500">{stageDetail(key)}</span>
+              )}
+            </div>
+          )
+        })}
+      </div>
+      {partial.preview && (
+        <div className="mt-6 max-w-2xl mx-auto text-left bg-indigo-50 rounded-lg p-4">
+          <p className="text-sm font-semibold text-gray-700 mb-2">
+            Key moments (preview while the full summary is written)
+          </p>
+          <ul className="text-sm text-gray-600 list-disc pl-5 space-y-1">
+            {partial.preview.split('\n').map((line, index) => (
+              <li key={index}>{line.replace(/^- /, '')}</li>
+            ))}
+          </ul>
         </div>
-        <div className="flex items-center text-gray-700">
-          <div className="w-2 h-2 bg-indigo-600 rounded-full mr-3 animate-pulse"></div>
-          <span>Generating AI summary</span>
+      )}
+      {partial.transcript && (
+        <div className="mt-6 max-w-2xl mx-auto text-left bg-gray-50 rounded-lg p-4">
+          <p className="text-sm font-semibold text-gray-700 mb-2">
+            Transcript ready ({partial.transcript.length.toLocaleString()} characters)
+          </p>
+          <p className="text-sm text-gray-600 line-clamp-4">{partial.transcript}</p>
         </div>
-      </div>
+      )}
     </div>
   )
 }
 
 export default Loading
-
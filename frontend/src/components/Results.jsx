@@ -1,7 +1,31 @@
-import { useState } from 'react'
+import { useEffect, useState } from 'react'
 
-function Results({ transcript, summary, summaryType2, metadata, onReset }) {
+function Results({ transcript: initialTranscript, loadTranscript, summary, summaryType2, metadata, onReset }) {
   const [activeTab, setActiveTab] = useState('summary1')
+  // Saved summaries come without the transcript; it is fetched the first time it is needed
+  const [transcript, setTranscript] = useState(initialTranscript ?? null)
+  const [transcriptError, setTranscriptError] = useState(null)
+
+  const fetchTranscript = async () => {
+    if (transcript !== null || !loadTranscript) return transcript
+    try {
+      const loaded = await loadTranscript()
+      setTranscript(loaded)
+      return loaded
+    } catch (err) {
+      setTranscriptError('Could not load the transcript')
+      return null
+    }
+  }
+
+  useEffect(() => {
+    setTranscript(initialTranscript ?? null)
+    setTranscriptError(null)
+  }, [initialTranscript])
+
+  useEffect(() => {
+    if (activeTab === 'transcript') fetchTranscript()
+  }, [activeTab])
 
   return (
     <div className="space-y-6">
@@ -38,10 +62,12 @@ function Results({ transcript, summary, summaryType2, metadata, onReset }) {
                 <span className="text-gray-600">{metadata.uploader}</span>
               </div>
             )}
-            <div className="col-span-2 md:col-span-1">
-              <span className="font-semibold text-gray-700">Transcript Length: </span>
-              <span className="text-gray-600">{transcript.length.toLocaleString()} characters</span>
-            </div>
+            {transcript !== null && (
+              <div className="col-span-2 md:col-span-1">
+                <span className="font-semibold text-gray-700">Transcript Length: </span>
+                <span className="text-gray-600">{transcript.length.toLocaleString()} characters</span>
+              </div>
+            )}
           </div>
         </div>
       )}
@@ -167,7 +193,7 @@ function Results({ transcript, summary, summaryType2, metadata, onReset }) {
           <div className="bg-gray-50 border border-gray-200 rounded-lg p-6 max-h-96 overflow-y-auto">
             <h3 className="text-xl font-semibold text-gray-900 mb-4">Full Transcript</h3>
             <div className="text-gray-700 whitespace-pre-wrap leading-relaxed">
-              {transcript}
+              {transcript ?? transcriptError ?? 'Loading transcript...'}
             </div>
           </div>
         )}
@@ -175,8 +201,10 @@ function Results({ transcript, summary, summaryType2, metadata, onReset }) {
 
       <div className="flex space-x-4 pt-4 border-t border-gray-200">
         <button
-          onClick={() => {
-            const blob = new Blob([transcript], { type: 'text/plain' })
+          onClick={async () => {
+            const text = await fetchTranscript()
+            if (text === null) return
+            const blob = new Blob([text], { type: 'text/plain' })
             const url = URL.createObjectURL(blob)
             const a = document.createElement('a')
             a.href = url
@@ -9,9 +9,13 @@ const apiClient = axios.create({
   },
 })
 
+const PAGE_SIZE = 20
+
 function SummariesOverview({ onSelectSummary }) {
   const [summaries, setSummaries] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [error, setError] = useState(null)
 
   useEffect(() => {
@@ -21,8 +25,9 @@ function SummariesOverview({ onSelectSummary }) {
   const fetchSummaries = async () => {
     try {
       setLoading(true)
-      const response = await apiClient.get('/summaries')
+      const response = await apiClient.get('/summaries', { params: { limit: PAGE_SIZE } })
       setSummaries(response.data.summaries || [])
+      setNextCursor(response.data.next_cursor || null)
       setError(null)
     } catch (err) {
       setError('Failed to load summaries')
@@ -32,6 +37,23 @@ function SummariesOverview({ onSelectSummary }) {
     }
   }
 
+  const fetchMore = async () => {
+    if (!nextCursor) return
+    try {
+      setLoadingMore(true)
+      const response = await apiClient.get('/summaries', {
+        params: { limit: PAGE_SIZE, cursor: nextCursor }
+      })
+      setSummaries((prev) => [...prev, ...(response.data.summaries || [])])
+      setNextCursor(response.data.next_cursor || null)
+    } catch (err) {
+      setError('Failed to load summaries')
+      console.error(err)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const formatDate = (dateString) => {
     const date = new Date(dateString)
     return date.toLocaleDateString('en-US', { 
@@ -100,17 +122,17 @@ function SummariesOverview({ onSelectSummary }) {
                   {summary.podcast_title || 'Untitled Podcast'}
                 </h3>
                 <p className="text-sm text-gray-600 mb-2 line-clamp-2">
-                  {summary.summary_type_1?.substring(0, 150)}...
+                  {summary.excerpt}
                 </p>
                 <div className="flex items-center gap-4 text-xs text-gray-500">
                   <span>{formatDate(summary.created_at)}</span>
-                  {summary.metadata?.duration && (
+                  {summary.duration && (
                     <span>
-                      {Math.floor(summary.metadata.duration / 60)}:
-                      {String(summary.metadata.duration % 60).padStart(2, '0')}
+                      {Math.floor(summary.duration / 60)}:
+                      {String(summary.duration % 60).padStart(2, '0')}
                     </span>
                   )}
-                  {summary.summary_type_2 && (
+                  {summary.has_summary_type_2 && (
                     <span className="text-green-600 font-medium">✓ Structured Summary</span>
                   )}
                 </div>
@@ -128,6 +150,18 @@ function SummariesOverview({ onSelectSummary }) {
           </div>
         ))}
       </div>
+
+      {nextCursor && (
+        <div className="text-center pt-2">
+          <button
+            onClick={fetchMore}
+            disabled={loadingMore}
+            className="px-4 py-2 bg-gray-100 text-gray-700 rounded-lg hover:bg-gray-200 transition-colors text-sm disabled:opacity-50"
+          >
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   )
 }